@@ -0,0 +1,262 @@
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#at
+# Author: Anton Travleev, anton.travleev@kit.edu
+# Developed at INR, Karlsruhe Institute of Technology
+#at
+
+"""
+Benchmarks for geometry processing, input generation and reading of results.
+
+Usage:
+
+    python run.py [-o results.json] [-r REPEAT] [-s SIZE ...] [-c old.json] [CASE ...]
+
+Cases are run for synthetic pin (1x1), assembly (17x17) and mini-core (2x2
+assemblies) models, see synthetic.py. Neither MCNP nor SCF are started; a
+synthetic xsdir is written to a temporary directory and used as
+$DATAPATH/xsdir.
+
+For each case and size, the wall time of repeat runs is measured. Results
+are written as a JSON list of records with the keys 'case', 'size', 'n' (a
+case-specific size measure, e.g. number of lines), 'times' and 'best', and
+the 'info' record describing the environment. With -c, best times are
+compared to the records of an older results file.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+import argparse
+from contextlib import contextmanager
+
+# xsdir must be prepared before pirs.mcnp is imported.
+_tmp = tempfile.mkdtemp(prefix='pirs_bench_')
+os.environ['DATAPATH'] = _tmp
+
+import synthetic
+synthetic.write_xsdir(os.path.join(_tmp, 'xsdir'))
+
+import pirs
+from pirs import ScfInterface
+from pirs.solids import Box
+from pirs.mcnp.tallies import read_meshtal
+from pirs.mcnp.mctal import Mctal, MctalFile
+from pirs.scf2.output import read_pl_rod
+
+#: Number of pins per side for each model size.
+SIZES = {'pin': 1, 'assembly': 17, 'minicore': 34}
+
+#: Number of axial layers in fuel.
+NZ = 20
+
+
+@contextmanager
+def _quiet():
+    """
+    Suppress printouts of the timed code.
+    """
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+# Each case is a function of the model size returning a function to be timed
+# (setup is not timed). The timed function returns the size measure n.
+
+def mcnp_input(N):
+    MI = synthetic.mcnp_interface(synthetic.model(N, NZ), os.path.join(_tmp, 'xsdir'))
+    def f():
+        return len(str(MI).splitlines())
+    return f
+
+
+def scf_input(N):
+    SI = ScfInterface(synthetic.model(N, NZ))
+    def f():
+        return len(str(SI).splitlines())
+    return f
+
+
+def lattice_elements(N):
+    gm = synthetic.model(N, NZ)
+    def f():
+        return len(list(gm.lattice_elements()))
+    return f
+
+
+def zmesh_unify(N):
+    gm = synthetic.model(N, NZ)
+    heats = [e.heat for e in gm.heats()]
+    temps = [e.temp for e in gm.heats()]
+    for (k, m) in enumerate(temps):
+        # shifted grid, to have something to unify
+        m.set_values(0.)
+        m.set_grid([1.] + [2.]*(NZ - 1) + [1. + k % 3])
+    def f():
+        n = 0
+        for (h, t) in zip(heats, temps):
+            h1 = h.copy()
+            h1.unify(t.copy())
+            n += len(h1.get_grid())
+        return n
+    return f
+
+
+def zmesh_update(N):
+    gm = synthetic.model(N, NZ)
+    heats = [e.heat for e in gm.heats()]
+    others = []
+    for (k, h) in enumerate(heats):
+        b = Box(Z=synthetic.ah / 2.)
+        b.pos.z = 0.1 * k % 10
+        b.heat.set_grid([1]*(NZ/2 + 3))
+        b.heat.set_values(range(NZ/2 + 3))
+        others.append(b.heat)
+    def f():
+        n = 0
+        for (h, o) in zip(heats, others):
+            h1 = h.copy()
+            h1.update(o)
+            n += len(h1.get_grid())
+        return n
+    return f
+
+
+def read_meshtal_file(N):
+    fname = os.path.join(_tmp, 'meshtal{0}'.format(N))
+    synthetic.write_meshtal(fname, 1, N, N, NZ)
+    def f():
+        t, n, r = read_meshtal(fname, False)
+        return sum(len(mt.values) for mt in r.values())
+    return f
+
+
+def read_mctal_complete(N):
+    fname = os.path.join(_tmp, 'mctal{0}'.format(N))
+    synthetic.write_mctal(fname, 3, N*N, NZ)
+    def f():
+        m = Mctal()
+        m.read_complete(fname)
+        return sum(len(t.vals) for t in m.mctaltallies.values())
+    return f
+
+
+def read_mctal_file(N):
+    fname = os.path.join(_tmp, 'mctal{0}'.format(N))
+    synthetic.write_mctal(fname, 3, N*N, NZ)
+    def f():
+        mf = MctalFile(fname)
+        n = sum(mf.read_tally(k).values.size for k in mf.keys())
+        mf.close()
+        return n
+    return f
+
+
+def read_scf_output(N):
+    fname = os.path.join(_tmp, 'pl_rod{0}'.format(N))
+    synthetic.write_pl_rod(fname, N*N, NZ)
+    def f():
+        return sum(len(t) for (nr, t) in read_pl_rod(fname))
+    return f
+
+
+CASES = [mcnp_input, scf_input, lattice_elements, zmesh_unify, zmesh_update,
+         read_meshtal_file, read_mctal_complete, read_mctal_file, read_scf_output]
+
+
+def run(cases, sizes, repeat):
+    """
+    Runs cases for each size, returns list of result records.
+    """
+    res = []
+    for c in cases:
+        for s in sizes:
+            with _quiet():
+                f = c(SIZES[s])
+            times = []
+            for i in range(repeat):
+                with _quiet():
+                    t0 = time.time()
+                    n = f()
+                    times.append(time.time() - t0)
+            r = {'case': c.__name__, 'size': s, 'n': n, 'times': times, 'best': min(times)}
+            print '{0:<22s} {1:<10s} n={2:<9d} best {3:9.4f} s'.format(r['case'], s, n, r['best'])
+            sys.stdout.flush()
+            res.append(r)
+    return res
+
+
+def info():
+    return {'case': 'info',
+            'pirs': pirs.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'node': platform.node(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def compare(new, old):
+    """
+    Prints ratios of best times in new and old result records.
+    """
+    od = dict(((r['case'], r['size']), r) for r in old if r['case'] != 'info')
+    print
+    print '{0:<22s} {1:<10s} {2:>10s} {3:>10s} {4:>7s}'.format('case', 'size', 'old, s', 'new, s', 'new/old')
+    for r in new:
+        k = (r['case'], r['size'])
+        if k in od and od[k]['best'] > 0.:
+            o = od[k]['best']
+            print '{0:<22s} {1:<10s} {2:10.4f} {3:10.4f} {4:7.2f}'.format(k[0], k[1], o, r['best'], r['best']/o)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='PIRS benchmarks')
+    p.add_argument('cases', nargs='*', help='cases to run, all by default: ' +
+                   ', '.join(c.__name__ for c in CASES))
+    p.add_argument('-o', '--output', default='bench_results.json', help='results file')
+    p.add_argument('-r', '--repeat', type=int, default=3)
+    p.add_argument('-s', '--size', action='append', choices=sorted(SIZES),
+                   help='model sizes, all by default')
+    p.add_argument('-c', '--compare', help='older results file')
+    a = p.parse_args(argv)
+
+    cases = [c for c in CASES if not a.cases or c.__name__ in a.cases]
+    sizes = a.size or ['pin', 'assembly', 'minicore']
+    try:
+        res = run(cases, sizes, a.repeat)
+    finally:
+        shutil.rmtree(_tmp)
+    with open(a.output, 'w') as f:
+        json.dump([info()] + res, f, indent=1)
+    print 'results written to', a.output
+    if a.compare:
+        with open(a.compare) as f:
+            compare(res, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#at
+# Author: Anton Travleev, anton.travleev@kit.edu
+# Developed at INR, Karlsruhe Institute of Technology
+#at
+
+"""
+Synthetic models, xsdir and output files for the benchmarks.
+
+Models follow examples/pwr_bench: pin, 17x17 assembly and a mini-core of
+several assemblies, with UOX and MOX pins and guide tubes. Output files
+(meshtal, mctal, SCF pl_rod) have the format of the real ones, values are
+random.
+"""
+
+import random
+
+from pirs import McnpInterface
+from pirs.mcnp import Material
+from pirs.solids import Box, Cylinder
+
+# Dimensions from the OECD NEA MOX/UOX benchmark, see
+# examples/pwr_bench/rod_models.py
+ah = 365.76 # active height, cm
+pp = 1.26   # pin pitch, cm
+Nap = 17    # number of pins per assembly row
+
+# Boltzmann constant, MeV/K. Temperatures in xsdir are in MeV.
+_K = 8.617343e-11
+
+#: Positions of guide tubes in the 17x17 assembly, one octant is enough.
+_tubes = [(2, 5), (2, 8), (3, 3), (5, 2), (5, 5), (5, 8), (8, 2), (8, 5), (8, 8)]
+
+
+def _tube_positions():
+    res = set()
+    for (i, j) in _tubes:
+        for (a, b) in [(i, j), (j, i)]:
+            for ii in [a, Nap - 1 - a]:
+                for jj in [b, Nap - 1 - b]:
+                    res.add((ii, jj))
+    return res
+
+TUBES = _tube_positions()
+
+
+def rods(Nz=20):
+    """
+    Returns dictionary with rod models: 'uox', 'mox' and 'tube'. Fuel has Nz
+    axial layers for heat and temperature.
+    """
+    clad = Cylinder(R=0.4583, Z=ah, material='zirc')
+    clad.temp.set_values(600.)
+    clad.dens.set_values(6.504)
+    fuel = clad.insert(Cylinder(R=0.3951, Z=ah, material='uo2'))
+    fuel.name = 'fuel'
+    fuel.dens.set_values(10.21)
+    fuel.heat.set_grid([1]*Nz)
+    fuel.heat.set_values(1.)
+    fuel.temp.set_grid([1]*Nz)
+    fuel.temp.set_values(1200.)
+
+    uox = clad.copy_tree()
+    uox.name = 'uox'
+    mox = clad.copy_tree()
+    mox.name = 'mox'
+    mox.children[0].material = 'mox'
+
+    tube = Cylinder(R=0.6032, Z=ah, material='zirc')
+    tube.name = 'tube'
+    tube.temp.set_values(600.)
+    tube.dens.set_values(6.504)
+    w = tube.insert(Cylinder(R=0.5624, Z=ah, material='water'))
+    w.temp.set_values(580.)
+    w.dens.set_values(0.71)
+    return {'uox': uox, 'mox': mox, 'tube': tube}
+
+
+def model(N=17, Nz=20):
+    """
+    Returns model of N x N pins. When N is a multiple of 17, the model
+    represents (N/17)**2 assemblies with guide tubes; MOX assemblies
+    alternate with UOX ones in the checkerboard manner. Otherwise, all
+    pins are UOX. Fuel temperatures vary from pin to pin and axially.
+    """
+    rd = rods(Nz)
+    asm = N % Nap == 0
+    a = Box(X=N*pp, Y=N*pp, Z=ah)
+    a.material = 'water'
+    a.temp.set_values(580.)
+    a.dens.set_values(0.7)
+    a.grid.x = pp
+    a.grid.y = pp
+    a.grid.z = a.Z
+    for i in range(N):
+        for j in range(N):
+            if not asm:
+                r = rd['uox']
+            elif (i % Nap, j % Nap) in TUBES:
+                r = rd['tube']
+            elif (i // Nap + j // Nap) % 2:
+                r = rd['mox']
+            else:
+                r = rd['uox']
+            a.grid.insert((i, j, 0), r.copy_tree())
+    a.grid.center()
+    k = 0
+    for e in a.values():
+        if e.name == 'fuel':
+            e.temp.set_values([900. + 10.*(k % 13) + 15.*z for z in range(Nz)])
+            k += 1
+    return a
+
+
+def write_xsdir(fname):
+    """
+    Writes xsdir file with entries for all nuclides of H, B, O, Zr, U and
+    Pu at several temperatures, and thermal data for light water.
+    """
+    zs = [1, 5, 8, 40, 92, 94]
+    awr = []
+    dr = []
+    for Z in zs:
+        for A in range(Z, 3*Z + 10):
+            zaid = Z*1000 + A
+            m = A * 0.99167
+            awr.append('  {0} {1:.6f}'.format(zaid, m))
+            for (s, T) in enumerate([300., 600., 900., 1200.]):
+                dr.append(' {0}.{1}c {2:.6f} lib{1} 0 1 1 1000 0 0 {3:.4E}'.format(zaid, 31 + s, m, T*_K))
+    for (s, T) in enumerate([294., 350., 400., 450., 500., 550., 600., 650., 800.]):
+        dr.append(' lwtr.{0}t 0.999170 tlib 0 1 1 1000 0 0 {1:.4E}'.format(10 + s, T*_K))
+    with open(fname, 'w') as f:
+        f.write('atomic weight ratios\n')
+        f.write('\n'.join(awr) + '\n')
+        f.write('directory\n')
+        f.write('\n'.join(dr) + '\n')
+    return
+
+
+def mcnp_interface(gm, xsdir):
+    """
+    Returns McnpInterface for the model gm. Material compositions follow
+    examples/pwr_bench/pin_mcnp.py.
+    """
+    water = Material(1001, 2, 8016, 1)
+    water.thermal = 'lwtr'
+    zirc = Material('Zr')
+    u = Material(92235, (4.2, 2), 92238, (95.8, 2))
+    pu = Material(94239, (93.6, 2), 94240, (5.9, 2), 94241, (0.4, 2), 94242, (0.1, 2))
+    uo2 = Material(u, 1, 8016, 2)
+    mox = Material(uo2, (0.93, 2), Material(pu, 1, 8016, 2), (0.07, 2))
+
+    MI = McnpInterface(gm)
+    MI.xsdir = xsdir
+    MI.materials['water'] = water
+    MI.materials['zirc'] = zirc
+    MI.materials['uo2'] = uo2
+    MI.materials['mox'] = mox
+    MI.bc['radial'] = '*'
+    return MI
+
+
+def _lines(vals, n):
+    return [' '.join(vals[i:i+n]) for i in range(0, len(vals), n)]
+
+
+def write_meshtal(fname, Nt, Nx, Ny, Nz):
+    """
+    Writes meshtal file with Nt mesh tallies of Nx*Ny*Nz elements.
+    """
+    rnd = random.Random(1)
+    lines = ['mcnp   version 5     ld=03212008  probid =  04/03/14 13:46:04',
+             ' synthetic meshtal', ' ',
+             ' Number of histories used for normalizing tallies =      40000.00', ' ']
+    fmt = '{0:10.2f}'.format
+    for t in range(Nt):
+        lines += [' Mesh Tally Number {0:9d}'.format(10*t + 4),
+                  ' neutron  mesh tally.', '', ' Tally bin boundaries:',
+                  '    X direction: ' + ' '.join(fmt(float(i)) for i in range(Nx + 1)),
+                  '    Y direction: ' + ' '.join(fmt(float(i)) for i in range(Ny + 1)),
+                  '    Z direction: ' + ' '.join(fmt(float(i)) for i in range(Nz + 1)),
+                  '    Energy bin boundaries:  0.00E+00 1.00E+36', '',
+                  '   Energy         X         Y         Z     Result     Rel Error     Volume    Rslt * Vol']
+        for i in range(Nx):
+            for j in range(Ny):
+                for k in range(Nz):
+                    v = rnd.random()
+                    lines.append('  1.000E+36 {0:9.3f} {1:9.3f} {2:9.3f} {3:.5E} {4:.5E} 1.00000E+00 {3:.5E}'.format(
+                                 i + 0.5, j + 0.5, k + 0.5, v, 0.01*v))
+        lines.append('')
+    with open(fname, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return
+
+
+def write_mctal(fname, Nt, Ncells, Ne, nc=50):
+    """
+    Writes mctal file with Nt tallies, each with Ncells cells and Ne energy
+    bins, and kcode data for nc cycles.
+    """
+    rnd = random.Random(1)
+    lines = ['mcnp5    1.60   04/17/13 11:08:58     3     100000    1234567',
+             'synthetic mctal',
+             'ntal {0:5d}'.format(Nt),
+             ' '.join('{0:4d}'.format(10*t + 4) for t in range(Nt))]
+    for t in range(Nt):
+        lines.append('tally {0:>5}   -1    0'.format(10*t + 4))
+        lines.append('      synthetic tally')
+        lines.append('f {0:>11}'.format(Ncells))
+        lines += _lines(['{0:7d}'.format(c + 1) for c in range(Ncells)], 11)
+        lines += ['d {0:>11}'.format(1), 'u {0:>11}'.format(0), 's {0:>11}'.format(0),
+                  'm {0:>11}'.format(0), 'c {0:>11}'.format(0), 'et {0:>10}'.format(Ne)]
+        lines += _lines(['{0:12.5E}'.format(0.1*(i+1)) for i in range(Ne-1)], 6)
+        lines += ['t {0:>11}'.format(0), 'vals']
+        v = []
+        for i in range(Ncells*Ne):
+            x = rnd.random()
+            v.append('{0:12.5E} {1:6.4f}'.format(x, x*0.1))
+        lines += _lines(v, 4)
+        lines.append('tfc {0:>4}       1       1       1       1       1       1       1       1'.format(1))
+        lines.append('       1000   1.00000E-01 0.0100 0.0000E+00')
+    mk = 19
+    lines.append('kcode {0:>5}    2 {1:>5}'.format(nc, mk))
+    lines += _lines(['{0:12.5E}'.format(rnd.random()) for i in range(nc*mk)], 5)
+    with open(fname, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return
+
+
+def write_pl_rod(fname, Nr, Nz):
+    """
+    Writes SCF pl_rod file for Nr rods with Nz axial layers.
+    """
+    rnd = random.Random(1)
+    lines = []
+    for r in range(Nr):
+        lines.append('zone t=rod{0}'.format(r + 1))
+        for k in range(Nz):
+            row = [(k + 0.5)/Nz] + [rnd.uniform(280., 900.) for c in range(12)]
+            lines.append(' '.join('{0:.6E}'.format(x) for x in row))
+    with open(fname, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return
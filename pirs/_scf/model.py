@@ -19,6 +19,7 @@ from math import pi, sin
 import time
 
 from . import workplace
+from ..tools.timing import timer
 
 class ScfVariable(object):
     """
@@ -1904,10 +1905,12 @@ class Model(object):
         Prepares content of the input file and starts SCF job.
         """
         t1 = time.time()
-        self.__wp.input.string = str(self)
+        with timer('scf.input'):
+            self.__wp.input.string = str(self)
         t2 = time.time()
         self.process_model_time = t2 -t1
-        self.wp.run(mode, **kwargs)
+        with timer('scf.run'):
+            self.wp.run(mode, **kwargs)
         self.run_time = time.time() - t2
 
     @property
@@ -20,6 +20,6 @@ Classes to prepare files needed by, and to start external programs (e.g.
 computational codes). 
 """
 
-from .scheduler import Job, Scheduler, enva
+from .scheduler import Job, Scheduler, JobFuture, as_completed, enva
 from .workplace import WorkPlace, InputFile
 
@@ -19,7 +19,9 @@ import os
 import time
 import platform
 import subprocess
+import threading
 import re
+from collections import deque
 
 from ...tools.file_lines import get_last_line
 
@@ -117,6 +119,211 @@ class Job(object):
         self.__dir = value
 
 
+class JobFuture(object):
+    """
+    Result of a job started by Scheduler.submit().
+
+    A job is finished when its process exits. Additionally, files and their
+    last lines can be specified as completion criteria (this is necessary,
+    for example, when the job process only submits a task to a cluster
+    queue): the job is done, when its process exited and all criteria are
+    met.
+
+    Process exit is detected by a thread that reads the process output, thus
+    no fixed sleep intervals are involved. Files are checked after the
+    process exited, with increasing intervals limited by sec. A job whose
+    process exits with non-zero code is done and failed, irrespective of the
+    criteria; its exit code is stored in the returncode attribute.
+
+    >>> s = Scheduler()
+    >>> s.add('e', Job('echo out; exit 3'))
+    >>> f = s.submit('e', files=['never.created'])
+    >>> f.wait()
+    True
+    >>> f.returncode
+    3
+    >>> f.result()
+    Traceback (most recent call last):
+        ...
+    OSError: job exited with code 3: <job cd '.'; echo out; exit 3>
+    """
+
+    def __init__(self, job, sec=5, files=None, llines=None):
+        self.job = job
+        self.set_criteria(sec, files, llines)
+        self.__proc = None
+        self.__out = None
+        self.__exc = None
+        self.__exited = threading.Event()
+        self.__lock = threading.Lock()
+        self.__callbacks = []
+        self.__final = False
+        self.__t1 = None
+        self.run_time = None
+        self.returncode = None
+        return
+
+    def __repr__(self):
+        if self.done():
+            st = 'done'
+        elif self.running():
+            st = 'running'
+        else:
+            st = 'pending'
+        return '<future {0} {1}>'.format(st, self.job)
+
+    def set_criteria(self, sec=5, files=None, llines=None):
+        """
+        Set completion criteria, see Scheduler.wait() for the meaning of
+        arguments.
+        """
+        if files is None:
+            files = []
+        if llines is None:
+            llines = []
+        self.__sec = sec
+        self.__files = map(lambda f: os.path.join(self.job.dir, f), files)
+        self.__regex = map(lambda s: re.compile(s), llines)
+        return
+
+    def _start(self, on_exit=None):
+        """
+        Starts the job process and the thread waiting for its exit. When the
+        process exits, on_exit(self) is called in this thread.
+        """
+        self.__t1 = time.time()
+        try:
+            self.__proc = subprocess.Popen(self.job.cmd, shell=True,
+                                           stdout=subprocess.PIPE,
+                                           cwd=self.job.dir)
+        except OSError as e:
+            self.__exc = e
+            self.__exit(on_exit)
+        else:
+            t = threading.Thread(target=self.__communicate, args=(on_exit,))
+            t.daemon = True
+            t.start()
+        return
+
+    def __communicate(self, on_exit):
+        try:
+            self.__out = self.__proc.communicate()[0]
+        except Exception as e:
+            self.__exc = e
+        else:
+            self.returncode = self.__proc.returncode
+            if self.returncode != 0:
+                # the job failed; its files will probably never be complete.
+                self.__exc = OSError('job exited with code {0}: {1}'.format(self.returncode, self.job))
+        self.__exit(on_exit)
+
+    def __exit(self, on_exit):
+        self.__exited.set()
+        if on_exit is not None:
+            on_exit(self)
+
+    def running(self):
+        """True if the job process is started and not exited yet."""
+        return self.__t1 is not None and not self.__exited.is_set()
+
+    def exited(self):
+        """True if the job process exited."""
+        return self.__exited.is_set()
+
+    def __criteria(self):
+        for i, f in enumerate(self.__files):
+            if not os.access(f, os.R_OK):
+                return False
+            if i < len(self.__regex):
+                ll = get_last_line(f)
+                if not (ll and self.__regex[i].match(ll)):
+                    return False
+        return True
+
+    def done(self):
+        """
+        True if the job process exited and completion criteria are met, or
+        if the job failed (see result()). Does not block.
+        """
+        return self.__exited.is_set() and (self.__exc is not None or self.__criteria())
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the job is done, or timeout seconds passed. Returns
+        done().
+        """
+        t0 = time.time()
+        dt = 0.05
+        while True:
+            if timeout is None:
+                left = self.__sec
+            else:
+                left = t0 + timeout - time.time()
+                if left <= 0:
+                    return self.done()
+            if not self.__exited.is_set():
+                # Event.wait without timeout cannot be interrupted in
+                # python 2, therefore wait in chunks.
+                self.__exited.wait(min(left, self.__sec))
+            elif self.__exc is not None or self.__criteria():
+                # a failed job never meets the criteria
+                return True
+            else:
+                # the process exited, but the files are not ready yet.
+                time.sleep(min(dt, self.__sec, left))
+                dt *= 2
+
+    def add_callback(self, fn):
+        """
+        Register function fn to be called with the future as argument, when
+        result() is called for the first time, after the job is done. The
+        function is called in the thread calling result().
+        """
+        self.__callbacks.append(fn)
+
+    def result(self, timeout=None):
+        """
+        Waits for the job to be done and returns its standard output.
+
+        If the job is not done after timeout seconds, RuntimeError is raised.
+        If the job process exited with non-zero code, OSError is raised and
+        callbacks are not called. Exceptions raised when starting the job
+        process, or by callbacks (the remaining callbacks are not called
+        then), are re-raised here and by each subsequent call.
+        """
+        if not self.__final:
+            if not self.wait(timeout):
+                raise RuntimeError('Job not done in {0} s: {1}'.format(timeout, self.job))
+            with self.__lock:
+                if not self.__final:
+                    self.__final = True
+                    self.run_time = time.time() - self.__t1
+                    if self.__exc is None:
+                        try:
+                            for fn in self.__callbacks:
+                                fn(self)
+                        except Exception as e:
+                            self.__exc = e
+        if self.__exc is not None:
+            raise self.__exc
+        return self.__out
+
+
+def as_completed(futures, sec=0.1):
+    """
+    Generator yielding futures from the list futures, as they are done.
+    Futures are checked with the interval sec.
+    """
+    rest = list(futures)
+    while rest:
+        for f in rest[:]:
+            if f.done():
+                rest.remove(f)
+                yield f
+        if rest:
+            time.sleep(sec)
+
+
 class Scheduler(object):
     """Scheduler for jobs.
 
@@ -129,16 +336,36 @@ class Scheduler(object):
     Currently, all jobs will be run in the OS shell using the subprocess
     module, this may change at some point in the future.
 
+    Several jobs can run concurrently. The ``submit()`` method starts a job
+    and returns immediately a JobFuture instance, whose ``result()`` method
+    waits for the job and returns its output. The number of jobs running at
+    the same time is limited by max_workers; jobs exceeding this number are
+    started as soon as another job exits.
+
+    >>> s = Scheduler(max_workers=2)
+    >>> for i in range(3):
+    ...     s.add(i, Job('echo {0}'.format(i)))
+    >>> fl = [s.submit(i) for i in range(3)]
+    >>> [f.result() for f in fl]
+    ['0\\n', '1\\n', '2\\n']
+
     """
 
-    def __init__(self):
+    def __init__(self, max_workers=None):
         """
         Create a new empty job scheduler.
 
+        Optional argument max_workers limits the number of simultaneously
+        running jobs. By default there is no limit.
+
         """
 
         self.jobs = {}
         self.queued = {}
+        self.max_workers = max_workers
+        self.__lock = threading.Lock()
+        self.__nrun = 0          # number of running jobs
+        self.__pending = deque() # futures waiting for a free worker
         return
 
     def __repr__(self):
@@ -222,6 +449,24 @@ class Scheduler(object):
             raise ValueError('no such job: %s' % name)
         return
 
+    def submit(self, name, **kwargs):
+        """
+        Start the job identified by name and return a JobFuture instance
+        without waiting. If max_workers jobs are already running, the job is
+        started when one of them exits.
+
+        Keyword arguments sec, files and llines define completion criteria,
+        see wait().
+        """
+        for arg in kwargs:
+            if arg not in ('sec', 'files', 'llines'):
+                raise ValueError('unsupported keyword argument %s' % arg)
+        if name not in self.jobs:
+            raise ValueError('no such job: %s' % name)
+        f = self.__queue_shelljob(self.get_job(name))
+        f.set_criteria(**kwargs)
+        return f
+
     def _wait(self, name, **kwargs):
         """
         Wait for the queued job identified by name to finish. If the same job
@@ -289,16 +534,15 @@ class Scheduler(object):
         """
         Wait for the started job to finish.
 
-        Criteria to define whether job is finished or not, depend on the specified
-        keyword arguments:
+        The job is finished when its process exits and, additionally,
+        criteria defined by the following keyword arguments are met:
 
             sec:
-                number of seconds to wait.
+                period (in seconds) to check files. By default, 5 s.
 
             files:
                 list of filenames. Wait untill all files specified in the list
-                exist (created by the job).  If this argument specified, the
-                sec argument defines the period to check file existence.
+                exist (created by the job).
 
             llines:
                 list of regexp strings (not regex objects!) to compare with the
@@ -306,69 +550,62 @@ class Scheduler(object):
                 llines argument implies that the files argument is given and
                 that they have equal lengths. Criteria meet, if all files
                 exist and their last lines match the regexp strings.
+
+        For jobs running locally, the job process exit is detected
+        immediately. The files criteria are useful for jobs that start
+        computations elsewhere, e.g. by submitting them to a cluster queue.
         """
-        # default: wait for 5 sec.
+        # default: check files every 5 sec.
         args = {'sec':5}
         args.update(kwargs)
-        sec = args['sec']
 
         print 'scheduler waits with parameters', args
 
-        if 'llines' in args.keys():
-            # check that files exist and compare last lines
-            files = map(lambda f: os.path.join(self.get_job(name).dir, f), args['files'])
-            regex = map(lambda s: re.compile(s), args['llines'])
-            passed = False
-            while not passed:
-                print time.strftime('%c', time.localtime())
-                for f, r in zip(files, regex):
-                    print '    ', f,
-                    if os.access(f, os.R_OK):
-                        print 'exists',
-                        ll = get_last_line(f)
-                        if ll and r.match(ll):
-                            print 'last line matches'
-                            passed = True
-                        else:
-                            print 'last line mismatch'
-                            passed = False
-                            break
-                    else:
-                        print "doesn't exist"
-                        passed = False
-                        break
-                time.sleep(sec)
-        elif 'files' in args.keys():
-            # check that files exist
-            files = map(lambda f: os.path.join(self.get_job(name).dir, f), args['files'])
-            passed = False
-            while not passed:
-                for f in files:
-                    if os.access(f, os.R_OK):
-                        passed = True
-                    else:
-                        passed = False
-                        break
-                time.sleep(sec)
-        else:
-            # simply wait for sec seconds
-            time.sleep(sec)
-
-        data = self.queued[name].pop()
+        try:
+            data = self.queued[name].pop()
+        except (IndexError, KeyError):
+            raise ValueError('job not in queue: %s' % name)
+        data.set_criteria(args['sec'], args.get('files'), args.get('llines'))
         r = self.__finish_shelljob(data)
         return r
 
 
     def __queue_shelljob(self, j):
-        return subprocess.Popen(j.cmd, shell=True, stdout=subprocess.PIPE, cwd=j.dir)
-
-    def __finish_shelljob(self, proc):
         """
-        proc is an instance of subprocess.Popen() created in __queu_shelljob.
+        Returns a JobFuture instance for job j. The job is started, if the
+        number of running jobs is less than max_workers.
+        """
+        f = JobFuture(j)
+        with self.__lock:
+            if self.max_workers is None or self.__nrun < self.max_workers:
+                self.__nrun += 1
+                start = True
+            else:
+                self.__pending.append(f)
+                start = False
+        if start:
+            f._start(self.__release)
+        return f
+
+    def __release(self, f):
+        """
+        Called when the process of future f exits. Starts the next pending
+        job.
+        """
+        with self.__lock:
+            if self.__pending:
+                n = self.__pending.popleft()
+            else:
+                n = None
+                self.__nrun -= 1
+        if n is not None:
+            n._start(self.__release)
+
+    def __finish_shelljob(self, f):
+        """
+        f is an instance of JobFuture created in __queue_shelljob.
         """
-        # proc.wait()
-        (out,err) = proc.communicate()
-        return out
+        return f.result()
 
 if __name__ == '__main__':
     import doctest
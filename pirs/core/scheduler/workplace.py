@@ -22,6 +22,7 @@ import __main__ as main
 from datetime import datetime
 
 from .scheduler import Scheduler, Job
+from ...tools.file_lines import write_lines
 
 #at
 # Author: Anton Travleev, anton.travleev@kit.edu
@@ -89,6 +90,12 @@ class InputFile(object):
     def string(self):
         """
         String to be written into the target file.
+
+        Can be also a list of strings, or a callable returning an iterable of
+        strings. In the latter case, it is called each time the file is
+        written, and the strings are written one by one, separated with
+        newlines. This allows writing large files without having their
+        content in memory.
         """
         return self.__str
 
@@ -253,16 +260,22 @@ class InputFile(object):
             self.__rep = 'nothing written'
         elif self.__psf:
             # put string to the target file
-            if isinstance(self.__str, list):
-                string = '\n'.join(self.__str)
-            elif isinstance(self.__str, str):
-                string = self.__str[:]
+            if callable(self.__str):
+                i = open(target, self.__mode, 2**20)
+                write_lines(i, self.__str())
+                i.close()
+                self.__rep = "generated from iterable"
             else:
-                raise TypeError('Wrong type of string: ', self.string.__class__.__name__)
-            i = open(target, self.__mode)
-            i.writelines(string)
-            i.close()
-            self.__rep = "generated from string"
+                if isinstance(self.__str, list):
+                    string = '\n'.join(self.__str)
+                elif isinstance(self.__str, str):
+                    string = self.__str[:]
+                else:
+                    raise TypeError('Wrong type of string: ', self.string.__class__.__name__)
+                i = open(target, self.__mode)
+                i.writelines(string)
+                i.close()
+                self.__rep = "generated from string"
         else:
             # copy the external file to the target file
             if self.__mode == 'w':
@@ -20,3 +20,9 @@ Trageom docstrings.
 """
 
 from .vector import Vector3, pi, pi2
+
+try:
+    from .vector_array import Vector3Array
+except ImportError:
+    # numpy not available
+    pass
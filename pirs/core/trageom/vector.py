@@ -395,8 +395,45 @@ class Vector3(object):
     representation. Each time coordinate of a new system is set, first the new
     system coordinates are updated using the current coordinate system and then the
     new coordinate is set and the internal system is changed.
+
+    Vectors are created in large numbers (positions of all elements in a
+    model, results of intermediate arithmetics), therefore instances have no
+    __dict__, and operations on two cartesian vectors (the most common case)
+    avoid the general coordinate conversion machinery.
     """
 
+    __slots__ = ('__cs', '__x', '__y', '__z', '__r', '__t', '__R', '__p',
+                 '__hash', '__rehash')
+
+    @classmethod
+    def _from_car(cls, x, y, z):
+        """
+        Returns new cartesian vector. Unlike the constructor, no argument
+        checks are performed.
+        """
+        new = object.__new__(cls)
+        new.__cs = 'car'
+        new.__x = float(x)
+        new.__y = float(y)
+        new.__z = float(z)
+        new.__rehash = True
+        return new
+
+    def __getstate__(self):
+        # instances with __slots__ cannot be pickled with protocols 0 and 1
+        # (used by tools.dumper) without this method.
+        return (self.__cs, self.own)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # instances pickled before __slots__ were introduced have the
+            # instance dictionary as state.
+            cs = state['_Vector3__cs']
+            c = tuple(state['_Vector3__' + n] for n in {'car': 'xyz', 'cyl': 'rtz', 'sph': 'Rtp'}[cs])
+        else:
+            cs, c = state
+        self.__init__(**{cs: c})
+
     ###   def __new__(cls, arg=None, *args, **kargs):
     ###       """
     ###       This method is necessary when existing Vector3 instance is passed
@@ -514,7 +551,7 @@ class Vector3(object):
         >>> v1 is v2, v1 == v2
         (False, True)
         """
-        if   self.__cs == 'car': new = Vector3(car=(self.__x, self.__y, self.__z) )
+        if   self.__cs == 'car': new = Vector3._from_car(self.__x, self.__y, self.__z)
         elif self.__cs == 'cyl': new = Vector3(cyl=(self.__r, self.__t, self.__z) )
         elif self.__cs == 'sph': new = Vector3(sph=(self.__R, self.__t, self.__p) )
         return new
@@ -568,14 +605,14 @@ class Vector3(object):
         car (x=4, y=1, z=1)
 
         """
-        if self.__cs is 'car':
+        if self.__cs == 'car':
             return self.__x
         else:
             return self.__all_coords()[0]
 
     @x.setter
     def x(self, v):
-        if self.__cs is 'car':
+        if self.__cs == 'car':
             self.__x = v
         else:
             c = self.__all_coords()
@@ -611,14 +648,14 @@ class Vector3(object):
         >>> print v
         car (x=1, y=4, z=1)
         """
-        if self.__cs is 'car':
+        if self.__cs == 'car':
             return self.__y
         else:
             return self.__all_coords()[1]
 
     @y.setter
     def y(self, v):
-        if self.__cs is 'car':
+        if self.__cs == 'car':
             self.__y = v
         else:
             c = self.__all_coords()
@@ -678,14 +715,14 @@ class Vector3(object):
         When r is set, the vector internal representation is changed to
         cylinder (thus r, t and z are computed from cartesian or spherical coordinates),
         and then new value is set to r."""
-        if self.__cs is 'cyl':
+        if self.__cs == 'cyl':
             return self.__r
         else:
             return self.__all_coords()[3]
 
     @r.setter
     def r(self, v):
-        if self.__cs is 'cyl':
+        if self.__cs == 'cyl':
             self.__r = v
         else:
             c = self.__all_coords()
@@ -727,14 +764,14 @@ class Vector3(object):
         When R is set, the vector internal representation is changed to
         spherical (thus R, t and p are computed from cartesian or cylinder coordinates),
         and then new value is set to R."""
-        if self.__cs is 'sph':
+        if self.__cs == 'sph':
             return self.__R
         else:
             return self.__all_coords()[5]
 
     @R.setter
     def R(self, v):
-        if self.__cs is 'sph':
+        if self.__cs == 'sph':
             self.__R = v
         else:
             c = self.__all_coords()
@@ -751,14 +788,14 @@ class Vector3(object):
         When p is set, the vector internal representation is changed to
         spherical (thus R, t and p are computed from cartesian or cylinder coordinates),
         and then new value is set to p."""
-        if self.__cs is 'sph':
+        if self.__cs == 'sph':
             return self.__p
         else:
             return self.__all_coords()[6]
 
     @p.setter
     def p(self, v):
-        if self.__cs is 'sph':
+        if self.__cs == 'sph':
             self.__p = v
         else:
             c = self.__all_coords()
@@ -774,7 +811,7 @@ class Vector3(object):
         """
         Returns a 3-tuple with cartesian coordinates, (x, y, z).
         """
-        if self.__cs is 'car':
+        if self.__cs == 'car':
             return (self.__x, self.__y, self.__z)
         else:
             # c = self.__all_coords()
@@ -786,7 +823,7 @@ class Vector3(object):
         """
         Returns a 3-tuple with cylinder coordinates, (r, t, z).
         """
-        if self.__cs is 'cyl':
+        if self.__cs == 'cyl':
             return (self.__r, self.__t, self.__z)
         else:
             c = self.__all_coords()
@@ -797,7 +834,7 @@ class Vector3(object):
         """
         Returns a 3-tuple with spherical coordinates, (R, t, p).
         """
-        if self.__cs is 'sph':
+        if self.__cs == 'sph':
             return (self.__R, self.__t, self.__p)
         else:
             c = self.__all_coords()
@@ -878,19 +915,18 @@ class Vector3(object):
         >>> print v1 + v2
         car (x=1, y=1, z=0)
         """
-        # if othr is not of Vector3 type, it has no attributes x, y, and z.
-        # This will cause the AttributeError. More logically, however, if the
-        # addition will raise the TypeError, like, for example the command
-        # 'abc' + 3.  THerefore, I substitute with this try-except construction
-        # AttributeError with TypeError.
-        ###   if not isinstance(othr, Vector3):
-        ###       othr = Vector3(othr)
-        try:
-            # calculations are performed in cartesian CS
-            x,y,z = self.car
-            X,Y,Z = othr.car
-        except AttributeError:
-            raise TypeError('Cannot add ' + repr(othr) + ' to ' + repr(self) )
+        # If othr is not a Vector3, return NotImplemented: either othr defines
+        # __radd__ (as Vector3Array does), or python raises TypeError, like
+        # for example for 'abc' + 3.
+        if not isinstance(othr, Vector3):
+            return NotImplemented
+        if self.__cs == 'car' and othr.__cs == 'car':
+            return Vector3._from_car(self.__x + othr.__x,
+                                     self.__y + othr.__y,
+                                     self.__z + othr.__z)
+        # calculations are performed in cartesian CS
+        x,y,z = self.car
+        X,Y,Z = othr.car
         return Vector3(car=(x+X,y+Y,z+Z) )
 
     def __radd__(self, othr):
@@ -904,7 +940,7 @@ class Vector3(object):
         # About the usage of try-except construction, see comment in __add__ method.
         try:
             if self.__cs == 'car':
-                r = Vector3(car=(-self.__x, -self.__y,      -self.__z     ) )
+                r = Vector3._from_car(-self.__x, -self.__y,     -self.__z     )
             if self.__cs == 'cyl':
                 r = Vector3(cyl=(self.__r,  self.__t + pi, -self.__z     ) )
             if self.__cs == 'sph':
@@ -914,6 +950,10 @@ class Vector3(object):
         return r
 
     def __sub__(self, othr):
+        if isinstance(othr, Vector3) and self.__cs == 'car' and othr.__cs == 'car':
+            return Vector3._from_car(self.__x - othr.__x,
+                                     self.__y - othr.__y,
+                                     self.__z - othr.__z)
         return self + (-othr)
 
     def __rsub__(self, othr):
@@ -943,6 +983,14 @@ class Vector3(object):
         if not isinstance(othr, Vector3):
             return False
 
+        if self.__cs == 'car' and othr.__cs == 'car':
+            # cheap check first. When it fails, the other CS are compared as
+            # well, since their closeness is not equivalent.
+            if (_are_close(self.__x, othr.__x) and
+                _are_close(self.__y, othr.__y) and
+                _are_close(self.__z, othr.__z)):
+                return True
+
         x1, y1, z1, r1, t1, R1, p1 = self.__all_coords()
         x2, y2, z2, r2, t2, R2, p2 = othr.__all_coords()
         t1 = _base_theta(t1)
@@ -960,6 +1008,8 @@ class Vector3(object):
 
     def dot(self, othr):
         """scalar product"""
+        if isinstance(othr, Vector3) and self.__cs == 'car' and othr.__cs == 'car':
+            return self.__x*othr.__x + self.__y*othr.__y + self.__z*othr.__z
         r = 0.
         for (c1,c2) in zip(self.car, othr.car):
             r += c1*c2
@@ -989,9 +1039,9 @@ class Vector3(object):
         """Vector product"""
         a = self.car
         b = othr.car
-        return Vector3((a[1]*b[2] - a[2]*b[1],
-                          a[2]*b[0] - a[0]*b[2],
-                          a[0]*b[1] - a[1]*b[0]  ) )
+        return Vector3._from_car(a[1]*b[2] - a[2]*b[1],
+                                 a[2]*b[0] - a[0]*b[2],
+                                 a[0]*b[1] - a[1]*b[0]  )
 
     def is_perpendicular(self, othr):
         """ check that two vectors are perpendicular taking into account the machine epsilon."""
@@ -0,0 +1,250 @@
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#at
+# Author: Anton Travleev, anton.travleev@kit.edu
+# Developed at INR, Karlsruhe Institute of Technology
+#at
+
+"""
+Sets of vectors stored in numpy arrays.
+
+This module requires numpy. Use it for operations on many vectors at once,
+for example, on positions of all rods in a model.
+"""
+
+import numpy
+
+from .vector import Vector3, pi, pi2, _E
+
+
+def _are_close(a1, a2, epsilon_multiplier=10.):
+    """
+    Vectorized version of vector._are_close() with default arguments.
+    Returns an array of booleans.
+    """
+    a1 = numpy.asarray(a1, dtype=float)
+    a2 = numpy.asarray(a2, dtype=float)
+    vmax = numpy.maximum(numpy.maximum(abs(a1), abs(a2)), 1e-3)
+    return (a1 == a2) | (abs(a1 - a2) * vmax <= _E * epsilon_multiplier)
+
+
+class Vector3Array(object):
+    """
+    Ordered set of vectors in three-dimensional space.
+
+    Coordinates are stored internally as cartesian, in a numpy array of shape
+    (N, 3). Cylinder and spherical coordinates are computed on demand.
+
+    >>> a = Vector3Array([(1, 0, 0), (0, 1, 0), (0, 0, 1)])
+    >>> len(a)
+    3
+    >>> print a[1]
+    car (x=0, y=1, z=0)
+    >>> b = a + Vector3((1, 1, 1))
+    >>> b.car.tolist()
+    [[2.0, 1.0, 1.0], [1.0, 2.0, 1.0], [1.0, 1.0, 2.0]]
+    >>> a.dot(b).tolist()
+    [2.0, 2.0, 2.0]
+
+    Vector3Array can be constructed from a sequence of Vector3 instances:
+
+    >>> c = Vector3Array.from_vectors([Vector3(cyl=(1, pi2, 0)), Vector3((0, 0, 1))])
+    >>> c.is_close(a[1:]).tolist()
+    [True, True]
+    """
+
+    def __init__(self, car=None, cyl=None, sph=None):
+        """
+        Arguments car, cyl or sph are sequences of 3-tuples (or arrays of
+        shape (N, 3)) with coordinates in the cartesian, cylinder or spherical
+        CS, respectively. Without arguments, an empty set is created.
+        """
+        if car is not None:
+            a = numpy.array(car, dtype=float)
+        elif cyl is not None:
+            c = numpy.array(cyl, dtype=float).reshape(-1, 3)
+            r, t, z = c.T
+            a = numpy.column_stack((r*numpy.cos(t), r*numpy.sin(t), z))
+        elif sph is not None:
+            c = numpy.array(sph, dtype=float).reshape(-1, 3)
+            R, t, p = c.T
+            r = R*numpy.sin(p)
+            a = numpy.column_stack((r*numpy.cos(t), r*numpy.sin(t), R*numpy.cos(p)))
+        else:
+            a = numpy.zeros((0, 3))
+        self.__a = a.reshape(-1, 3)
+        return
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        """
+        Returns new instance containing vectors from the sequence of Vector3
+        instances.
+        """
+        return cls(car=[v.car for v in vectors])
+
+    def to_vectors(self):
+        """
+        Returns list of Vector3 instances.
+        """
+        return [Vector3._from_car(*c) for c in self.__a.tolist()]
+
+    def copy(self):
+        return self.__class__(car=self.__a)
+
+    @property
+    def car(self):
+        """
+        Array of shape (N, 3) with cartesian coordinates. This is the internal
+        array, not its copy.
+        """
+        return self.__a
+
+    @property
+    def x(self):
+        return self.__a[:, 0]
+
+    @property
+    def y(self):
+        return self.__a[:, 1]
+
+    @property
+    def z(self):
+        return self.__a[:, 2]
+
+    @property
+    def r(self):
+        """Radius in cylinder CS."""
+        return numpy.hypot(self.x, self.y)
+
+    @property
+    def t(self):
+        """Theta, in the interval [0, 2pi)."""
+        return numpy.arctan2(self.y, self.x) % (2*pi)
+
+    @property
+    def R(self):
+        """Radius in spherical CS, i.e. vector length."""
+        return numpy.sqrt((self.__a**2).sum(axis=1))
+
+    @property
+    def p(self):
+        """Phi, in the interval [0, pi]. For zero vectors phi is pi/2."""
+        p = numpy.arctan2(self.r, self.z)
+        p[(self.r == 0.) & (self.z == 0.)] = pi2
+        return p
+
+    @property
+    def cyl(self):
+        """Array of shape (N, 3) with cylinder coordinates (r, t, z)."""
+        return numpy.column_stack((self.r, self.t, self.z))
+
+    @property
+    def sph(self):
+        """Array of shape (N, 3) with spherical coordinates (R, t, p)."""
+        return numpy.column_stack((self.R, self.t, self.p))
+
+    def __len__(self):
+        return self.__a.shape[0]
+
+    def __iter__(self):
+        return iter(self.to_vectors())
+
+    def __getitem__(self, i):
+        """
+        Integer index returns a Vector3 instance, other indices (slices,
+        boolean masks, index arrays) return Vector3Array.
+        """
+        if isinstance(i, (int, long, numpy.integer)):
+            return Vector3._from_car(*self.__a[i])
+        return self.__class__(car=self.__a[i])
+
+    @staticmethod
+    def _other(othr):
+        """
+        Returns array that can be broadcast against (N, 3) array.
+        """
+        if isinstance(othr, Vector3Array):
+            return othr.__a
+        elif isinstance(othr, Vector3):
+            return numpy.array(othr.car)
+        raise TypeError('Cannot use {} as vector(s)'.format(repr(othr)))
+
+    def __add__(self, othr):
+        return self.__class__(car=self.__a + self._other(othr))
+
+    def __radd__(self, othr):
+        return self + othr
+
+    def __sub__(self, othr):
+        return self.__class__(car=self.__a - self._other(othr))
+
+    def __rsub__(self, othr):
+        return self.__class__(car=self._other(othr) - self.__a)
+
+    def __neg__(self):
+        return self.__class__(car=-self.__a)
+
+    def __mul__(self, v):
+        """
+        Multiplication by a scalar or by a sequence of N scalars.
+        """
+        v = numpy.asarray(v, dtype=float)
+        if v.ndim == 1:
+            v = v[:, numpy.newaxis]
+        return self.__class__(car=self.__a * v)
+
+    def __rmul__(self, v):
+        return self * v
+
+    def __div__(self, v):
+        return self * (1./numpy.asarray(v, dtype=float))
+
+    def dot(self, othr):
+        """Scalar products. Returns array of length N."""
+        return (self.__a * self._other(othr)).sum(axis=1)
+
+    def cross(self, othr):
+        """Vector products."""
+        return self.__class__(car=numpy.cross(self.__a, self._other(othr)))
+
+    def is_close(self, othr):
+        """
+        Returns boolean array, element i is True when the i-th vector is
+        close to the i-th vector of othr (or to othr, if it is a Vector3).
+
+        Vectors are close when their cartesian, cylinder or spherical
+        coordinates are close, as in Vector3.__eq__().
+        """
+        if isinstance(othr, Vector3):
+            othr = self.__class__(car=[othr.car])
+        elif not isinstance(othr, Vector3Array):
+            raise TypeError('Cannot compare with {}'.format(repr(othr)))
+        c1 = _are_close(self.car, othr.car).all(axis=1)
+        if c1.all():
+            return c1
+        t = _are_close(self.t, othr.t)
+        c2 = _are_close(self.r, othr.r) & t & _are_close(self.z, othr.z)
+        c3 = _are_close(self.R, othr.R) & t & _are_close(self.p, othr.p)
+        return c1 | c2 | c3
+
+    def __str__(self):
+        return 'Vector3Array of {} vectors'.format(len(self))
+
+    def __repr__(self):
+        return self.__str__()
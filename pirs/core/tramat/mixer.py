@@ -594,6 +594,8 @@ class Mixture(object):
         self.__a = []            # amount (instances of Amount class)
         self.__c = None          # recipe's given concentration. See conc, dens.
         self.__name = None       # recipe's given name.
+        self.__x = None          # cached expanded recipe, see expanded().
+        self.__dn = None         # cached derived name, see derived_name().
 
         # default names:
         du = kwargs.get('units', 1)
@@ -843,6 +845,23 @@ class Mixture(object):
         <    8017  16.8531> 0.00038 mol
         <    8018  17.8445> 0.00205 mol
 
+        """
+        # The expanded recipe depends only on the recipe content. It is cached
+        # together with the recipe state and recomputed only when the state
+        # changes, see _state().
+        s = self._state()
+        x = getattr(self, '_Mixture__x', None)
+        if x is None or x[0] != s:
+            x = (s, ) + self.__expanded()
+            self.__x = x
+        res = self.__class__(*x[1])  # amounts are copied by the constructor
+        res.conc = x[2]
+        return res
+
+    def __expanded(self):
+        """
+        Computes the expanded recipe. Returns the flat list of nuclides and
+        their amounts (in moles) and the concentration.
         """
         res = []
         for (m, a) in zip(self.__m, self.__a):
@@ -864,9 +883,25 @@ class Mixture(object):
                 em.normalize(a)
                 #
                 res += list(em.recipe())    # zip( em.__m, em.__a )
-        res = self.__class__(*res)
-        res.conc = self.conc
-        return res
+        return res, self.conc
+
+    def _state(self):
+        """
+        Returns a tuple describing the recipe content: the ingredients, their
+        amounts and the given concentration. Nested mixtures are described
+        recursively.
+
+        Two calls return equal tuples if the recipe was not changed between
+        them. This is used to check validity of cached results computed from
+        the recipe, like expanded() or derived_name().
+        """
+        st = []
+        for (m, a) in zip(self.__m, self.__a):
+            if isinstance(m, Nuclide):
+                st.append((m.ZAID, m.M(), a.v, a.t))
+            else:
+                st.append((m._state(), a.v, a.t))
+        return (self.__c, tuple(st))
 
     def collapsed(self, units=1):
         """
@@ -1286,6 +1321,14 @@ class Mixture(object):
         If the mixture consists of only one nuclide, the nuclide name will be
         used.
         """
+        s = self._state()
+        x = getattr(self, '_Mixture__dn', None)
+        if x is None or x[0] != s:
+            x = (s, self.__derived_name())
+            self.__dn = x
+        return x[1]
+
+    def __derived_name(self):
         e = self.expanded()
         if len(e.__m) == 1:
             return e.__m[0].name
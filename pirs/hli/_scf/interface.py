@@ -26,6 +26,7 @@ from . import convertors
 from . import standard_model
 
 from ... import scf
+from ...tools.timing import timed
 
 import os
 from math import pi
@@ -148,6 +149,7 @@ class ScfInterface(scf.model.Model):
         self._process_model()
         return super(ScfInterface, self).__str__()
 
+    @timed('scf.process_model')
     def _process_model(self, log=True):
         """
         This processes a general model that can be converted to a SCF standard
@@ -365,6 +367,7 @@ class ScfInterface(scf.model.Model):
 
         return 
 
+    @timed('scf')
     def run(self, mode='r', **kwargs):
         #self._process_model()
         super(ScfInterface, self).run(mode, **kwargs) # scf started here
@@ -377,6 +380,7 @@ class ScfInterface(scf.model.Model):
             nm = self.__gm.copy_tree()
         return nm
 
+    @timed('scf.read_output')
     def read_output(self):
         print 'read_output started'
         out = self.wp.output.exfile
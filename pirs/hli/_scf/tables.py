@@ -22,6 +22,16 @@ from ...core.trageom.vector import Vector3, pi
 
 import time
 
+from ...tools.timing import timed
+
+def _snap(x, y):
+    """
+    Returns key of the point (x, y) in dictionaries indexed by rod
+    coordinates. Coordinates are rounded to avoid round-off differences.
+    """
+    return (round(x, 9), round(y, 9))
+
+@timed('scf.rod_grid')
 def get_rod_grid(gm, rks, fks, xs, ys, zs, mats, warnings=False, log=True):
     """
     get a rectangular grid in which all rods (accessed by rks in gm) and fuel
@@ -50,43 +60,36 @@ def get_rod_grid(gm, rks, fks, xs, ys, zs, mats, warnings=False, log=True):
         TFORMAT='get_rod_grid:{} {}'
         t1 = time.time()
 
-    rLST = []
-    fLST = []
+    # rods and fuel elements indexed by their coordinates. If several
+    # elements have the same coordinates, the first one is taken.
+    rDCT = {}
+    fDCT = {}
     for k in rks:
         r = gm.get_child(k)
-        x = r.abspos().x/100.
-        y = r.abspos().y/100.
-        rLST.append((r, x, y, k))
+        p = r.abspos()
+        rDCT.setdefault(_snap(p.x/100., p.y/100.), (r, k))
     for k in fks:
         f = gm.get_child(k)
-        x = f.abspos().x/100.
-        y = f.abspos().y/100.
-        fLST.append((f, x, y, k))
-
-
-    def find_rod(gm, x, y):
-        for (r, rx, ry, rk) in rLST:
-            if x == rx and y == ry:
-                return (r, rk)
-        else:
-            return (None, None)
-            
-
-    def find_fuel(gm, x, y):
-        for (f, fx, fy, fk) in fLST:
-            if x == fx and y == fy:
-                return f
-        else:
-            return None
+        p = f.abspos()
+        fDCT.setdefault(_snap(p.x/100., p.y/100.), f)
 
     empty = map(lambda z: [z, 0], zs)
 
     g = {}
-    m = []
+    m = []   # list of material combinations
+    mi = {}  # material combination -> its index in m, starting from 1
+
+    def mindex(mat):
+        if mat not in mi:
+            m.append(mat)
+            mi[mat] = len(m)
+        return mi[mat]
+
     for y in ys:
         for x in xs:
-            r, key = find_rod(gm, x, y)
-            f = find_fuel(gm, x, y)
+            xy = _snap(x, y)
+            r, key = rDCT.get(xy, (None, None))
+            f = fDCT.get(xy, None)
             if r is not None:
 
                 rr = r.R / 100.0
@@ -120,8 +123,6 @@ def get_rod_grid(gm, rks, fks, xs, ys, zs, mats, warnings=False, log=True):
                     puf = 0.
 
                 mat = (mats[r.material], fm, fd, thick, vol, puf)
-                if mat not in m: # inefficient
-                    m.append(mat)
 
                 if f is not None:
                     ah = axial_heat(f, x, y, zs)
@@ -132,7 +133,7 @@ def get_rod_grid(gm, rks, fks, xs, ys, zs, mats, warnings=False, log=True):
                       'area':      pi * rr**2,
                       'perimeter': pi * 2 * rr,
                       'heated':    f is not None,
-                      'material':  m.index(mat) + 1,
+                      'material':  mindex(mat),
                       'axial':     ah,
                       'key':       key,
                       'fake':      False }
@@ -145,11 +146,9 @@ def get_rod_grid(gm, rks, fks, xs, ys, zs, mats, warnings=False, log=True):
                 if warnings:
                     print 'warning: fake rod at {0}/{1}'.format(x, y)
                 mat = ('zircaloy', 'uo2', mini, mini, mini)
-                if mat not in m: # inefficient
-                    m.append(mat)
 
                 v = { 'diameter': mid, 'area': mia, 'perimeter': mip, 'heated': False,
-                        'material': m.index(mat) + 1, 'axial': empty, 'key': key,
+                        'material': mindex(mat), 'axial': empty, 'key': key,
                         'fake': True}
 
             g[(x,y)]=v
@@ -401,8 +400,10 @@ def channel_tables(grid, xs, ys, down, up, left, right, wrapped):
     
     """
 
-    borders = (left, right, down, up)
-    constraints = (grid, xs, ys, wrapped, borders)
+    # coordinates of rods and of the cell walls, computed once for all
+    # channels (cf. make_channel())
+    cxs = [left] + list(xs) + [right]
+    cys = [down] + list(ys) + [up]
 
     chans = []
     nbors = []
@@ -410,7 +411,8 @@ def channel_tables(grid, xs, ys, down, up, left, right, wrapped):
     c = 1
     for yi in range(len(ys)+1):
         for xi in range(len(xs)+1):
-            (row, nrow, box) = make_channel(c, xi, yi, constraints)
+            (cx, cy, crr, crt, row) = channel_row(c, grid, [(cxs[xi], cys[yi]), (cxs[xi+1], cys[yi+1])], wrapped)
+            (box, nrow) = channel_neighbour_row(cxs, cys, xi+1, yi+1, c, crr, crt)
             chans.append(row)
             nbors.append(nrow)
             boxes.append(box)
@@ -486,6 +488,7 @@ def rod_diameter_average(grid):
 
     return float(diamt_sum) / rod_count
 
+@timed('scf.tables')
 def calculate_tables(gm, coolant_key, rod_keys, fuel_keys, mdict, wrapped, log=True):
     """
     For the general model gm compute the subchannel grid and return contents
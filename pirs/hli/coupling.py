@@ -0,0 +1,317 @@
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#at
+# Author: Anton Travleev, anton.travleev@kit.edu
+# Developed at INR, Karlsruhe Institute of Technology
+#at
+
+"""
+Coupled MCNP -- SCF iterations.
+
+The Coupling class implements the iteration scheme used in the
+examples/pwr_bench/driver.py script: the number of histories grows from
+iteration to iteration, MCNP heat and Keff are relaxed with weights
+proportional to the number of histories, and the relaxed heat is passed to
+SCF.
+"""
+
+import gc
+import os
+import time
+from datetime import datetime
+
+from ..solids.functions import max_diff, max_var
+from ..tools import dump, Checkpoint, timers, timer
+
+
+class Coupling(object):
+    """
+    Coupled MCNP -- SCF iterations.
+
+    MI is an instance of McnpInterface, SI an SCF interface (scf2 or _scf).
+    The general model is taken from SI.gm; SCF must be run with the initial
+    heat distribution before the iterations start, see start().
+
+    >>> C = Coupling(MI, SI)
+    >>> C.tprec = {'fuel': 10., -1: 1.}
+    >>> C.start()
+    >>> C.run(Nmax=20)
+    >>> print C.report()
+
+    In each iteration, the total number of histories s is defined from the
+    number of histories s1 in the first iteration and the cumulative number
+    of histories Ss in all previous iterations::
+
+        s = 0.5*(s1 + (s1**2 + 4*s1*Ss)**0.5)
+
+    The MCNP heat and Keff are relaxed with the weight a = s/(Ss + s).
+
+    After each iteration, the following residuals are computed: dT, the
+    maximal change of temperature in the SCF run, and dP, the maximal change
+    of the relaxed heat, relative to the maximal heat. When the MCNP heat is
+    read with uncertainties, the statistical noise of the relaxed heat, i.e.
+    a times the power-weighted mean relative error of the MCNP heat, is
+    computed as well.
+
+    Iterations stop when dT < tolT and dP < tolP, or when dP is below the
+    noise: in this case, the temperature change is caused by the statistical
+    noise as well, and further iterations only average it.
+
+    When the attribute adaptive is True (default) and the noise is known,
+    the number of histories is not increased while dP exceeds the noise by
+    more than the factor noise_factor: in early iterations, the change of
+    the solution is dominated by the iteration error, not by the statistics,
+    and more histories would be wasted.
+    """
+    def __init__(self, MI, SI):
+        self.MI = MI
+        self.SI = SI
+
+        #: Number of histories in the first iteration. By default, taken from
+        #: MI.kcode.
+        self.s1 = MI.kcode.Nct * MI.kcode.Nh
+        #: Cumulative number of histories.
+        self.Ss = 0
+        #: Iteration counter.
+        self.Ic = 0
+        # "Initial" values of Keff, to simplify comparison with the previous
+        # iteration.
+        self.Keff = [1.]
+        self.Kerr = [1.]
+        self.Krel = [0.]
+
+        #: Dictionary element name -> temperature precision set to the
+        #: temperature meshes of the MCNP model, see zmesh.prec.
+        self.tprec = {}
+        #: Keyword arguments for MI.run(), e.g. tasks.
+        self.mcnp_kwargs = {}
+        #: Tolerances for the temperature (K) and the relative heat residuals.
+        self.tolT = 1.
+        self.tolP = 1e-3
+        self.adaptive = True
+        self.noise_factor = 3.
+        #: When set, results of each iteration are dumped to the file
+        #: prefix + 'iteration_NNN.dump'.
+        self.prefix = None
+        #: Instance of tools.Checkpoint. When set, the interfaces are written
+        #: to its skeleton file once, and in each iteration only the axial
+        #: distributions of SI.gm and MI.gm and the iteration state are
+        #: written. See from_checkpoint().
+        self.checkpoint = None
+        #: When set, the report of the stage timers (see tools.timing) is
+        #: written after each iteration to the file with this name in the
+        #: last MCNP workplace directory (or in the current directory).
+        self.timing_report = 'timing.report'
+
+        #: List of dictionaries with results of each iteration.
+        self.history = []
+        return
+
+    def start(self):
+        """
+        Runs SCF with the heat currently set to SI.gm, to get the initial
+        temperature distribution.
+        """
+        self.SI.run('R')
+        return
+
+    def histories(self):
+        """
+        Returns the number of histories for the next iteration.
+        """
+        s1 = float(self.s1)
+        s = 0.5*(s1 + (s1**2 + 4.*s1*self.Ss)**0.5)
+        if self.adaptive and self.history:
+            h = self.history[-1]
+            if h['noise'] is not None and h['dP'] > self.noise_factor * h['noise']:
+                # iteration error dominates, do not increase statistics.
+                s = min(s, h['s'])
+        return s
+
+    def iteration(self):
+        """
+        Performs one iteration. Returns a dictionary with iteration results,
+        which is also appended to the history list.
+        """
+        MI = self.MI
+        SI = self.SI
+        if MI.wp.srctp.defined and MI.adc and 'ksrc' in MI.adc[-1]:
+            # remove ksrc. Previous srctp will be used.
+            MI.adc.pop()
+
+        self.Ic += 1
+        timers.reset()
+        print
+        print '----- Iteration {0} --- {1}'.format(self.Ic, datetime.now().strftime('%H:%M:%S'))
+
+        # MC run
+        s = self.histories()
+        MI.kcode.Nh = int(s / MI.kcode.Nct)
+        MI.gm = SI.gm.copy_tree()
+        for e in MI.gm.temps():
+            if e.name in self.tprec:
+                e.temp.prec = self.tprec[e.name]
+        t0 = time.time()
+        MI.run('R', **self.mcnp_kwargs)
+        t1 = time.time()
+        with timer('coupling.keff'):
+            keff, err = MI.keff()
+        self.Keff.append(keff)
+        self.Kerr.append(err)
+
+        # Do not propagate uncertainties to SCF
+        if MI.tallyCollection.use_uncertainties:
+            noise = _noise(MI.gm)
+            nomvals = MI.gm.copy_tree()
+            for e in nomvals.heats():
+                e.heat.convert(lambda v: v.nominal_value)
+        else:
+            noise = None
+            nomvals = MI.gm
+
+        # Relaxation
+        self.Ss += s
+        a = float(s) / float(self.Ss)
+        with timer('coupling.relaxation'):
+            old = SI.gm.copy_tree()
+            for (se, me) in zip(SI.gm.heats(), nomvals.heats()):
+                h = a*me.heat + (1.-a)*se.heat
+                se.heat.update(h)
+            dP = max_diff(old, SI.gm, 'heat')[2]
+            hmax = max_var(old, 'heat')[0]
+        krel = a*keff + (1.-a)*self.Krel[-1]
+        self.Krel.append(krel)
+        if hmax != 0.:
+            dP /= abs(hmax)
+        if noise is not None:
+            noise *= a
+
+        # TH run
+        t2 = time.time()
+        SI.run('R')
+        t3 = time.time()
+        dT = max_diff(old, SI.gm, 'temp')[2]
+
+        h = {'Ic': self.Ic, 's': s, 'a': a,
+             'keff': keff, 'kerr': err, 'krel': krel,
+             'dT': dT, 'dP': dP, 'noise': noise,
+             'mcnp_time': t1 - t0, 'scf_time': t3 - t2,
+             'timers': timers.items()}
+        self.history.append(h)
+        print '   ' + self._line(h)
+        if self.timing_report:
+            d = getattr(MI.wp, 'lcd', None) or os.curdir
+            timers.write(os.path.join(d, self.timing_report))
+
+        if self.prefix is not None:
+            MI.clear()
+            MI.wp.inp.string = ''
+            SI.clear()
+            SI.wp.input.string = ''
+            dump(self.prefix + 'iteration_{0:03d}.dump'.format(self.Ic), coupling=self)
+        if self.checkpoint is not None:
+            self.write_checkpoint()
+        gc.collect()
+        return h
+
+    # Attributes written to checkpoints in each iteration.
+    _state = ('s1', 'Ss', 'Ic', 'Keff', 'Kerr', 'Krel', 'tprec', 'mcnp_kwargs',
+              'tolT', 'tolP', 'adaptive', 'noise_factor', 'history')
+
+    def write_checkpoint(self):
+        """
+        Writes state of the current iteration to self.checkpoint. The
+        interfaces are written to the skeleton file at the first call.
+        """
+        ck = self.checkpoint
+        if ck.objects is None:
+            self.MI.clear()
+            self.MI.wp.inp.string = ''
+            self.SI.clear()
+            self.SI.wp.input.string = ''
+            ck.write_skeleton(MI=self.MI, SI=self.SI)
+        state = dict((n, getattr(self, n)) for n in self._state)
+        ck.write(self.Ic, ['SI.gm', 'MI.gm'], **state)
+        return
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, Ic=None):
+        """
+        Returns new instance restored from the checkpoint of iteration Ic (by
+        default, the last written one). Calling run() continues iterations.
+        """
+        d = checkpoint.read(Ic)
+        c = cls(d['MI'], d['SI'])
+        for n in cls._state:
+            setattr(c, n, d[n])
+        c.checkpoint = checkpoint
+        return c
+
+    def converged(self):
+        """
+        True if the last iteration satisfies the convergence criteria.
+        """
+        if not self.history:
+            return False
+        h = self.history[-1]
+        if h['dT'] < self.tolT and h['dP'] < self.tolP:
+            return True
+        return h['noise'] is not None and h['dP'] < h['noise']
+
+    def run(self, Nmax=10, Nmin=2):
+        """
+        Performs at least Nmin and at most Nmax iterations; stops when the
+        convergence criteria are satisfied. Returns True if converged.
+        """
+        for i in range(Nmax):
+            self.iteration()
+            if i + 1 >= Nmin and self.converged():
+                return True
+        return False
+
+    @staticmethod
+    def _line(h):
+        if h['noise'] is None:
+            n = '-'
+        else:
+            n = '{0:.2e}'.format(h['noise'])
+        return ('{Ic:3d} s={s:.3e} a={a:.3f} keff={keff:.5f}+-{kerr:.5f} '
+                'krel={krel:.5f} dT={dT:.2f} dP={dP:.2e} noise={0} '
+                'mcnp={mcnp_time:.0f}s scf={scf_time:.0f}s').format(n, **h)
+
+    def report(self):
+        """
+        Returns multi-line string with results of all iterations.
+        """
+        return '\n'.join(self._line(h) for h in self.history)
+
+
+def _noise(gm):
+    """
+    Returns power-weighted mean relative error of the heat in the model gm.
+    Heat values must be of the uncertainties.Variable type.
+    """
+    sv = 0.
+    se = 0.
+    for e in gm.heats():
+        for v in e.heat.values():
+            sv += abs(v.nominal_value)
+            se += v.std_dev
+    if sv == 0.:
+        return None
+    return se / sv
@@ -33,8 +33,10 @@ import random
 
 from ... import mcnp
 from ...solids import Sphere, Box, Cylinder
+from ...solids.spatial import SpatialIndex
 from .convertors import solid2surface, solid2volume, zmesh2volumes, zmesh2mtally, grid2tally, base_element2volume
 from ...core import scheduler
+from ...tools.timing import timer, timed
 
 _LOG = False #True
 
@@ -291,8 +293,97 @@ class McnpInterface(mcnp.model.Model):
         self.__mdefa = mcnp.Material(1001) # default material
         self.__mdefd = 1.0e-5 # default material density
         self.__bc = {'axial':'', 'radial':''}
+        self.__inc = False  # incremental mode
+        self.__prev = None  # cell states from the previous call to _process_model
+        self.__istat = None # statistics for incremental_report
         super(McnpInterface, self).__init__( **kwargs )
 
+    @property
+    def incremental(self):
+        """
+        Incremental mode of the input file generation, for repeated runs of
+        the same model with changed temperatures and densities (e.g. in
+        coupling iterations).
+
+        When True, material cards are generated only for combinations of
+        material and temperature that did not appear in the previous input
+        files; cards for other materials are reused. Cells whose material,
+        temperature or density changed with respect to the previous input
+        file are counted, see incremental_report.
+
+        Instances of mcnp.Material in the materials dictionary must not be
+        changed while incremental mode is on. To apply such changes, switch
+        the incremental mode off and on again.
+        """
+        return self.__inc
+
+    @incremental.setter
+    def incremental(self, value):
+        self.__inc = bool(value)
+        self.materialCollection.cache_cards = self.__inc
+        self.materialCollection.clear_cache()
+        self.__prev = None
+        self.__istat = None
+
+    @property
+    def incremental_report(self):
+        """
+        String describing what was regenerated in the last input file, in the
+        incremental mode.
+        """
+        if self.__istat is None:
+            return 'No input generated in incremental mode'
+        nc, nch, same = self.__istat
+        mc = self.materialCollection
+        res = []
+        if same:
+            res.append('cells: {0}, with changed material, temperature or density: {1}'.format(nc, nch))
+        else:
+            res.append('cells: {0}, cell structure changed, all cells regenerated'.format(nc))
+        res.append('material cards: {0}, generated: {1}'.format(mc.cards_reused + mc.cards_generated, mc.cards_generated))
+        return '\n'.join(res)
+
+    @property
+    def tprec(self):
+        """
+        Width of temperature bins for material cards, K.
+
+        When positive, cell temperatures are rounded to the nearest multiple
+        of tprec when the material cards are generated, similar to the prec
+        attribute of zmesh. Cells with the same material and temperatures in
+        the same bin share one material card. The cell tmp entries are not
+        rounded. By default, tprec is 0 and each temperature gets its own
+        material card.
+
+        This is the tprec attribute of the material collection, see
+        mcnp.MaterialCollection.
+        """
+        return self.materialCollection.tprec
+
+    @tprec.setter
+    def tprec(self, value):
+        self.materialCollection.tprec = float(value)
+
+    def __cell_states(self):
+        """
+        Returns lists describing cell structure and cell material, temperature
+        and density, used to compare cells of successive input files.
+        """
+        skl = []
+        stl = []
+        for c in self.cells:
+            o = c.opt
+            skl.append((o.getvalue('u'), o.getvalue('fill'), o.getvalue('lat'), c.cmt))
+            m = c.mat
+            if isinstance(m, tuple):
+                mk = (id(m[0]), tuple(sorted(m[1].items())))
+            elif isinstance(m, int):
+                mk = m
+            else:
+                mk = id(m)
+            stl.append((mk, c.rho))
+        return skl, stl
+
 
     @property
     def materials(self):
@@ -376,13 +467,51 @@ class McnpInterface(mcnp.model.Model):
         s1 =  super(McnpInterface, self).__str__()
         return s1
 
+    def iter_input(self):
+        """
+        Generator yielding lines of the MCNP input file for the general model,
+        see mcnp.Model.iter_input().
+
+        Note that all MCNP cells representing the general model are
+        generated by _process_model() before the first line is yielded; only
+        the generation and formatting of single cards is streamed.
+        """
+        self._process_model()
+        for l in super(McnpInterface, self).iter_input():
+            yield l
+
     
+    def _apply_grid_tally(self, tally):
+        """
+        Puts results of the grid tally to the heat meshes of rods.
+
+        Tally values are reshaped to (Nx, Ny, Nz) and axial distributions
+        are taken only for the rods, using the rod index prepared in
+        _process_tallies(). Values with uncertainties are taken from the
+        values list.
+        """
+        Nx, Ny, Nz = tally._shape
+        a = tally.value_array
+        if len(a) != Nx*Ny*Nz:
+            raise ValueError('Tally {0} has {1} values, expected {2}'.format(tally, len(a), Nx*Ny*Nz))
+        if tally.uncertainties or not hasattr(a, 'reshape'):
+            vals = tally.values
+            for r, (i, j) in tally._rodindex:
+                n = (i*Ny + j)*Nz
+                r.heat.set_values(vals[n:n+Nz])
+        else:
+            a = a.reshape(Nx, Ny, Nz)
+            for r, (i, j) in tally._rodindex:
+                r.heat.set_values(a[i, j].tolist())
+        return
+
+    @timed('mcnp.process_tallies')
     def _process_tallies(self):
         log = _LOG
 
         # first, ensure to delete attributes from previous run:
         for v in self.__gm.values(True):
-            for a in ['_element', '_rods', '_grid', '_tally']:
+            for a in ['_element', '_rods', '_grid', '_tally', '_shape', '_rodindex']:
                 if hasattr(v, a): delattr(v, a)
 
 
@@ -421,8 +550,21 @@ class McnpInterface(mcnp.model.Model):
                         r0.heat.unify(r.heat)
                     # create meshtally
                     mt = grid2tally(v, r0)
+                    if mt.emesh != [0]:
+                        # _apply_grid_tally() expects one value per mesh element
+                        raise ValueError('Grid tally with energy bins is not supported: {0}'.format(mt))
                     mt._rods = validrods
                     mt._grid = v
+                    # Shape of the tally results and index of each rod's
+                    # axial distribution in the tally, used in run() to put
+                    # the results to the rods.
+                    imin, imax = v.grid.extension('x')
+                    jmin, jmax = v.grid.extension('y')
+                    Ny = jmax - jmin + 1
+                    mt._shape = (imax - imin + 1, Ny, len(r0.heat.get_grid()))
+                    mt._rodindex = []
+                    for r, (i, j, k) in validrods:
+                        mt._rodindex.append((r, (i - imin, j - jmin)))
                     if log:
                         print 'mesh tally\n', mt
                     It = self.tallyCollection.index(mt)
@@ -448,6 +590,7 @@ class McnpInterface(mcnp.model.Model):
 
 
 
+    @timed('mcnp.process_model')
     def _process_model(self):
         log = _LOG
         if log:
@@ -475,28 +618,47 @@ class McnpInterface(mcnp.model.Model):
         Zmin, Zmax = self.__pm.extension('z')
         self.__whole_volume = mcnp.Surface('pz {0}'.format(Zmin - 1000.)).volume()
 
-        self._process_tallies()
-        if log:
-            print 'tallies generated'
-
-
-        # if axial and radial bc are different, do not use macrobody for the model boundary:
-        # add surfaces that can contain reflective b.c. in advance:
-        ref = self.__gm.get_child(self.__bc.get('key', ())) # element whose surfaaces can be reflective
-        if self.__bc['axial'] != self.__bc['radial']:
-            for z in ref.extension('z'):
-                self.surfaceCollection.index(mcnp.surfaces.Surface(type='pz', plst=[z], refl=self.__bc['axial']))
-        self.surfaceCollection.index(solid2surface(ref, refl=self.__bc['radial']))
-
-        self.__pm.insert(self.__gm) 
-        self._add_interior(self.__pm, self.__pm.__u, 'Container for model', importance=0)
-        time2 = time.time()
-        self.process_model_time = time2 - time1 
-        self.__gm.withdraw()
+        # Positions of the model elements are not changed while the model is
+        # processed. Absolute positions can be cached:
+        self.__gm.cache_abspos(True)
+        try:
+            self._process_tallies()
+            if log:
+                print 'tallies generated'
+
+
+            # if axial and radial bc are different, do not use macrobody for the model boundary:
+            # add surfaces that can contain reflective b.c. in advance:
+            ref = self.__gm.get_child(self.__bc.get('key', ())) # element whose surfaaces can be reflective
+            if self.__bc['axial'] != self.__bc['radial']:
+                for z in ref.extension('z'):
+                    self.surfaceCollection.index(mcnp.surfaces.Surface(type='pz', plst=[z], refl=self.__bc['axial']))
+            self.surfaceCollection.index(solid2surface(ref, refl=self.__bc['radial']))
+
+            self.__pm.insert(self.__gm) 
+            self.__pm.cache_abspos(True)
+            self._add_interior(self.__pm, self.__pm.__u, 'Container for model', importance=0)
+            time2 = time.time()
+            self.process_model_time = time2 - time1 
+        finally:
+            # the model is returned to the user: switch off the cache, which
+            # would not notice later in-place changes of positions.
+            self.__gm.withdraw()
+            self.__pm.cache_abspos(False)
+            self.__gm.cache_abspos(False)
+        if self.__inc:
+            skl, stl = self.__cell_states()
+            if self.__prev is not None and self.__prev[0] == skl:
+                nch = sum(1 for (s1, s2) in zip(self.__prev[1], stl) if s1 != s2)
+                self.__istat = (len(stl), nch, True)
+            else:
+                self.__istat = (len(stl), len(stl), False)
+            self.__prev = (skl, stl)
         if log:
             print '{0} cells generated.'.format(len(self.cells))
         return
 
+    @timed('mcnp.add_lattice')
     def _add_lattice(self, element, u, element_name):
         log = _LOG
         if log:
@@ -559,13 +721,17 @@ class McnpInterface(mcnp.model.Model):
 
             Nc = len(element.children)
             stack = []
+            # only children with overlapping bounding boxes can intersect:
+            si = SpatialIndex(element.children, element)
             # add cells that describe containers of children:
             for Ic in range(Nc):
                 child = element.children[Ic]
                 cell = mcnp.Cell()
                 self.cells.append(cell)
                 vol = -child.__vol
-                for Ioc in range(Ic+1, Nc):
+                for Ioc in si.neighbours(Ic):
+                    if Ioc <= Ic:
+                        continue
                     ochild = element.children[Ioc]
                     if child.intersect(ochild):
                         vol = vol & ochild.__vol
@@ -740,6 +906,7 @@ class McnpInterface(mcnp.model.Model):
         res.append( 'end' )
         return '\n'.join(res)
 
+    @timed('mcnp.read_meshtal')
     def read_meshtal(self, meshtal='meshtal'):
         """
         Reads meshtall to the correspondent meshtallies and returns the copy of the general model containing read values.
@@ -750,13 +917,37 @@ class McnpInterface(mcnp.model.Model):
             rm.get_child(mt.__ckey).heat.set_values(mt.values)
         return rm
 
+    @timed('mcnp')
     def run(self, mode, **kwargs):
+        """
+        Writes the MCNP input for the general model and runs MCNP in mode,
+        see McnpWorkPlace.run(). Returns the general model with computed
+        heat.
+
+        Keyword arguments are passed to the workplace. If wait=False is
+        given, the job future is returned immediately; in modes 'C' and 'R'
+        the tally results are put to the model when its result() method is
+        called.
+        """
         # if not continue, generate input file
         # here the _process_model is called. So, this step must be before
         # plot_commands.
         if mode.lower() != 'c':
-            self.wp.inp.string = str(self)
-            print '   MCNP input file generated in {0} seconds'.format(self.process_model_time)
+            # The input file is written card by card directly to the
+            # workplace, when it is prepared. Cells are generated from the
+            # general model at that moment, before the first card is written.
+            def lines():
+                for l in self.iter_input():
+                    yield l
+                print '   MCNP input file generated in {0} seconds'.format(self.process_model_time)
+                print '   ' + self.materialCollection.report()
+                if self.__inc:
+                    print '   ' + self.incremental_report.replace('\n', '\n   ')
+            if mode.lower() == 'p':
+                # plot commands below require the processed model
+                self.wp.inp.string = list(lines())
+            else:
+                self.wp.inp.string = lines
 
         # if plot mode, provide plot commands to the workplace
         if mode.lower() == 'p':
@@ -768,40 +959,20 @@ class McnpInterface(mcnp.model.Model):
         if mode.lower() == 'z':
             self.wp.com.exfile = 'commesh'
 
-        # run the job
-        self.wp.run(mode, **kwargs)
+        # run the job. The input file is written here.
+        with timer('mcnp.run'):
+            fut = self.wp.run(mode, **kwargs)
 
         # read meshtally
         nm = self.__gm # .copy_tree()
         if mode in 'cCrR':
             if mode.isupper():
                 # put computed results to the returned model.
-                self.tallyCollection.read(self.wp.meshtal.exfile)
-                for (tn, tally) in self.tallyCollection.items():
-                    try:
-                        # if _rods attribute is defined -- this is a grid tally containing results for all rods.
-                        rods = tally._rods
-                    except AttributeError:
-                        # this is tally for single rod
-                        tally._element.heat.set_values(tally.values)
-                    else:
-                        imin, imax = tally._grid.grid.extension('x') 
-                        jmin, jmax = tally._grid.grid.extension('y') 
-                        Nx = imax - imin + 1 
-                        Ny = jmax - jmin + 1
-                        Nz = len(rods[0][0].heat.get_grid())
-                        for r, ijk in rods:
-                            i, j, k = ijk
-                            i = i - imin
-                            j = j - jmin
-                            n = i*Ny + j
-                            vals = tally.values[n*Nz:(n+1)*Nz]
-                            r.heat.set_values(vals)
-                            # print 'heat set '
-                            # print ijk, r.name, r.material, r.abspos()
-                            # print vals
-                        
-                print '   MCNP run took {0} seconds'.format(self.wp.run_time)
+                if fut is not None:
+                    # MCNP is still running, results are read when it is done.
+                    fut.add_callback(lambda f: self._get_tally_results())
+                    return fut
+                self._get_tally_results()
             else:
                 # MCNP was not actually started. Put some values to the returned model.
                 random.seed()
@@ -820,8 +991,30 @@ class McnpInterface(mcnp.model.Model):
                     else:
                         for r, ijk in rods:
                             r.heat.set_values_by_function(f, '1')
+        elif fut is not None:
+            return fut
             
         return nm
+
+    @timed('mcnp.read_meshtal')
+    def _get_tally_results(self):
+        """
+        Reads meshtal of the last MCNP run and puts tally results to the
+        general model.
+        """
+        self.tallyCollection.read(self.wp.meshtal.exfile)
+        for (tn, tally) in self.tallyCollection.items():
+            try:
+                # if _rods attribute is defined -- this is a grid tally containing results for all rods.
+                rods = tally._rods
+            except AttributeError:
+                # this is tally for single rod
+                tally._element.heat.set_values(tally.values)
+            else:
+                self._apply_grid_tally(tally)
+
+        print '   MCNP run took {0} seconds'.format(self.wp.run_time)
+        return
             
 
 
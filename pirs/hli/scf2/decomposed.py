@@ -0,0 +1,218 @@
+"""
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Interface for large box containers, decomposed into assembly-sized parts
+computed by independent SCF runs.
+"""
+
+from .convertors import isheated
+from .interface import Model
+from ...core.scheduler import Scheduler, as_completed
+from ...solids import Box
+from ...tools.timing import timed
+
+
+class DecomposedModel(Model):
+    """
+    SCF interface, where the container grid of the general model is
+    partitioned into blocks of N x N rods. For each block, a separate SCF
+    input is prepared in its own workplace; SCF jobs run simultaneously, at
+    most max_workers at a time (by default, the number of CPUs).
+
+    SCF input data and parameters of the sub-models are copies of self, see
+    Model.copy(). The total power and the inlet flow rate, if specified,
+    are distributed among blocks proportionally to the block's heat and to
+    the number of rods in the block, respectively. Inlet mass flux and
+    average heat flux are not changed.
+
+    Results of all blocks are put back into the general model, as if SCF
+    was run for the whole model. Note that the cross-flow between blocks is
+    neglected: each block is computed with closed lateral boundaries.
+
+    >>> SI = DecomposedModel(gm, N=17, max_workers=4)
+    >>> SI.total_power = 70e6
+    >>> SI.run('R')
+    """
+    def __init__(self, gm=None, N=17, max_workers=None):
+        #: Number of rods along each side of a block.
+        self.N = N
+        #: Maximal number of simultaneous SCF jobs.
+        self.max_workers = max_workers
+        # list of tuples (sub-model, (I0, J0)), prepared by decompose().
+        self.__subs = []
+        super(DecomposedModel, self).__init__(gm)
+        return
+
+    @property
+    def submodels(self):
+        """
+        List of sub-models, as prepared by the last call to decompose().
+        """
+        return [s for (s, ij) in self.__subs]
+
+    @timed('scf.decompose')
+    def decompose(self):
+        """
+        Partitions the general model into sub-models, one per block of N x N
+        rods, and returns the list of sub-models.
+        """
+        gm = self.gm
+        gm.remove_by_criteria(name=-1)
+        rods = [r for r in gm.children if None not in r.ijk]
+        if not rods:
+            raise ValueError('No elements inserted into the grid of the general model')
+        Imin = min(r.i for r in rods)
+        Imax = max(r.i for r in rods)
+        Jmin = min(r.j for r in rods)
+        Jmax = max(r.j for r in rods)
+        N = self.N
+
+        blocks = {} # (bi, bj) -> list of rods
+        for r in rods:
+            key = ((r.i - Imin) // N, (r.j - Jmin) // N)
+            blocks.setdefault(key, []).append(r)
+
+        # Heat of rods, to distribute the total power among blocks.
+        heat = {}
+        for r in rods:
+            h = isheated(r)
+            if h is not None:
+                h = h.mean()
+                heat[r] = abs(getattr(h, 'nominal_value', h))
+            else:
+                heat[r] = 0.
+        hsum = sum(heat.values())
+
+        # Total power and flow rate, as they will be written to the input
+        tp = self.total_power
+        if tp is None:
+            tp = self.find('total_power')[0].value
+        ifr = self.inlet_flow_rate
+        if ifr is None:
+            ifr = self.find('inlet_flow_rate')[0].value
+
+        Xmin, Xmax = gm.extension('x', 'rel')
+        Ymin, Ymax = gm.extension('y', 'rel')
+        gx = gm.grid.x
+        gy = gm.grid.y
+
+        self.__subs = []
+        for (bi, bj) in sorted(blocks.keys()):
+            brods = blocks[(bi, bj)]
+            I0 = Imin + bi*N
+            J0 = Jmin + bj*N
+            I1 = min(I0 + N - 1, Imax)
+            J1 = min(J0 + N - 1, Jmax)
+
+            # Block boundaries. At the container boundary, the container's
+            # dimensions are taken.
+            x0 = gm.grid.position(I0, J0, 0, 'x')
+            y0 = gm.grid.position(I0, J0, 0, 'y')
+            xl = Xmin if I0 == Imin else x0 - gx*0.5
+            yl = Ymin if J0 == Jmin else y0 - gy*0.5
+            xr = Xmax if I1 == Imax else gm.grid.position(I1, J1, 0, 'x') + gx*0.5
+            yr = Ymax if J1 == Jmax else gm.grid.position(I1, J1, 0, 'y') + gy*0.5
+
+            b = Box(X=xr - xl, Y=yr - yl, Z=gm.Z)
+            b.material = gm.material
+            b.temp = gm.temp.copy(b)
+            b.dens = gm.dens.copy(b)
+            b.grid.x = gx
+            b.grid.y = gy
+            b.grid.z = gm.grid.z
+            b.grid.set_origin((0, 0, 0), (x0 - (xl + xr)*0.5,
+                                          y0 - (yl + yr)*0.5,
+                                          gm.grid.origin.z))
+            for r in brods:
+                b.grid.insert((r.i - I0, r.j - J0, r.k), r.copy_tree())
+
+            sub = self.copy(b)
+            sub.wp.prefix = '{0}_{1}_{2}_'.format(self.wp.prefix, bi, bj)
+            if tp:
+                if hsum > 0.:
+                    sub.total_power = tp * sum(heat[r] for r in brods) / hsum
+                else:
+                    sub.total_power = tp * len(brods) / float(len(rods))
+            if ifr:
+                sub.inlet_flow_rate = ifr * len(brods) / float(len(rods))
+            self.__subs.append((sub, (I0, J0)))
+        return self.submodels
+
+    def __str__(self):
+        """
+        Returns inputs of all sub-models, separated by comment lines.
+        """
+        self.decompose()
+        res = []
+        for (sub, (I0, J0)) in self.__subs:
+            res.append('# block at grid element ({0}, {1})'.format(I0, J0))
+            res.append(str(sub))
+        return '\n'.join(res)
+
+    @timed('scf')
+    def run(self, mode, outp='r', **kwargs):
+        """
+        Decomposes the general model and prepares workplaces for all
+        sub-models. If mode is 'R', SCF jobs are started and the results are
+        put into the general model, which is returned.
+
+        Keyword arguments are passed to the workplace, see
+        ScfWorkPlace.run(). The scheduler keyword argument, if not given, is
+        created with max_workers.
+        """
+        if mode not in 'rR':
+            raise ValueError('Unknown mode {}'.format(mode))
+        self.decompose()
+        kwargs.setdefault('scheduler', Scheduler(self.max_workers))
+        kwargs['wait'] = False
+        futures = {}
+        for (sub, ij) in self.__subs:
+            f = sub.run(mode, outp, **kwargs)
+            if mode == 'R':
+                futures[f] = (sub, ij)
+        for f in as_completed(futures.keys()):
+            f.result()
+            sub, ij = futures[f]
+            self._merge(sub, ij)
+        return self.gm
+
+    @timed('scf.merge')
+    def _merge(self, sub, (I0, J0)):
+        """
+        Puts SCF results of the sub-model with the block's first grid element
+        (I0, J0) into the general model.
+        """
+        gm = self.gm
+        # Rods of the general model, by index.
+        rods = {}
+        for r in gm.children:
+            if None not in r.ijk and r.name != -1:
+                rods.setdefault(r.ijk, r)
+        for e in list(sub.gm.children):
+            if None in e.ijk:
+                continue
+            ijk = (e.i + I0, e.j + J0, e.k)
+            if e.name == -1:
+                # Coolant box, insert before the rod.
+                gm.grid.insert(ijk, e.copy_tree(), 0)
+            elif ijk in rods:
+                # Rod temperatures were changed by SCF
+                for (se, oe) in zip(e.values(True), rods[ijk].values(True)):
+                    if se.has_var('temp'):
+                        oe.temp = se.temp.copy(oe)
+        return
@@ -18,6 +18,8 @@
 
 Interface for box container with rods inserted into the grid.
 """
+import os
+from copy import deepcopy
 from math import pi
 pi4 = pi/4.
 pi2 = pi/2.
@@ -27,6 +29,7 @@ from ...scf2.input import Input
 from ...scf2.output import read_pl_rod
 from ...scf2.material import RodMaterialCollection
 from ...solids import Box
+from ...tools.timing import timed
 
 _Tkelvin = 273.15 
 
@@ -648,6 +651,7 @@ class Model(Input):
         if self.__ahf is not None:
             self.find('average_heat_flux')[0].value = self.__ahf
 
+    @timed('scf.process_model')
     def _process_model(self):
         self._process_rods()
         self._process_heats()
@@ -658,18 +662,48 @@ class Model(Input):
         self._process_model()
         return super(Model, self).__str__()
 
-    def run(self, mode, outp='r'):
+    def copy(self, gm=None):
+        """
+        Returns new Model for the general model gm, with copies of the SCF
+        input data, parameters and the material dictionary of self. The SCF
+        executable and the workplace prefix are copied as well.
+        """
+        new = Model(gm)
+        new[:] = deepcopy(list(self))
+        new.__mdict = self.__mdict.copy()
+        new.exit_pressure = self.exit_pressure
+        new.inlet_temperature = self.inlet_temperature
+        new.__pd = self.__pd
+        new.__ifr = self.__ifr
+        new.__imf = self.__imf
+        new.__tp = self.__tp
+        new.__ahf = self.__ahf
+        if os.path.isabs(self.wp.exe):
+            # otherwise, exe is the default, referring to $SCF
+            new.wp.exe = self.wp.exe
+        new.wp.prefix = self.wp.prefix
+        return new
+
+    @timed('scf')
+    def run(self, mode, outp='r', **kwargs):
         """
         Optional argument outp specifies what results, rod or channel
         will be put to the output model. Can be 'r' or 'c'.
 
+        Keyword arguments are passed to the workplace, see
+        ScfWorkPlace.run(). If wait=False is given, the job future is
+        returned immediately in mode 'R'; SCF results are put to the model
+        when its result() method is called.
         """
 
         if mode in 'rR':
-            super(Model, self).run(mode)
+            f = super(Model, self).run(mode, **kwargs)
 
             if mode == 'R':
                 # SCF was actually run. Read output data
+                if f is not None:
+                    f.add_callback(lambda f: self._get_rod_results())
+                    return f
                 self._get_rod_results()
                 return self.__gm# .copy_tree()
             else:
@@ -679,6 +713,7 @@ class Model(Input):
             raise ValueError('Unknown mode {}'.format(mode))
 
             
+    @timed('scf.read_output')
     def _get_rod_results(self):
         """
         Read rod results and insert them into the model.
@@ -92,6 +92,12 @@ class Collection(object):
     1
     >>> c.items()
     {1: 'a', 2: 'b'}
+
+    To find an object in the collection, derived classes can define canonical
+    keys of objects by redefining the _keys() method. The collection maintains
+    a dictionary of indices for each key, so that only objects with the same
+    key are compared. Objects without canonical key are compared
+    one-by-one.
     """
     def __init__(self, iv=1, step=1):
         """Initializes new collection.
@@ -110,6 +116,8 @@ class Collection(object):
         """
         self.__c.reset(iv, step)
         self.__d = {}
+        self.__h = {}  # canonical key -> list of indices
+        self.__u = []  # indices of objects without canonical key
         return
 
     def index(self, o):
@@ -136,18 +144,52 @@ class Collection(object):
         """
         return self.__d.values()
 
+    def _keys(self, obj):
+        """Returns list of canonical keys of obj, or None.
+
+        Objects equal to obj must be stored under one of the returned keys.
+        The first key in the list is the one used to store obj itself.  When
+        None is returned, obj is compared with all objects in the collection.
+
+        Redefine this method in derived classes. Here, None is always returned.
+        """
+        return None
+
     def _add(self, value, mapping=lambda x:x):
         k = mapping(self.__c.get_next())
-        self.__d[k] = value
+        self._register(k, value)
         return k
 
+    def _register(self, k, value):
+        """Puts value to the collection under index k.
+
+        Index k is not checked.
+        """
+        self.__d[k] = value
+        keys = self._keys(value)
+        if keys:
+            self.__h.setdefault(keys[0], []).append(k)
+        else:
+            self.__u.append(k)
+        return
+
     def _find(self, obj):
         """Returns index of object obj.
 
         If obj is not in the collection, None is returned.
         """
-        for (k, v) in self.__d.items():
-            if v == obj:
+        keys = self._keys(obj)
+        if keys is None:
+            for (k, v) in self.__d.items():
+                if v == obj:
+                    return k
+            return None
+        for key in keys:
+            for k in self.__h.get(key, ()):
+                if self.__d[k] == obj:
+                    return k
+        for k in self.__u:
+            if self.__d[k] == obj:
                 return k
         return None
 
@@ -42,51 +42,119 @@ def format_card(string, maxLen=80, indent=' '*5, eol='$', cl='c ', propagate_com
     
     Optional boolean argument `propagate_comments` specifies whether in the output multiline string the 
     first line will contain comment specified in the original string.
+
+    >>> print format_card('1 0 ' + ' '.join(['-{0}'.format(i) for i in range(1000, 1030)]) + ' $ comment')
+    1 0 -1000 -1001 -1002 -1003 -1004 -1005 -1006 -1007 -1008 -1009 -1010 -1011
+         -1012 -1013 -1014 -1015 -1016 -1017 -1018 -1019 -1020 -1021 -1022 -1023
+         -1024 -1025 -1026 -1027 -1028 -1029                                          $  comment
     """
 
     lind = len(indent)
     res = []
+    add = res.append
     for line in string.splitlines():
-        if line[:lind].lstrip().lower().find(cl) == 0:
+        if line[:lind].lstrip().lower().startswith(cl):
             # this line is commented out. Put it as is
             if propagate_comments:
-                res.append(line)
+                add(line)
+            continue
+        if line.startswith(indent):
+            line = line[lind:]
+            prefix = indent
+        else:
+            prefix = ''
+        if eol in line:
+            meaning, c, comment = line.partition(eol)
+        else:
+            meaning = line
+            comment = ''
+
+        assert '&' not in meaning
+        meaning = meaning.strip()
+        n = len(meaning)
+        if len(prefix) + n <= maxLen:
+            # most of lines need no wrapping
+            if n:
+                add(prefix + meaning)
         else:
-            if line[:lind] == indent:
-                meaning, c, comment = line[lind:].partition(eol)
-                prefix = indent  
-            else:
-                meaning, c, comment = line.partition(eol)
-                prefix = ''
-
-            assert meaning.find('&') == -1
-            meaning = meaning.strip()
-            while meaning:
-                if len(prefix) + len(meaning) <= maxLen:
-                    res.append(prefix + meaning)
-                    meaning = ''
-                else:
-                    idx = meaning.rfind(' ', 0, maxLen - len(prefix))
-                    if idx == -1:
-                        # space not found in first maxLen characters. Put the whole line as is.
-                        part = meaning
-                        meaning = ''
-                    else:
-                        part = meaning[:idx]
-                        meaning = meaning[idx:].lstrip()
-                    res.append( prefix + part )
+            # Wrap meaning. Instead of cutting meaning into shorter copies,
+            # only the start position i of its remaining part is moved.
+            i = 0
+            while i < n:
+                w = maxLen - len(prefix)  # width available for the line
+                if n - i <= w:
+                    add(prefix + meaning[i:])
+                    break
+                if w < 0:
+                    # negative end index in str.rfind is counted from the end
+                    w = max(n - i + w, 0)
+                j = meaning.rfind(' ', i, i + w)
+                if j == -1:
+                    # space not found in first maxLen characters. Put the whole line as is.
+                    add(prefix + meaning[i:])
+                    break
+                add(prefix + meaning[i:j])
+                i = j + 1
+                while i < n and meaning[i].isspace():
+                    i += 1
                 prefix = indent
-            if comment.strip() != '' and propagate_comments:
-                last = res[-1]
-                res[-1] = last + ' '*(maxLen - len(last) + 2) + eol + ' ' + comment
+        if comment and propagate_comments and comment.strip() != '':
+            last = res[-1]
+            res[-1] = last + ' '*(maxLen - len(last) + 2) + eol + ' ' + comment
     return '\n'.join(res)
 
-        
 
+def format_cards(cards, **kwargs):
+    """
+    Returns list of formatted strings from the list cards. Keyword arguments
+    are passed to format_card().
+    """
+    return [format_card(c, **kwargs) for c in cards]
+
+
+def _benchmark(N=17*17*157, Nz=20, repeat=3):
+    """
+    Micro-benchmark of format_cards() on cards of an input file of the size
+    of a full-core model: N lattice elements (rods) with Nz axial layers, a
+    lattice cell and material cards.
+    Returns the best time over repeat runs, in seconds, and the number of
+    formatted cards.
+    """
+    import time
+    cards = []
+    s = 1000
+    for k in range(N):
+        # container cell with long geometry description and a comment
+        cards.append('{0} 0 -{1} {2} ({3}) u={4} imp:n=1 fill={5} $ container for pin {6}'.format(
+            len(cards) + 1, s, s + 1, ' : '.join(str(-(s + i)) for i in range(2, 12)), k + 1,
+            N + k + 1, k))
+        for z in range(Nz):
+            cards.append('{0} {1} -10.2 {2} -{3} -{4} u={5} imp:n=1 tmp={6:.6e} $ layer of fuel'.format(
+                len(cards) + 1, z + 2, s + 20 + z, s + 21 + z, s, N + k + 1, 8.617e-11*(900 + z)))
+        s += 40
+    # lattice cell with the fill array
+    cards.append('{0} 0 -1 u=1 lat=1 imp:n=1 fill=0:16 0:16 0:0 {1} $ lattice'.format(
+        len(cards) + 1, ' '.join(str(N + k + 1) for k in range(N))))
+    mat = ['m{0} $ O-U at 900.0 K'.format(1)]
+    mat.append('c density 1.00000000000000e+01 g/cc')
+    mat.append(' '.join('     {0}.31c {1:12.5e}   {0}.32c {2:12.5e}'.format(z, 0.1, 0.2)
+                        for z in range(92230, 92240) + range(8016, 8019)))
+    cards.extend(['\n'.join(mat)] * 100)
+    tmin = None
+    for r in range(repeat):
+        t = time.time()
+        format_cards(cards)
+        t = time.time() - t
+        if tmin is None or t < tmin:
+            tmin = t
+    return tmin, len(cards)
 
 
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
 
+    t, n = _benchmark()
+    print 'format_cards: {0} cards formatted in {1:.3f} s'.format(n, t)
+
     s = 'this can happen if the datapath is too long: datapath = /an_extremely_long_directory_name_exceeding_by_far_the_limit_of_eighty_characters_imposed_by_MCNP_input_syntax'
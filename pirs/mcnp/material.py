@@ -25,6 +25,7 @@ MCNP.
 # Developed at INR, Karlsruhe Institute of Technology
 #at
 
+import re
 import autologging
 
 from ..core import tramat
@@ -35,6 +36,11 @@ from . import auxiliary
 from . import formatter
 
 
+# Cross-section table names (ZAID.suffix or thermal data names) in material
+# cards
+_XSNAME = re.compile(r'\s(\S+\.\d+[a-z]{1,2})(?=\s|$)', re.M)
+
+
 @autologging.traced
 class Material(tramat.Mixture):
     """
@@ -61,6 +67,7 @@ class Material(tramat.Mixture):
         self.__fmt['zaid'] = '{0}'
         self.__fmt['fraction'] = '{0:12.5e}'
         self.__th = None  # thermal data name.
+        self.__xe = None  # cached result of _expanded().
 
     def copy(self):
         new = super(Material, self).copy()
@@ -364,7 +371,29 @@ class Material(tramat.Mixture):
         Like expanded() method, but checks the presence of nuclides in xsdir
         and, if necessary, replaces them according to the sdict attribute.
 
+        The resulting recipe is cached for the current recipe, xsdir and sdict.
         """
+        if Nr == 0:
+            xs = self.xsdir
+            s = (self._state(), id(xs), len(xs.dir), self.__sdict_state())
+            x = getattr(self, '_Material__xe', None)
+            if x is None or x[0] != s:
+                x = (s, list(self.__expanded(Nr).recipe()))
+                self.__xe = x
+            return self.__class__(*x[1])
+        return self.__expanded(Nr)
+
+    def __sdict_state(self):
+        st = []
+        for k, v in sorted(self.__sdict.items()):
+            if isinstance(v, tramat.Mixture):
+                v = v._state()
+            elif isinstance(v, tramat.Nuclide):
+                v = (v.ZAID, v.M())
+            st.append((k, v))
+        return tuple(st)
+
+    def __expanded(self, Nr):
         Nrmax = 3
         nrec = []
         again = False
@@ -391,7 +420,7 @@ class Material(tramat.Mixture):
             return nmat
         else:
             nmat.__sdict.update(self.__sdict)
-            return nmat._expanded(Nr=Nr+1)
+            return nmat.__expanded(Nr+1)
 
 
 
@@ -442,6 +471,21 @@ class MaterialCollection(auxiliary.Collection):
     already contains a material with this index, its is just returned.
     Otherwise, an index error is raised. Index 0 is always in the collection.
 
+    If the attribute cache_cards is True, material cards generated by cards()
+    are stored and reused for the same material instance with the same
+    attributes, also after the collection is cleared. This is useful when
+    the collection is filled repeatedly with mostly the same materials and
+    temperatures. Material instances must not be changed while the cache
+    is used; otherwise call clear_cache().
+
+    The attribute tprec, when positive, defines temperature bins: material
+    temperatures passed to index() as the keyword argument T are rounded to
+    the nearest multiple of tprec, in the same way as zmesh values are
+    rounded with its prec attribute. Thus, all cells with the same material
+    and temperatures in one bin refer to the same material card, which
+    reduces the number of material cards and of cross-section tables that
+    MCNP must load. See also report().
+
     """
     def __init__(self, xsdir=None, *args):
         super(MaterialCollection, self).__init__(*args)
@@ -450,6 +494,29 @@ class MaterialCollection(auxiliary.Collection):
         # else:
         #     self.xsdir = xsdir
         self.__xs = xsdir
+        self.cache_cards = False
+        self.tprec = 0.
+        self.clear_cache()
+        self.__rep = None  # statistics of the last call to cards()
+        return
+
+    def _tbin(self, T):
+        """
+        Returns temperature T rounded according to tprec.
+        """
+        if self.tprec > 0 and isinstance(T, (int, long, float)):
+            return round(T / self.tprec) * self.tprec
+        return T
+
+    def clear_cache(self):
+        """
+        Removes material cards stored when cache_cards is True.
+        """
+        self.__cc = {}
+        #: Number of material cards taken from the cache and generated by the
+        #: last call to cards().
+        self.cards_reused = 0
+        self.cards_generated = 0
         return
 
     @property
@@ -508,11 +575,28 @@ class MaterialCollection(auxiliary.Collection):
             obj = (mat[1], mat[0])
         else:
             raise TypeError('Cannot add material of type ', mat.__class__.__name__)
+        if self.tprec > 0 and obj[0].get('T') is not None:
+            kwargs = dict(obj[0])
+            kwargs['T'] = self._tbin(kwargs['T'])
+            obj = (kwargs, obj[1])
         k = self._find(obj)
         if k is None:
             k = self._add(obj)
         return k
 
+    def _keys(self, obj):
+        """
+        Canonical key of the (kwargs, mat) tuple: sorted kwargs items (thus
+        temperature, when given), material name and temperature.
+        """
+        kwargs, mat = obj
+        key = (tuple(sorted(kwargs.items())), mat.name, mat.T)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return [key]
+
     def __getitem__(self, index):
         kwargs, mat = super(MaterialCollection, self).__getitem__(index)
         return (mat, kwargs)
@@ -531,17 +615,59 @@ class MaterialCollection(auxiliary.Collection):
 
         """
         c = ['c materials']
+        self.cards_reused = 0
+        self.cards_generated = 0
+        mset = set()  # materials
+        tset = set()  # temperatures
+        xset = set()  # cross-section tables
+        size = 0      # length of cards
         for (ID, (mat, kwargs)) in self.items():
+            mset.add(id(mat))
+            tset.add(kwargs.get('T', mat.T))
+            if self.cache_cards:
+                # material is stored in the cache value to keep its id valid.
+                key = (id(mat), tuple(sorted(kwargs.items())), id(self.__xs), formatted)
+                v = self.__cc.get(key)
+                if v is not None:
+                    c.append( v[1].format(ID) )
+                    xset.update(_XSNAME.findall(v[1]))
+                    size += len(c[-1])
+                    self.cards_reused += 1
+                    continue
             aold = {}
             for (n,v) in kwargs.items() + [('xsdir', self.__xs)]:
                 aold[n] = getattr(mat, n)
                 setattr(mat, n, v)
-            c.append( mat.card(formatted).format(ID) )
+            card = mat.card(formatted)
+            c.append( card.format(ID) )
+            xset.update(_XSNAME.findall(card))
+            size += len(c[-1])
+            self.cards_generated += 1
+            if self.cache_cards:
+                self.__cc[key] = (mat, card)
             # return old attribute values
             for (n,v) in aold.items():
                 setattr(mat, n, v)
+        self.__rep = (len(c) - 1, len(mset), len(tset), len(xset), size)
         return c
 
+    def report(self):
+        """
+        Returns a string with the number of material cards generated by the
+        last call to cards(), the number of distinct materials and
+        temperatures they represent, the number of cross-section tables
+        referenced in the cards and the size of the cards in the input file.
+
+        The number of cross-section tables determines the amount of
+        cross-section data that MCNP reads and keeps in memory.
+        """
+        if self.__rep is None:
+            return 'No material cards generated'
+        nc, nm, nt, nx, size = self.__rep
+        return ('material cards: {0} ({1} materials at {2} temperatures), '
+                'cross-section tables: {3}, cards size: {4:.1f} kB').format(
+                    nc, nm, nt, nx, size/1024.)
+
     def __str__(self):
         return '\n'.join( self.cards(True) )
 
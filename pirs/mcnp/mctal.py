@@ -29,6 +29,9 @@ except ImportError:
     numpy_exists = False
 
 import re
+import mmap
+
+
 def add_e_to_exp(s, e='e'):
     """
     MCNP uses float point format without 'E' when exponent has 3 digits,
@@ -46,6 +49,19 @@ def add_e_to_exp(s, e='e'):
     else:
         return s[:]
 
+# mctal and meshtal files contain float values with 3-digit exponents without
+# "e", as 1.23456-100. This expression finds such values, see add_e_to_block.
+_large_exp = re.compile(r'(\d)([-+]\d)')
+
+def add_e_to_block(s):
+    """
+    Returns string s of space-separated values, where 'e' is added to all
+    exponents without 'e', see add_e_to_exp().
+    """
+    if _large_exp.search(s):
+        s = _large_exp.sub(r'\1e\2', s)
+    return s
+
 def str2float(s):
     return float(add_e_to_exp(s))
 
@@ -76,13 +92,11 @@ def read_values(lines, N, type_=str, check=True):
     res = []
     tokens = []
     while len(res) < N:
-        if tokens:
-            t = tokens.pop(0)
-            res.append(t)
-            cline.replace(t, '', 1)
-        else:
-            cline = lines.pop(0) # the whole line is needed to accurately put back the rest, if any.
-            tokens = cline.split()
+        cline = lines.pop(0)
+        tokens = cline.split()
+        n = N - len(res)
+        res.extend(tokens[:n])
+        tokens = tokens[n:]
 
     if type_ is float:
         # check special format used for float values with large exponent:
@@ -93,11 +107,60 @@ def read_values(lines, N, type_=str, check=True):
     if not check:
         # put the rest of tokens to lines:
         if tokens:
-            lines.insert(0, cline.lstrip())
+            lines.insert(0, ' '.join(tokens) + '\n')
     else:
         assert tokens == []
     return res
 
+
+class _Lines(object):
+    """
+    List of lines that are consumed from the beginning, as required by
+    read_values().
+
+    Removing the first element of a list, lines.pop(0), requires time
+    proportional to the list length, thus reading a file line by line from
+    a list takes quadratic time. Here, only the index of the first line is
+    moved.
+    """
+    def __init__(self, lines):
+        self.__l = lines
+        self.__i = 0
+
+    def pop(self, i):
+        if i != 0:
+            raise NotImplementedError('Only the first line can be removed')
+        if self.__i >= len(self.__l):
+            raise IndexError('pop from empty list')
+        l = self.__l[self.__i]
+        self.__i += 1
+        return l
+
+    def insert(self, i, l):
+        if i != 0:
+            raise NotImplementedError('Line can be inserted only at the beginning')
+        if self.__i > 0:
+            self.__i -= 1
+            self.__l[self.__i] = l
+        else:
+            self.__l.insert(0, l)
+
+    def __getitem__(self, i):
+        if i < 0:
+            raise NotImplementedError('Negative indices are not supported')
+        return self.__l[self.__i + i]
+
+    def __len__(self):
+        return len(self.__l) - self.__i
+
+
+def _str2array(block):
+    """
+    Converts string with space-separated float values to a numpy array.
+    """
+    return numpy.fromstring(add_e_to_block(block), sep=' ')
+
+
 class KcodeArray(object):
     """
     Representation of the kcode array in mctal file.
@@ -164,12 +227,7 @@ class Mctal(object):
                     l = f.next()
                     vals += map(float, l.split())
                 # rearrange list to a list of lists.
-                kcode = []
-                while len(kcode) < nc:
-                    a = []
-                    for i in range(mk):
-                        a.append(vals.pop(0))
-                    kcode.append(a)
+                kcode = [vals[i*mk:(i+1)*mk] for i in range(nc)]
                 self.__kcode.nc = nc
                 self.__kcode.ikz = ikz
                 self.__kcode.mk = mk
@@ -182,207 +240,400 @@ class Mctal(object):
         Reads mctal file as written by MCNP.
 
         Mctal file format is different for MCNP5 and MCNP6.
+
+        For large mctal files, consider MctalFile, which reads tallies on
+        demand.
         """
         with open(fname, 'r') as f:
-            lines = f.readlines()
-            # 1-st line with code and nps. probid can have spaces, thus it is analysed last.
-            t = lines.pop(0).split()
-            kod = t.pop(0)
-            ver = t.pop(0)
-            rnr = int(t.pop(-1))
-            nps = int(t.pop(-1))
-
-            # For large nps, knod can disappear from the 1-st line.
-            try:
-                knod = int(t[-1])
-            except ValueError:
-                knod = -1
-            else:
-                t.pop(-1)
-            probid = ' '.join(t)
-            # try to get mcnp version.
-            if '6' in ver:
-                ver = 6
-            elif '5' in ver:
-                ver = 5
-            else:
-                # use optional argument value
-                pass
-
-            # Problem title
-            prtitle = lines.pop(0)
-            # NTAL NPERT
-            t = lines.pop(0).lower().split()
-
-            ntal = int(t[1])
-            if 'npert' in t:
-                npert = int(t[3])
-            else:
-                npert = 0
-            # List of tally names
-            tals = read_values(lines, ntal, int) # list of tally names
-            #
-            self.kod = kod
-            self.ver = ver
-            self.probid = probid
-            self.knod = knod
-            self.nps = nps
-            self.rnr = rnr
-            self.title = prtitle
-            self.ntal = ntal
-            self.npert = npert
-            self.tals = tals
+            lines = _Lines(f.readlines())
+            _read_header(self, lines, ver)
             tallies = {}
-            for tname in tals:
-                # placeholder for all tally parameters. Some paramters are optional
-                tll = _MctalTally()
-                # tally name, particle type and tally type
-                tmp, m, i, j = lines.pop(0).split()[:4]  # mcnp6 writes more than 4 entries, but only 4 are describen in the manual.
-                m = int(m)
-                i = int(i)
-                j = int(j)
-                if ver == 6 and i < 0:
-                    plist = lines.pop(0)  # line specifying which particles are used by the tally
-                # FC card, if any
-                fc = []
-                while lines[0][:5] == ' '*5:
-                    fc.append(lines.pop(0))
-                # f: number of cell or surface bins
-                fparam = lines.pop(0).split()
-                fn = int(fparam[1])   # number of cells in a standard tally or mesh elemetrs in a meshtally of type A
-                # list of cell or surface numbers
-                if j == 0:
-                    fnl = read_values(lines, fn, int)
-                if j == -1:
-                    # this seems to define a meshtally of type A in MCNP6.
-                    na, nb, nc = map(int, fparam[3:])  # number of mesh elemetns in each direction
-                    b = read_values(lines, na+nb+nc+3, float) # read mesh element boundaries in each direction
-                    ba = b[:na+1]
-                    bb = b[na+1:na+nb+2]
-                    bc = b[na+nb+2:]
-                    tll.ba = ba
-                    tll.bb = bb
-                    tll.bc = bc
-                    tll.na = na
-                    tll.nb = nb
-                    tll.nc = nc
-
-                # d: number of total vs. direct or flagged vs. unflagged bins.
-                tmp, dn = lines.pop(0).split()
-                dn = int(dn)
-                # u: number of user bins, including the total bin if there is one.
-                ufl, un = lines.pop(0).split()
-                un = int(un)
-                un = 1 if un == 0 else un
-                # s: number of segment bins
-                sfl, sn = lines.pop(0).split()
-                sn = int(sn)
-                sn = 1 if sn == 0 else sn
-                # m: number of multiplier bins
-                mfl, mn = lines.pop(0).split()
-                mn = int(mn)
-                mn = 1 if mn == 0 else mn
-                # c: cosine bins
-                cfl = lines.pop(0).split()
-                cf = int(cfl.pop()) if len(cfl) == 3 else 0
-                cn = int(cfl.pop())
-                cfl = cfl.pop()
-                # cosine values
-                if cn > 0:
-                    cvl = read_values(lines, cn, float)
-                else:
-                    cvl = []
-                cn = 1 if cn == 0 else cn
-                # e: Energy bins
-                efl = lines.pop(0).split()
-                # print 'efl', efl
-                ef = int(efl.pop()) if len(efl) == 3 else 0
-                en = int(efl.pop())
-                efl = efl.pop()
-                # print 'ef, en, efl', ef, en, efl
-                #
-                if en > 0:
-                    # number of energy values depends on the total bin
-                    if 't' in efl:
-                        # there is total bin, so number of energy values is en - 1
-                        nev = en - 1
-                    else:
-                        # there is no total bin, the number of energy values is en
-                        nev = en
-                    evl = read_values(lines, nev, float)
-                else:
-                    evl = []
-                en = 1 if en == 0 else en
-                # t: Time bins
-                tfl = lines.pop(0).split()
-                tf = int(tfl.pop()) if len(tfl) == 3 else 0
-                tn = int(tfl.pop())
-                tfl = tfl.pop()
-                #
-                if tn > 0:
-                    tvl = read_values(lines, tn, float)
-                else:
-                    tvl = []
-                tn = 1 if tn == 0 else tn
+            for tname in self.tals:
+                tll = _read_tally_head(lines, self.ver)
                 # VALS
                 tmp = lines.pop(0).split()
                 #
-                vals = read_values(lines, 2*tn*en*cn*mn*sn*un*dn*fn, float)
+                vals = read_values(lines, 2*tll.nvals, float)
 
-                val2 = zip(vals[0::2], vals[1::2])
+                tll.vals = zip(vals[0::2], vals[1::2])
                 # TFC
-                tfcl = lines.pop(0).split()
-                ntfc = int(tfcl[1])
-                jtf = map(int, tfcl[2:])
-                tfc = read_values(lines, ntfc*4, str)
-
-                # put all into an object
-                tll.name = m
-                tll.ptyp = i
-                tll.ttyp = j
-                tll.fc = fc
-                tll.fn = fn
-                tll.fnl = fnl
-                tll.dn = dn
-                tll.ufl = ufl
-                tll.un = un
-                tll.sfl = sfl
-                tll.sn = sn
-                tll.mfl = mfl
-                tll.mn = mn
-                tll.cfl = cfl
-                tll.cf = cf
-                tll.cn = cn
-                tll.cvl = cvl
-                tll.en = en
-                tll.ef = ef
-                tll.efl = efl
-                tll.evl = evl
-                tll.tf = tf
-                tll.tn = tn
-                tll.tfl = tfl
-                tll.tvl = tvl
-                tll.vals = val2
-                tll.tfc = tfc
+                _read_tfc(tll, lines)
                 if numpy_exists:
-                    nv = numpy.array(vals)
-                    Ivals = [2, tn, en, cn, mn, sn, un, dn, fn]
-                    Inams = 'v t e c m s u d f'.split()
-                    Ivn = []
-                    Inn = []
-                    for Iv, In in zip(Ivals, Inams):
-                        if Iv > 1:
-                            Ivn.append(Iv)
-                            Inn.append(In)
-                    nv = nv.reshape(Ivn, order='F')
-                    tll.vals_numpy = nv
-                    tll.vals_numpy_order = ' '.join(Inn)
-                    tll.fnl_numpy = numpy.array(fnl)
+                    _set_numpy(tll, numpy.array(vals))
                 tallies[tll.name] = tll
 
             self.mctaltallies = tallies
 
 
+def _read_header(m, lines, ver=5):
+    """
+    Reads the mctal file header from lines and sets its data as attributes
+    to m.
+    """
+    # 1-st line with code and nps. probid can have spaces, thus it is analysed last.
+    t = lines.pop(0).split()
+    kod = t.pop(0)
+    ver_ = t.pop(0)
+    rnr = int(t.pop(-1))
+    nps = int(t.pop(-1))
+
+    # For large nps, knod can disappear from the 1-st line.
+    try:
+        knod = int(t[-1])
+    except ValueError:
+        knod = -1
+    else:
+        t.pop(-1)
+    probid = ' '.join(t)
+    # try to get mcnp version. MCNP5 writes its version as 1.60, thus the
+    # code name is checked first.
+    if '6' in kod:
+        ver = 6
+    elif '5' in kod:
+        ver = 5
+    elif '6' in ver_:
+        ver = 6
+    elif '5' in ver_:
+        ver = 5
+    else:
+        # use optional argument value
+        pass
+
+    # Problem title
+    prtitle = lines.pop(0)
+    # NTAL NPERT
+    t = lines.pop(0).lower().split()
+
+    ntal = int(t[1])
+    if 'npert' in t:
+        npert = int(t[3])
+    else:
+        npert = 0
+    # List of tally names
+    tals = read_values(lines, ntal, int) # list of tally names
+    #
+    m.kod = kod
+    m.ver = ver
+    m.probid = probid
+    m.knod = knod
+    m.nps = nps
+    m.rnr = rnr
+    m.title = prtitle
+    m.ntal = ntal
+    m.npert = npert
+    m.tals = tals
+    return
+
+
+def _read_tally_head(lines, ver):
+    """
+    Reads tally description from lines, starting from the tally line up to
+    the vals line (not included). Returns an instance of _MctalTally.
+    """
+    # placeholder for all tally parameters. Some paramters are optional
+    tll = _MctalTally()
+    # tally name, particle type and tally type
+    tmp, m, i, j = lines.pop(0).split()[:4]  # mcnp6 writes more than 4 entries, but only 4 are describen in the manual.
+    m = int(m)
+    i = int(i)
+    j = int(j)
+    if ver == 6 and i < 0:
+        plist = lines.pop(0)  # line specifying which particles are used by the tally
+    # FC card, if any
+    fc = []
+    while lines[0][:5] == ' '*5:
+        fc.append(lines.pop(0))
+    # f: number of cell or surface bins
+    fparam = lines.pop(0).split()
+    fn = int(fparam[1])   # number of cells in a standard tally or mesh elemetrs in a meshtally of type A
+    # list of cell or surface numbers
+    fnl = []
+    if j == 0:
+        fnl = read_values(lines, fn, int)
+    if j == -1:
+        # this seems to define a meshtally of type A in MCNP6.
+        na, nb, nc = map(int, fparam[3:])  # number of mesh elemetns in each direction
+        b = read_values(lines, na+nb+nc+3, float) # read mesh element boundaries in each direction
+        ba = b[:na+1]
+        bb = b[na+1:na+nb+2]
+        bc = b[na+nb+2:]
+        tll.ba = ba
+        tll.bb = bb
+        tll.bc = bc
+        tll.na = na
+        tll.nb = nb
+        tll.nc = nc
+
+    # d: number of total vs. direct or flagged vs. unflagged bins.
+    tmp, dn = lines.pop(0).split()
+    dn = int(dn)
+    # u: number of user bins, including the total bin if there is one.
+    ufl, un = lines.pop(0).split()
+    un = int(un)
+    un = 1 if un == 0 else un
+    # s: number of segment bins
+    sfl, sn = lines.pop(0).split()
+    sn = int(sn)
+    sn = 1 if sn == 0 else sn
+    # m: number of multiplier bins
+    mfl, mn = lines.pop(0).split()
+    mn = int(mn)
+    mn = 1 if mn == 0 else mn
+    # c: cosine bins
+    cfl = lines.pop(0).split()
+    cf = int(cfl.pop()) if len(cfl) == 3 else 0
+    cn = int(cfl.pop())
+    cfl = cfl.pop()
+    # cosine values
+    if cn > 0:
+        cvl = read_values(lines, cn, float)
+    else:
+        cvl = []
+    cn = 1 if cn == 0 else cn
+    # e: Energy bins
+    efl = lines.pop(0).split()
+    # print 'efl', efl
+    ef = int(efl.pop()) if len(efl) == 3 else 0
+    en = int(efl.pop())
+    efl = efl.pop()
+    # print 'ef, en, efl', ef, en, efl
+    #
+    if en > 0:
+        # number of energy values depends on the total bin
+        if 't' in efl:
+            # there is total bin, so number of energy values is en - 1
+            nev = en - 1
+        else:
+            # there is no total bin, the number of energy values is en
+            nev = en
+        evl = read_values(lines, nev, float)
+    else:
+        evl = []
+    en = 1 if en == 0 else en
+    # t: Time bins
+    tfl = lines.pop(0).split()
+    tf = int(tfl.pop()) if len(tfl) == 3 else 0
+    tn = int(tfl.pop())
+    tfl = tfl.pop()
+    #
+    if tn > 0:
+        tvl = read_values(lines, tn, float)
+    else:
+        tvl = []
+    tn = 1 if tn == 0 else tn
+
+    # put all into an object
+    tll.name = m
+    tll.ptyp = i
+    tll.ttyp = j
+    tll.fc = fc
+    tll.fn = fn
+    tll.fnl = fnl
+    tll.dn = dn
+    tll.ufl = ufl
+    tll.un = un
+    tll.sfl = sfl
+    tll.sn = sn
+    tll.mfl = mfl
+    tll.mn = mn
+    tll.cfl = cfl
+    tll.cf = cf
+    tll.cn = cn
+    tll.cvl = cvl
+    tll.en = en
+    tll.ef = ef
+    tll.efl = efl
+    tll.evl = evl
+    tll.tf = tf
+    tll.tn = tn
+    tll.tfl = tfl
+    tll.tvl = tvl
+    # number of (value, error) pairs in the vals section
+    tll.nvals = tn*en*cn*mn*sn*un*dn*fn
+    return tll
+
+
+def _read_tfc(tll, lines):
+    """
+    Reads the tfc section from lines and puts it to tll.
+    """
+    tfcl = lines.pop(0).split()
+    ntfc = int(tfcl[1])
+    jtf = map(int, tfcl[2:])
+    tll.tfc = read_values(lines, ntfc*4, str)
+    return
+
+
+def _set_numpy(tll, nv):
+    """
+    Puts tally values and errors from the flat numpy array nv to tll as
+    numpy arrays.
+    """
+    Ivals = [2, tll.tn, tll.en, tll.cn, tll.mn, tll.sn, tll.un, tll.dn, tll.fn]
+    Inams = 'v t e c m s u d f'.split()
+    Ivn = []
+    Inn = []
+    for Iv, In in zip(Ivals, Inams):
+        if Iv > 1:
+            Ivn.append(Iv)
+            Inn.append(In)
+    nv = nv.reshape(Ivn, order='F')
+    tll.vals_numpy = nv
+    tll.vals_numpy_order = ' '.join(Inn)
+    tll.fnl_numpy = numpy.array(tll.fnl)
+    return
+
+
+class MctalFile(object):
+    """Index of a mctal file.
+
+    When an instance is created, the mctal file is memory-mapped and scanned
+    once to read the header and to find, for each tally, offsets of the tally
+    description, of its vals section and of its tfc section, and the offset
+    of the kcode section. Values are not parsed at this step.
+
+    Tallies are decoded on demand by the read_tally() method, the kcode
+    section by the read_kcode() method. Values and errors are converted to
+    numpy arrays directly from the vals section.
+
+    >>> mf = MctalFile('mctal')
+    >>> print mf.nps, mf.keys()
+    >>> t = mf.read_tally(4)
+    >>> print t.vals_numpy_order, t.values, t.errors
+    >>> print mf.read_kcode().final()
+    >>> mf.close()
+
+    The instance can be used in the with statement, which closes the file:
+
+    >>> with MctalFile('mctal') as mf:
+    ...     t = mf.read_tally(4)
+
+    """
+    # lines that start sections of the mctal file
+    _sections = re.compile(r'^(tally|vals|tfc|kcode)\b', re.M)
+
+    def __init__(self, fname, ver=5):
+        self.fname = fname
+        self.__f = open(fname, 'rb')
+        self.__m = mmap.mmap(self.__f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__idx = {}  # tally name -> [tally offset, vals offset, tfc offset, end]
+        self.__kcode = None  # offset of the kcode section
+        self._index(ver)
+        return
+
+    def _index(self, ver):
+        m = self.__m
+        # header: first three lines and the list of tally names
+        lines = []
+        pos = 0
+        for i in range(3):
+            e = m.find('\n', pos) + 1
+            lines.append(m[pos:e])
+            pos = e
+        ntal = int(lines[-1].split()[1])
+        while len(' '.join(lines[3:]).split()) < ntal:
+            e = m.find('\n', pos) + 1
+            lines.append(m[pos:e])
+            pos = e
+        _read_header(self, _Lines(lines), ver)
+
+        cur = None  # index entry of the current tally
+        for r in self._sections.finditer(m, pos):
+            s = r.group(1)
+            o = r.start()
+            if s in ('tally', 'kcode') and cur is not None:
+                cur[3] = o
+                cur = None
+            if s == 'tally':
+                name = int(m[o:m.find('\n', o)].split()[1])
+                cur = [o, None, None, len(m)]
+                self.__idx[name] = cur
+            elif s == 'vals' and cur is not None:
+                cur[1] = o
+            elif s == 'tfc' and cur is not None:
+                cur[2] = o
+            elif s == 'kcode':
+                self.__kcode = o
+        return
+
+    def close(self):
+        """
+        Closes the mctal file. The file and its memory map are kept open
+        until this method is called, or until the with statement is left.
+        """
+        self.__m.close()
+        self.__f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+    def keys(self):
+        """
+        Returns list of tally names found in the mctal file.
+        """
+        return self.__idx.keys()
+
+    def __contains__(self, name):
+        return name in self.__idx
+
+    def read_tally(self, name):
+        """
+        Reads tally name.
+
+        Returns an instance of _MctalTally with the same attributes as set by
+        Mctal.read_complete(), except the list vals. When numpy is available,
+        values and errors are stored in vals_numpy and additionally in the
+        arrays values and errors, which have the shape of vals_numpy without
+        the first axis. Without numpy, values and errors are lists.
+        """
+        beg, vals, tfc, end = self.__idx[name]
+        m = self.__m
+        tll = _read_tally_head(_Lines(m[beg:vals].splitlines(True)), self.ver)
+        # skip the vals line
+        block = m[m.find('\n', vals) + 1:tfc]
+        if numpy_exists:
+            nv = _str2array(block)
+        else:
+            nv = map(str2float, block.split())
+        if len(nv) != 2*tll.nvals:
+            raise ValueError('Wrong number of values for tally {0}'.format(name))
+        if numpy_exists:
+            _set_numpy(tll, nv)
+            tll.values = tll.vals_numpy[0]
+            tll.errors = tll.vals_numpy[1]
+        else:
+            tll.values = nv[0::2]
+            tll.errors = nv[1::2]
+        _read_tfc(tll, _Lines(m[tfc:end].splitlines(True)))
+        return tll
+
+    def read_kcode(self):
+        """
+        Reads the kcode section. Returns an instance of KcodeArray, or None
+        if there is no kcode section in the file. When numpy is available,
+        its array attribute is a numpy array of shape (nc, mk).
+        """
+        if self.__kcode is None:
+            return None
+        m = self.__m
+        o = self.__kcode
+        e = m.find('\n', o) + 1
+        nc, ikz, mk = map(int, m[o:e].split()[1:4])
+        k = KcodeArray()
+        k.nc = nc
+        k.ikz = ikz
+        k.mk = mk
+        if numpy_exists:
+            a = _str2array(m[e:])[:nc*mk]
+            k.array = a.reshape((nc, mk))
+        else:
+            a = map(str2float, m[e:].split()[:nc*mk])
+            k.array = [a[i*mk:(i+1)*mk] for i in range(nc)]
+        return k
 
 
 if __name__ == '__main__':
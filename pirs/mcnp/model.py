@@ -35,6 +35,9 @@ from .mctal import Mctal
 from . import workplace
 from . import formatter
 from . import card_classes
+from ..tools.timing import timed
+from ..tools.file_lines import write_lines
+
 
 class Model(object):
     """
@@ -138,7 +141,8 @@ class Model(object):
             # there are some cells in the model. Generate input 
             # file, if necessary.
             if mode.lower() != 'c':
-                self.__wp.inp.string = str(self)
+                # input file is written card by card when the workplace is prepared
+                self.__wp.inp.string = self.iter_input
         self.wp.run(mode, **kwargs)
 
     def keff(self):
@@ -304,22 +308,34 @@ class Model(object):
 
         """
         self.__cc = self.__CCC() # Cell counter. 
+        # Volumes of different cells have common parts. Their copies are
+        # shared, see Volume.copy()
+        memo = {}
         for c in self.__cl:
-            #print 'processing cell ', c
-            cid = self.__cc.get_next()
-            mid = self.__mc.index(c.mat)
-            if isinstance(c.vol, Volume):
-                # self.__vid.append( str(c.vol.copy(self.__sc.index)._simplify()) )
-                # self.__vid.append( str(c.vol.copy(self.__sc.index)) )
-                vid = str(c.vol.copy(self.__sc.index)) 
-            else:
-                # let user define the cell geometry description
-                vid = str(c.vol)
-                # raise TypeError('Cell geometry must be specified by an instance of the Volume class, bu recieved ', repr(c.vol), c.vol.__class__.__name__)
-
-            c.__cid = cid
-            c.__mid = mid
-            c.__vid = vid
+            self._process_cell(c, memo)
+
+    def _process_cell(self, c, memo=None):
+        """
+        Add material and surfaces of cell c to the respective collections and
+        assign the next cell ID to it.
+
+        Optional dictionary memo is passed to Volume.copy().
+        """
+        #print 'processing cell ', c
+        cid = self.__cc.get_next()
+        mid = self.__mc.index(c.mat)
+        if isinstance(c.vol, Volume):
+            # self.__vid.append( str(c.vol.copy(self.__sc.index)._simplify()) )
+            # self.__vid.append( str(c.vol.copy(self.__sc.index)) )
+            vid = str(c.vol.copy(self.__sc.index, memo)) 
+        else:
+            # let user define the cell geometry description
+            vid = str(c.vol)
+            # raise TypeError('Cell geometry must be specified by an instance of the Volume class, bu recieved ', repr(c.vol), c.vol.__class__.__name__)
+
+        c.__cid = cid
+        c.__mid = mid
+        c.__vid = vid
             
     def _message_block(self):
         """
@@ -346,18 +362,24 @@ class Model(object):
         ccards = ['c ' + self.__t] # title
         # for (cell, ID, mat, vol) in zip(self.__cl, self.__cid, self.__mid, self.__vid):
         for cell in self.__cl:
-            ID = cell.__cid
-            mat = cell.__mid
-            vol = cell.__vid
-            rho = cell.rho
-            # density can be of the uncertainties.Variable class
-            if hasattr(rho, 'nominal_value'):
-                rho = rho.nominal_value
-            elif isinstance(rho, tuple) and len(rho) == 2:
-                rho = rho[0]
-            ccards.append( cell.card(False).format(ID=ID, mat=mat, rho=rho, geom=vol) )
+            ccards.append(self._cell_card(cell))
         return ccards + self.__acc
 
+    def _cell_card(self, cell):
+        """
+        Returns the card of cell, processed by _process_cell().
+        """
+        ID = cell.__cid
+        mat = cell.__mid
+        vol = cell.__vid
+        rho = cell.rho
+        # density can be of the uncertainties.Variable class
+        if hasattr(rho, 'nominal_value'):
+            rho = rho.nominal_value
+        elif isinstance(rho, tuple) and len(rho) == 2:
+            rho = rho[0]
+        return cell.card(False).format(ID=ID, mat=mat, rho=rho, geom=vol)
+
     def _surface_block(self):
         """
         Returns a list of cards for the surface block.
@@ -389,6 +411,7 @@ class Model(object):
         dcards += self.__adc
         return dcards
 
+    @timed('mcnp.cards')
     def cards(self, formatted=True):
         """
         Returns list of strings representing  MCNP input file.
@@ -410,11 +433,71 @@ class Model(object):
         clist += self._data_block()
         clist += ['']
         if formatted:
-            clist = map(formatter.format_card, clist)
+            clist = formatter.format_cards(clist)
         t2 = time.time()
         self.cards_time = t2 - t1
         return clist
 
+    def iter_cards(self, formatted=True):
+        """
+        Generator yielding strings representing MCNP input file, the same as
+        in the list returned by cards().
+
+        Only the generation of cards is streamed: the cells themselves must
+        already be in the cells list. Cells are processed one by one, each
+        cell card is formatted and yielded just after its material and
+        surfaces were added to the collections, thus the list of all cell
+        cards is never kept in memory. Material, surface and tally cards
+        follow after all cells are processed.
+        """
+        t1 = time.time()
+        if formatted:
+            f = formatter.format_card
+        else:
+            f = lambda c: c
+        for c in self._message_block():
+            yield f(c)
+        yield ''
+        self.__cc = self.__CCC() # Cell counter. 
+        yield f('c ' + self.__t)
+        memo = {}
+        for cell in self.__cl:
+            self._process_cell(cell, memo)
+            yield f(self._cell_card(cell))
+        for c in self.__acc:
+            yield f(c)
+        yield ''
+        for c in self._surface_block():
+            yield f(c)
+        yield ''
+        for c in self._data_block():
+            yield f(c)
+        yield ''
+        t2 = time.time()
+        self.cards_time = t2 - t1
+
+    def iter_input(self):
+        """
+        Generator yielding lines of the input file: ``'\\n'.join(m.iter_input())``
+        is equal to ``str(m)``.
+
+        See also write().
+        """
+        for c in self.iter_cards():
+            yield c
+        for c in ['', '', '']:
+            yield c
+
+    def write(self, fname, bufsize=2**20):
+        """
+        Writes the input file to file fname, card by card, with buffer size
+        bufsize. The file content is equal to str(self), but the input is
+        not joined into one string, see iter_cards().
+        """
+        with open(fname, 'w', bufsize) as o:
+            write_lines(o, self.iter_input())
+        return
+
     def __str__(self):
         res = self.cards()
         res += ['', '', '']
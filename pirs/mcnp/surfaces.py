@@ -24,6 +24,10 @@ Classes to represent geometry in MCNP.
 # Developed at INR, Karlsruhe Institute of Technology
 #at
 
+import weakref
+from math import floor
+from itertools import product
+
 from .auxiliary import Counter, Collection
 from . import formatter
 
@@ -281,27 +285,98 @@ class Volume(object):
 
     Instances of the Volume() class support operations of union '|', intersection '&' and negation '-'.
 
+    Volumes cannot be changed after creation, therefore equal volumes (simple
+    volumes with the same sign and surface definition, compound volumes with
+    the same operator and operands) are represented by the same instance:
+
+    >>> Volume(1, 'a') & Volume(-1, 'b') is Volume(1, 'a') & Volume(-1, 'b')
+    True
+
+    Common sub-expressions of different volumes are shared, and the hash and
+    the string representation of a volume are computed only once.
     """
-    def __init__(self, sign=1, surface=None):
+    __slots__ = ('__a1', '__op', '__a2', '__h', '__s', '__weakref__')
+
+    # Existing volumes, by (sign, definition) for simple volumes and by
+    # (operator, id(a1), id(a2)) for compound volumes.
+    __nodes = weakref.WeakValueDictionary()
+
+    def __new__(cls, sign=None, surface=None):
+        if sign is None:
+            # Volume() without arguments. Also called by pickle (protocol 2)
+            # before __setstate__(), therefore the instance is not shared.
+            v = object.__new__(cls)
+            v.__set((1, None), None, None)
+            return v
         if sign not in [0, 1, -1]:
             raise ValueError('Sign can be 0, 1 or -1, but recieved ', sign)
 
         if sign is 0:
             # return an empty set:
-            self.__a1 = (1, )
-            self.__op = None
-            self.__a2 = None
+            return cls._make((1, ), None, None)
         elif isinstance(surface, Volume):
             # do not allow definitions to be of the Volume class
-            # Instead, make copy of it.
-            v = surface*sign
-            self.__a1 = v.a1
-            self.__a2 = v.a2
-            self.__op = v.op
+            # Instead, use the volume itself.
+            return surface*sign
+        else:
+            return cls._make((sign, surface), None, None)
+
+    @classmethod
+    def _make(cls, a1, op, a2):
+        """
+        Returns volume with operands a1, a2 and operator op. The existing
+        instance is returned, if any.
+        """
+        if op is None:
+            key = a1
+        else:
+            key = (op, id(a1), id(a2))
+        try:
+            v = cls.__nodes.get(key)
+        except TypeError:
+            # unhashable surface definition. The volume is not shared.
+            key = None
+            v = None
+        if v is None:
+            v = object.__new__(cls)
+            v.__set(a1, op, a2)
+            if key is not None:
+                cls.__nodes[key] = v
+        return v
+
+    def __set(self, a1, op, a2):
+        self.__a1 = a1
+        self.__op = op
+        self.__a2 = a2
+        self.__s = None
+        try:
+            # hashes of operands are already computed.
+            self.__h = hash((a1, op, a2))
+        except TypeError:
+            self.__h = None
+        return
+
+    def __reduce__(self):
+        return (_volume, (self.__a1, self.__op, self.__a2))
+
+    def __setstate__(self, state):
+        # Volumes pickled before __slots__ were introduced: state is the
+        # instance dictionary. Pickle has already created the instance, thus
+        # it can be registered as the shared one only if there is no equal
+        # volume yet; otherwise it remains a (equal) duplicate.
+        a1 = state['_Volume__a1']
+        op = state['_Volume__op']
+        a2 = state['_Volume__a2']
+        self.__set(a1, op, a2)
+        if op is None:
+            key = a1
         else:
-            self.__a1 = (sign, surface)
-            self.__op = None
-            self.__a2 = None # 0
+            key = (op, id(a1), id(a2))
+        try:
+            if self.__nodes.get(key) is None:
+                self.__nodes[key] = self
+        except TypeError:
+            pass
         return
 
     @property
@@ -375,9 +450,7 @@ class Volume(object):
         if self.__op is None:
             if len(self.__a1) == 1:
                 # special case of whola space or empty set.
-                v = Volume(0)
-                v.__a1 = (-self.__a1[0],)
-                return v
+                return Volume._make((-self.__a1[0],), None, None)
             else:
                 return Volume(-self.__a1[0], self.__a1[1])
         else:
@@ -385,11 +458,7 @@ class Volume(object):
                 op = 'or'
             elif self.__op == 'or':
                 op = 'and'
-            res = Volume()
-            res.__a1 = -self.__a1
-            res.__op = op
-            res.__a2 = -self.__a2
-            return res
+            return Volume._make(-self.__a1, op, -self.__a2)
 
     def __mul__(self, c):
         """
@@ -458,8 +527,8 @@ class Volume(object):
         # if one of the operands is the empty set (1, ), return the empty set:
         if self.__a1 == (1, ):
             return self# .__a1 
-        if self.__a2 == (1, ):
-            return self# .__a2 
+        if othr.__a1 == (1, ):
+            return othr# .__a2 
         # if one of the operands is the whole space (-1, None), return the copy of the other operand:
         if self.__a1 == (-1, ):
             return othr
@@ -467,10 +536,8 @@ class Volume(object):
             return self
 
         # if two operands are usual volumes, return a compound volume.
-        res = Volume()
-        res.__a1, res.__a2 = Volume.sort_operands(self, othr)
-        res.__op = 'and'
-        return res
+        a1, a2 = Volume.sort_operands(self, othr)
+        return Volume._make(a1, 'and', a2)
 
     def __or__(self, othr):
         """
@@ -495,10 +562,8 @@ class Volume(object):
             return othr
         # if both operands are usual volumes, return a compound volume:
         # ensure that if one of operands is simple and the other one is compound, the simple goes to a1:
-        res = Volume()
-        res.__a1, res.__a2 = Volume.sort_operands(self, othr)
-        res.__op = 'or'
-        return res
+        a1, a2 = Volume.sort_operands(self, othr)
+        return Volume._make(a1, 'or', a2)
 
     def __str__(self):
         """
@@ -528,6 +593,27 @@ class Volume(object):
         >>> print v1 | v3
         (a1 -b1):(a3 -b3)
 
+        """
+        if self.__s is None:
+            # Strings of the operands are computed first. Not recursively,
+            # since volumes obtained by repeated & or | can be very deep.
+            stack = [self]
+            while stack:
+                v = stack[-1]
+                if v.__s is None and v.__op is not None:
+                    a = [o for o in (v.__a2, v.__a1) if o.__s is None]
+                    if a:
+                        stack.extend(a)
+                        continue
+                if v.__s is None:
+                    v.__s = v.__str()
+                stack.pop()
+        return self.__s
+
+    def __str(self):
+        """
+        Returns string representation of self. For compound volumes, string
+        representation of operands must be already known.
         """
         if self.__a1 == (1, ):
                 return 'Empty Set'
@@ -578,6 +664,8 @@ class Volume(object):
             return '{0}{1}{2}'.format(a1, op, a2)
 
     def __eq__(self, othr):
+        if self is othr:
+            return True
         if not isinstance(othr, self.__class__):
             return False
         else:
@@ -590,6 +678,9 @@ class Volume(object):
         From the help for hash(): Two objects with the same value have the same
         hash value. The reverse is not necessarily true, but likely.
 
+        The hash is computed when the volume is created. Equal volumes are
+        the same instance:
+
         >>> v1 = Volume(1, 'a')
         >>> v2 = v1.copy()
         >>> v3 = v1.copy(lambda x: x.upper())
@@ -598,24 +689,27 @@ class Volume(object):
         ...     for b in [v1, v2, v3, v4]:
         ...         print a, b, (a is b), (hash(a) == hash(b)), (a == b)
         a a True True True
-        a a False True True
+        a a True True True
         a A False False False
-        a a False True True
-        a a False True True
+        a a True True True
+        a a True True True
         a a True True True
         a A False False False
-        a a False True True
+        a a True True True
         A a False False False
         A a False False False
         A A True True True
         A a False False False
-        a a False True True
-        a a False True True
+        a a True True True
+        a a True True True
         a A False False False
         a a True True True
 
         """
-        return hash((self.__a1, self.__op, self.__a2))
+        if self.__h is None:
+            # unhashable definition, raise TypeError
+            return hash((self.__a1, self.__op, self.__a2))
+        return self.__h
 
     def surfaces(self):
         """
@@ -665,7 +759,7 @@ class Volume(object):
 
         return res
 
-    def copy(self, mapp=lambda x:x):
+    def copy(self, mapp=lambda x:x, memo=None):
         """
         Returns a (deep) copy of the volume.
 
@@ -675,6 +769,11 @@ class Volume(object):
 
         UPD: mapp can be a dictionary.
 
+        Sub-volumes used several times are copied only once. Optional
+        dictionary memo keeps their copies; it can be passed to subsequent
+        calls with the same mapp, to reuse copies of sub-volumes common to
+        several volumes.
+
         Lets create a complex volume:
 
         >>> v = Volume(1, 'a')
@@ -696,21 +795,36 @@ class Volume(object):
         else:
             mpp = mapp
 
-        if isinstance(self.__a1, tuple):
-            # new definition:
-            if len(self.__a1) == 1:
-                # this is the special volume. Ruturn its copy:
-                return self*1
+        if memo is None:
+            memo = {}
+        # Operands are copied first, a1 before a2 (mapp can assign new
+        # surface IDs). memo maps id of a volume to tuple (volume, copy).
+        stack = [self]
+        while stack:
+            v = stack[-1]
+            if id(v) in memo:
+                stack.pop()
+                continue
+            if v.__op is not None:
+                a = [o for o in (v.__a2, v.__a1) if id(o) not in memo]
+                if a:
+                    stack.extend(a)
+                    continue
+                a1 = memo[id(v.__a1)][1]
+                a2 = memo[id(v.__a2)][1]
+                if v.__op == 'and':
+                    c = a1 & a2
+                else:
+                    c = a1 | a2
+            elif len(v.__a1) == 1:
+                # this is the special volume.
+                c = v
             else:
-                ndef = mpp(self.__a1[1]) # new definition
-                return Volume(self.__a1[0], ndef)
-        else:
-            a1 = self.__a1.copy(mpp)
-            a2 = self.__a2.copy(mpp)
-            if self.__op == 'and':
-                return a1 & a2
-            else:
-                return a1 | a2
+                ndef = mpp(v.__a1[1]) # new definition
+                c = Volume(v.__a1[0], ndef)
+            memo[id(v)] = (v, c)
+            stack.pop()
+        return memo[id(self)][1]
 
     def is_union(self):
         """
@@ -794,34 +908,34 @@ class Volume(object):
 
     def _simplify(self):
         """
-        Replaces some simple volumes by special sets.
-        """
-        res = self.copy()
-        ls, lc = res.intersection_operands()
-        for c in lc:
-            # c's second operand is a pure union, try to simplify it against the list ls.
-            for (p,i) in c.a2.volumes((c, 1)):
-                v = p.a[i]
-                vc = -v
-                for lse in ls:
-                    if v == lse:
-                        # the whole compound volume can be skipped. For the intersection operation,
-                        # this is like intersect with the universal set
-                        c.__a2 = -Volume(0)
-                        break
-                    if vc == lse:
-                        # replace -v in p by the empty set:
-                        if i == 0:
-                            p.__a1 = Volume(0)
-                        elif i == 1:
-                            p.__a2 = Volume(0)
-                        else:
-                            raise ValueError('Index i cannot be other that 0 or 1')
-
+        Returns simplified volume. If self is an intersection, its union
+        operands containing one of the simple intersection operands are
+        skipped, and simple volumes complementary to the simple
+        intersection operands are removed from the union operands.
+        """
+        ls, lu, lo = self.intersection_operands()
+        res = -Volume(0)
+        for v in ls + lo:
+            res = res & v
+        for u in lu:
+            vols = u.volumes()
+            if any(v in ls for v in vols):
+                # u contains ls, intersection with it changes nothing.
+                continue
+            nu = Volume(0)
+            for v in vols:
+                if -v not in ls:
+                    nu = nu | v
+            res = res & nu
         return res
 
 
 
+def _volume(a1, op, a2):
+    # used to unpickle volumes
+    return Volume._make(a1, op, a2)
+
+
 class SurfaceCollection(Collection):
     """
     Class to describe a collection of simple surfaces (SS) and macrobodies
@@ -878,6 +992,27 @@ class SurfaceCollection(Collection):
                 vID = self._add(surf)
         return vID
 
+    def _keys(self, surf):
+        """
+        Returns canonical keys of surf: the surface type and parameters
+        bucketed with the width 10**(1-Surface.PRECISION). For parameters close
+        to the bucket boundary, the neighbour bucket is considered as well,
+        since surfaces are equal when their parameters differ less than the
+        precision.
+        """
+        w = 10.**(1 - Surface.PRECISION)   # bucket width
+        d = 10.**(-Surface.PRECISION)      # tolerance, taken with a margin
+        bl = []
+        for p in surf.prm:
+            b = int(floor(p / w))
+            if p - b*w < d:
+                bl.append((b, b-1))
+            elif (b+1)*w - p < d:
+                bl.append((b, b+1))
+            else:
+                bl.append((b, ))
+        return [(surf.tpe, ) + bb for bb in product(*bl)]
+
     def _prepare_surface(self, surf=None, **kwargs):
         """
         If surf is not of the Surface class, pass it and kwargs to the Surface
@@ -926,7 +1061,7 @@ class SurfaceCollection(Collection):
             # surf is a MB. Add their facets.
             for (i, f) in zip(range(ll), flist):
                 fID = Volume(f.a1[0], '{0}.{1}'.format(vID.a1[1], i+1))
-                self._Collection__d[fID] = flist[i].a1[1]
+                self._register(fID, flist[i].a1[1])
         return vID
 
     def cards(self, filter_=lambda ID: isinstance(ID, int), formatted=True):
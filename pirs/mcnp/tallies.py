@@ -27,10 +27,17 @@ try:
 except ImportError:
     _uncertainties_package = False
 
+# numpy is useful, but not always present. Use optionally.
+try:
+    import numpy
+    numpy_exists = True
+except ImportError:
+    numpy_exists = False
+
 from ..core.trageom import Vector3
 from . import formatter
 from .auxiliary import Counter, Collection
-from .mctal import str2float
+from .mctal import str2float, add_e_to_block
 
 class MeshTally(object):
     """Representation of mesh tally.
@@ -82,8 +89,10 @@ class MeshTally(object):
         self.__par = 'n'  # tallying particles
         self.__typ = 4    # tally type
         self.__fmt = None # tally multiplier
-        self.__val = []   # place for result values.
+        self.__res = []   # place for result values, as read from meshtal.
         self.__err = []   # place for result rel.errors
+        self.__unc = False # flag to represent values with uncertainties
+        self.__val = None # values list, created from __res on demand.
         return
 
     @property
@@ -302,20 +311,82 @@ class MeshTally(object):
     @property
     def values(self):
         """
-        Returns list of (value, err) tuples, in the same order as in the
-        meshtal file with 'col' format.
+        Returns list of values, in the same order as in the meshtal file with
+        'col' format. If the results were set with use_uncertainties, list
+        elements are instances of the uncertainties.Variable class.
+
+        The list is created from the value_array on the first access, thus
+        Variable instances are created only for tallies whose values are
+        actually used.
 
         Returns [] by default.
         """
+        if self.__val is None:
+            if numpy_exists and isinstance(self.__res, numpy.ndarray):
+                vals = self.__res.tolist()
+                errs = self.__err.tolist()
+            else:
+                vals = list(self.__res)
+                errs = self.__err
+            if self.__unc:
+                # Variable requires std_dev of the variable. In MCNP, r is a
+                # relative error, r = S/v, where S is the estimated standard
+                # deviation.
+                vals = [Variable(v, r*v) for (v, r) in zip(vals, errs)]
+            self.__val = vals
         return self.__val
 
     @property
     def errors(self):
         """
-        Returns list of errors, in the same order as values attribute.
+        Returns list of relative errors, in the same order as values attribute.
         """
+        if numpy_exists and isinstance(self.__err, numpy.ndarray):
+            return self.__err.tolist()
         return self.__err
 
+    @property
+    def uncertainties(self):
+        """
+        True if the values property returns values with uncertainties, see
+        set_results().
+        """
+        return bool(self.__unc)
+
+    @property
+    def value_array(self):
+        """
+        Tally values as read from meshtal, without uncertainties.
+
+        When numpy is available, this is a numpy array (the list of floats
+        otherwise).
+        """
+        return self.__res
+
+    @property
+    def error_array(self):
+        """
+        Relative errors as read from meshtal. See value_array.
+        """
+        return self.__err
+
+    def set_results(self, values, errors, use_uncertainties=False):
+        """
+        Replaces tally results with values and relative errors.
+
+        Arguments values and errors are sequences of floats or numpy arrays of
+        equal length. If use_uncertainties is True (and the uncertainties
+        package is available), the values property returns Variable instances
+        (created on demand).
+        """
+        if len(values) != len(errors):
+            raise ValueError('Different number of values and errors')
+        self.__res = values
+        self.__err = errors
+        self.__unc = use_uncertainties and _uncertainties_package
+        self.__val = None
+        return
+
     def items(self):
         """
         Returns list of ((E, x, y, z), (val, err)) tuples. The order is the same as in the meshtal file with 'col' format.
@@ -400,12 +471,199 @@ class MeshTally(object):
         return self.card(True)
 
 
-def read_meshtal(fname, use_uncertainties=True):
+def _read_spec_line(mt, l):
+    """
+    Sets tally specification to mt from line l of the tally specification
+    block of meshtal file.
+    """
+    if '  Cylinder origin at' == l[0:20]:
+        mt.geom = 'cyl'
+        ll = l.split()
+        mt.origin = ( ll[3], ll[4], ll[5][:-1] ) # the last entry followed by comma
+        mt.axs = tuple( ll[8:11] )
+    if '    X direction:' == l[0:16]:
+        mt.imesh.pop(0) # when initialized, it is set to [1.]
+        for ll in l.split()[2:]:
+            mt.imesh.append(str2float(ll))
+        mt.origin.x = mt.imesh.pop(0)
+    if '    Y direction:' == l[0:16]:
+        mt.jmesh.pop(0) # when initialized, it is set to [1.]
+        for ll in l.split()[2:]:
+            mt.jmesh.append(str2float(ll))
+        mt.origin.y = mt.jmesh.pop(0)
+    if '    Z direction:' == l[0:16]:
+        if mt.geom == 'xyz':
+            mt.kmesh.pop(0) # when initialized, it is set to [1.]
+            for ll in l.split()[2:]:
+                mt.kmesh.append(str2float(ll))
+            mt.origin.z = mt.kmesh.pop(0)
+        elif mt.geom == 'cyl':
+            for ll in l.split()[2:]:
+                mt.jmesh.append(str2float(ll))
+        else:
+            raise ValueError('Cannot read Z direction boundaries for geometry type ', mt.geom)
+
+    if '    R direction:' == l[0:16]:
+        for ll in l.split()[2:]:
+            mt.imesh.append(str2float(ll))
+    if '    Theta direction:' == l[0:20]:
+        for ll in l.split()[3:]:
+            mt.kmesh.append(str2float(ll))
+    if '    Energy bin bound' == l[0:20]:
+        lll = l.split()
+        if lll[-2:] == ['0.00E+00', '1.00E+36']:
+            # this is default.
+            pass
+        else:
+            for ll in lll[3:]:
+                mt.emesh.append(str2float(ll))
+    return
+
+
+class MeshtalFile(object):
+    """Index of a meshtal file.
+
+    When an instance is created, the meshtal file is scanned once to find
+    the problem title, number of histories and, for each mesh tally, byte
+    offsets of its specification block and of its table with results. The
+    result tables are not parsed at this step.
+
+    Results of particular tallies are decoded on demand by the read_tally()
+    method. The result table is read as one block and converted to arrays of
+    values and relative errors (numpy arrays, if numpy is available).
+
+    >>> mf = MeshtalFile('meshtal')
+    >>> print mf.title, mf.nps
+    >>> print mf.keys()
+    >>> mt = mf.read_tally(14)
+    >>> print mt.value_array
+
+    """
+    # size of chunks used to find the end of result tables.
+    CHUNK = 2**20
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.title = ''
+        self.nps = 0
+        self.__idx = {} # tally number -> (spec. offset, table offset, table end, header)
+        self._index()
+        return
+
+    def _index(self):
+        f = open(self.fname, 'r')
+        tit = [f.readline(), f.readline()]
+        self.title = tit[-1]
+        tid = None
+        spec = None
+        while True:
+            pos = f.tell()
+            l = f.readline()
+            if not l:
+                break
+            if self.nps == 0 and ' Number of histories' == l[0:20]:
+                self.nps = str2float(l.split()[-1]) # in meshtal number of histories is written with two zeroes after the decimal point
+            elif ' Mesh Tally Number' == l[0:18]:
+                tid = int(l.split()[-1])
+                spec = pos
+            elif 'Result     Rel Error' in l:
+                # this is the head line for the table with results.
+                beg = f.tell()
+                end = self._skip_table(f, beg)
+                self.__idx[tid] = (spec, beg, end, l)
+        f.close()
+        return
+
+    def _skip_table(self, f, beg):
+        """
+        Returns offset of the end of the result table starting at beg and
+        positions f after the table. The table ends with an empty line or
+        with the end of file.
+        """
+        prev = '\n' # Table starts at the line beginning.
+        off = beg
+        while True:
+            chunk = f.read(self.CHUNK)
+            if not chunk:
+                return off
+            buf = prev + chunk
+            i = buf.find('\n\n')
+            if i >= 0:
+                end = off - len(prev) + i + 1
+                f.seek(end + 1)
+                return end
+            off += len(chunk)
+            prev = chunk[-1]
+
+    def keys(self):
+        """
+        Returns list of tally numbers found in the meshtal file.
+        """
+        return self.__idx.keys()
+
+    def __contains__(self, tid):
+        return tid in self.__idx
+
+    def read_tally(self, tid, use_uncertainties=False, mt=None):
+        """
+        Reads specification and results of the mesh tally tid.
+
+        Returns an instance of the MeshTally class. If the optional argument
+        mt is given, only results are read and put into mt, which is returned.
+        """
+        spec, beg, end, head = self.__idx[tid]
+        f = open(self.fname, 'r')
+        if mt is None:
+            mt = MeshTally()
+            f.seek(spec)
+            while f.tell() < beg:
+                _read_spec_line(mt, f.readline())
+        f.seek(beg)
+        block = f.read(end - beg)
+        f.close()
+
+        # define the column indices containing Result and Error:
+        head = head.replace('Rel Error', 'Err')    # ensure that number of tokens after split() is equal to the number of data columns
+        head = head.replace('Rslt * Vol', 'RxV')
+        columns = head.split()
+        nc = len(columns)
+        iv = columns.index('Result')
+        ir = columns.index('Err')
+
+        block = block.replace('Total', '-1') # "Total" appears when emesh is used
+        block = add_e_to_block(block)
+        if numpy_exists:
+            a = numpy.fromstring(block, sep=' ')
+            a = a.reshape((-1, nc))
+            v = a[:, iv].copy()
+            r = a[:, ir].copy()
+        else:
+            a = block.split()
+            v = map(float, a[iv::nc])
+            r = map(float, a[ir::nc])
+        mt.set_results(v, r, use_uncertainties)
+        return mt
+
+    def read(self, tids=None, use_uncertainties=False):
+        """
+        Returns dictionary of MeshTally instances for tally numbers tids. By
+        default, all tallies are read.
+        """
+        if tids is None:
+            tids = self.keys()
+        res = {}
+        for tid in tids:
+            res[tid] = self.read_tally(tid, use_uncertainties)
+        return res
+
+
+def read_meshtal(fname, use_uncertainties=True, tallies=None):
     """Reads meshtal file.
     
     Meshtal file to read is given by its name in the argument fname. Optional
     argument use_uncertainties specifies whether to use the Uncertainties
-    package to store statistical error.
+    package to store statistical error. Optional argument tallies is a list of
+    tally numbers to read; by default all tallies are read.
 
     Returns a tuple (t, n, r), where:
     
@@ -421,96 +679,10 @@ def read_meshtal(fname, use_uncertainties=True):
     ...     print n
     ...     print mt.values
 
+    See also the MeshtalFile class.
     """
-    Noh = 0
-    res = {}
-    tit = [] # title
-    data_block = False          # flag to specify if results (True) or tally specs (False) are read
-    for l in open(fname, 'r'):
-        if len(tit) < 2:
-            # first two lines go to the tit list.
-            tit.append(l)
-        elif not data_block:
-            # this is tally specifications block
-            if Noh == 0 and ' Number of histories' == l[0:20]:
-                Noh = str2float(l.split()[-1])  # in meshtal number of histories is written with two zeroes after the decimal point
-            if l == '\n':
-                pass
-            if ' Mesh Tally Number' == l[0:18]:
-                tid = int(l.split()[-1])
-                mt = MeshTally()
-                res[tid] = mt
-            if '  Cylinder origin at' == l[0:20]:
-                mt.geom = 'cyl'
-                ll = l.split()
-                mt.origin = ( ll[3], ll[4], ll[5][:-1] ) # the last entry followed by comma
-                mt.axs = tuple( ll[8:11] )
-            if '    X direction:' == l[0:16]:
-                mt.imesh.pop(0) # when initialized, it is set to [1.]
-                for ll in l.split()[2:]:
-                    mt.imesh.append(str2float(ll))
-                mt.origin.x = mt.imesh.pop(0)
-            if '    Y direction:' == l[0:16]:
-                mt.jmesh.pop(0) # when initialized, it is set to [1.]
-                for ll in l.split()[2:]:
-                    mt.jmesh.append(str2float(ll))
-                mt.origin.y = mt.jmesh.pop(0)
-            if '    Z direction:' == l[0:16]:
-                if mt.geom == 'xyz':
-                    mt.kmesh.pop(0) # when initialized, it is set to [1.]
-                    for ll in l.split()[2:]:
-                        mt.kmesh.append(str2float(ll))
-                    mt.origin.z = mt.kmesh.pop(0)
-                elif mt.geom == 'cyl':
-                    for ll in l.split()[2:]:
-                        mt.jmesh.append(str2float(ll))
-                else:
-                    raise ValueError('Cannot read Z direction boundaries for geometry type ', mt.geom)
-
-            if '    R direction:' == l[0:16]:
-                for ll in l.split()[2:]:
-                    mt.imesh.append(str2float(ll))
-            if '    Theta direction:' == l[0:20]:
-                for ll in l.split()[3:]:
-                    mt.kmesh.append(str2float(ll))
-            if '    Energy bin bound' == l[0:20]:
-                lll = l.split()
-                if lll[-2:] == ['0.00E+00', '1.00E+36']:
-                    # this is default.
-                    pass
-                else:
-                    for ll in lll[3:]:
-                        mt.emesh.append(str2float(ll))
-            if 'Result     Rel Error' in l:
-                # this is the head line for the table with results.
-                data_block = True
-                # define the column indices containing Result and Error:
-                l = l.replace('Rel Error', 'Err')    # ensure that number of tokens after split() is equal to the number of data columns
-                l = l.replace('Rslt * Vol', 'RxV')
-                columns = l.split()
-                iv = columns.index('Result')
-                ir = columns.index('Err')
-        else:
-            # reading the table with tally results.
-            if l == '\n':
-                # this is the end of table with results.
-                data_block = False
-            else:
-                l = l.replace('Total', '-1') # "Total" appears when emesh is used
-                ll = l.split()
-                v = str2float(ll[iv])
-                r = str2float(ll[ir])
-                # Variable requires std_dev of the variable. In MCNP, r is a
-                # relative error, r = S/v, where S is the estimated standard
-                # deviation.
-                if use_uncertainties and _uncertainties_package:
-                    value = Variable(v, r*v)
-                else:
-                    # value = (v, r)
-                    value = v
-                mt.values.append(value)
-                mt.errors.append(r)
-    return tit[-1], Noh, res
+    mf = MeshtalFile(fname)
+    return mf.title, mf.nps, mf.read(tallies, use_uncertainties)
 
 
 
@@ -548,6 +720,13 @@ class TallyCollection(Collection):
         else:
             raise TypeError('Cannot add tally of type ', tally.__class__.__name__)
 
+    def _keys(self, tally):
+        """
+        Canonical key of the mesh tally: its type, geometry and mesh boundaries.
+        """
+        return [(tally.ttype, tally.geom, tuple(tally.imesh), tuple(tally.jmesh),
+                 tuple(tally.kmesh), tuple(tally.emesh))]
+
     def add(self, tally):
         self.index(tally)
         print "WARNING: use of TallyCollection.add() method is deprecated. Use index() method instead."
@@ -585,16 +764,11 @@ class TallyCollection(Collection):
         Reads meshtal and mctal and loads data to correspondent tally instances.
         """
         if meshtal is not None:
-            title, noh, d = read_meshtal(meshtal, self.__use_uncert)
-            # if meshtal was read, remove previous entries.
-
-            for nt in list( set(d.keys()) & set(self.keys())):
-                # clear old meshtally data
-                while len(self[nt].values) > 0:
-                    self[nt].values.pop()
-                for r in d[nt].values:
-                    # self[nt].values.append((str2float(r[0]), str2float(r[1])))
-                    self[nt].values.append(r)
+            # only tallies of the collection are decoded. Their results
+            # replace the previous ones.
+            mf = MeshtalFile(meshtal)
+            for nt in list( set(mf.keys()) & set(self.keys())):
+                mf.read_tally(nt, self.__use_uncert, self[nt])
         if mctal is not None:
             raise NotImplemented('reding of mctal file not implemented yet')
         return 
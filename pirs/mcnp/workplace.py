@@ -271,6 +271,14 @@ class McnpWorkPlace(scheduler.WorkPlace):
         'R': Initial run. Requires inp, optionally uses srctp.
 
         'C': Continue run. Requires runtpe, optionally uses ccard if given as an optional keyword argument.
+
+        By default, the method returns after MCNP finished. If the optional
+        keyword argument wait is False, MCNP is started and a
+        scheduler.JobFuture instance is returned immediately. Files generated
+        by MCNP are registered in the workplace when the result() method of the
+        future is called. Several MCNP runs can be started this way to run
+        simultaneously, optionally limited by the scheduler instance passed as
+        the scheduler keyword argument (see scheduler.Scheduler.max_workers).
         """
         self.files[:] = []  # clears list in-place.
         lmode = mode.lower()
@@ -366,45 +374,60 @@ class McnpWorkPlace(scheduler.WorkPlace):
 
         #prepare job
         j = scheduler.Job(os.path.join(os.path.curdir, self.batch.basename), self.lcd)
-        s = scheduler.Scheduler()
-        s.add('j', j)
+        s = kwargs.get('scheduler', None)
+        if s is None:
+            s = scheduler.Scheduler()
+        s.add(self.lcd, j)
         print 'Started mcnp {0} mode={1}, kwargs={2}'.format(j, mode, kwargs)
 
         # start Job:
         if mode.isupper():
-            self.stdout = s.run('j', files=[nout], llines=[outp.RELL], sec=kwargs.get('sec', 5))
-            self.run_time = s.run_time
+            f = s.submit(self.lcd, files=[nout], llines=[outp.RELL], sec=kwargs.get('sec', 5))
             # NOTE: under windows, a long stdout results in
             #       hanging the process started by job.run(). Therefore,
             #       the MCNP std.out is redirected to mcnp.stdout in the 
             #       batch file.
+            f.add_callback(lambda f: self.__finish(f, nout))
+            if kwargs.get('wait', True):
+                f.result()
+            else:
+                return f
+        return
+
+    def __finish(self, f, nout):
+        """
+        Updates file names after MCNP run started with the job future f is
+        done.
+        """
+        self.stdout = f.result()
+        self.run_time = f.run_time
 
-            # update filenames, if run was successful
+        # update filenames, if run was successful
 
-            # the outp name:
-            self.__out.exfile = os.path.join(self.lcd, nout)
+        # the outp name:
+        self.__out.exfile = os.path.join(self.lcd, nout)
 
-            names = outp.get_filenames(self.__out.exfile)
-            if names['terminated'] is not None and 'fatal' in names['terminated']:
-                raise OSError('MCNP ended with fatal errors\n', self.stdout)
-            else:
-                # update filenames only if they were
-                # actually generated. If no new file
-                # was generated, do nothing.
-                if names['srctp'] is not None:
-                    self.__srctp.exfile = names['srctp']
-                if names['runtpe'] is not None:
-                    self.__runtpe.exfile = names['runtpe']
-                if names['meshtal'] is not None:
-                    self.__meshtal.exfile = names['meshtal']
-                if names['mctal'] is not None:
-                    self.__mctal.exfile = names['mctal']
-            # append log to the report file:
-            log = open(os.path.join(self.lcd, 'workplace.report'), 'a')
-            print >>log
-            print >>log, 'files generated by MCNP: ', names
-            print >>log
-            log.close()
+        names = outp.get_filenames(self.__out.exfile)
+        if names['terminated'] is not None and 'fatal' in names['terminated']:
+            raise OSError('MCNP ended with fatal errors\n', self.stdout)
+        else:
+            # update filenames only if they were
+            # actually generated. If no new file
+            # was generated, do nothing.
+            if names['srctp'] is not None:
+                self.__srctp.exfile = names['srctp']
+            if names['runtpe'] is not None:
+                self.__runtpe.exfile = names['runtpe']
+            if names['meshtal'] is not None:
+                self.__meshtal.exfile = names['meshtal']
+            if names['mctal'] is not None:
+                self.__mctal.exfile = names['mctal']
+        # append log to the report file:
+        log = open(os.path.join(self.lcd, 'workplace.report'), 'a')
+        print >>log
+        print >>log, 'files generated by MCNP: ', names
+        print >>log
+        log.close()
         return
 
 
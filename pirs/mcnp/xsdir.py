@@ -26,6 +26,9 @@ Classes to represent data from xsdir file.
 import os
 import sys
 import linecache
+import hashlib
+import json
+from bisect import bisect_left
 from pirs.core.trageom.vector import _are_close
 
 #: the $DATAPATH environmental variable.
@@ -40,12 +43,55 @@ if XSDIRPATH is None:
 #: path to the default xsdir file.
 XSDIRFILE = os.path.join(XSDIRPATH, 'xsdir')
 
+# Boltzmann constant, MeV/K. Temperatures in xsdir are in MeV.
+_K = 8.617343e-11
+
+#: Directory for cache files of parsed xsdir files, see Xsdir.read().
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                         os.path.join(os.path.expanduser('~'), '.cache'), 'pirs')
+
+#: If True, cache files are also written to and read from the directory of
+#: the xsdir file, and can be shared by users of the same DATAPATH.
+CACHE_NEXT_TO_XSDIR = False
+
+# Version of the cache file format. Cache files of other versions are ignored.
+_CACHE_VERSION = 2
+
+
+def _cache_paths(apath):
+    """
+    Returns list of possible cache file names for the xsdir file apath: in
+    CACHE_DIR and, if CACHE_NEXT_TO_XSDIR is set, next to the xsdir file.
+    """
+    res = [os.path.join(CACHE_DIR, 'xsdir_{}.json'.format(hashlib.md5(apath).hexdigest()))]
+    if CACHE_NEXT_TO_XSDIR:
+        d, f = os.path.split(apath)
+        res.append(os.path.join(d, '.{}.pirs.json'.format(f)))
+    return res
+
+
+def _file_stat(path):
+    """
+    Returns [mtime, size] of file path, or None if it does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
 
 class Xsdir(object):
     """Container for data from xsdir file.
 
     Data can be added manually or read from existing file.
 
+    For the suffix search, entries of the directory section are indexed by
+    ZAID and cross-section type. The index is built on demand, and rebuilt
+    when entries are added to the directory list. Entries must not be
+    modified in place after the index is built.
+
+    Parsed xsdir files are cached on disk, see read().
     """
 
     __default = None
@@ -80,9 +126,10 @@ class Xsdir(object):
         self.__awr = {}
         self.__dir = []
         self.__pth = None # path to the read xsdir file. Set only when data is read from an xsdir file.
+        self.__idx = None # index of __dir, see _index()
         return
 
-    def read(self, path, append=False):
+    def read(self, path, append=False, cache=True):
         """
         Read existing xsdir file.
 
@@ -93,17 +140,98 @@ class Xsdir(object):
         appended to the data allready stored in the instance of Xsdir().
         Otherwise, the clear() method is called before reading the file.
 
+        If cache is True, the parsed content of the xsdir file, including
+        temperatures of thermal data, is written to a cache file, which is
+        used by the next call instead of parsing the xsdir file again. The
+        cache file is valid while modification time and size of the xsdir
+        file and of the thermal data files, where temperatures are read
+        from, are unchanged. The cache file is written to CACHE_DIR, and
+        next to the xsdir file if CACHE_NEXT_TO_XSDIR is set. Cache files
+        are in JSON format; files not owned by the current user or writable
+        by others are ignored.
+
         """
         if not append:
             self.clear()
 
         apath = os.path.abspath(path)
-        # print 'READ XSDIR {}'.format(apath)
-        # raise ValueError
-        xfile = open(apath, 'r')
         self.__pth = apath
-        dr = [] # directory records
-        ar = [] # awr records
+
+        key = [_CACHE_VERSION, apath, _file_stat(apath)]
+        data = None
+        if cache:
+            data = self._load_cache(apath, key)
+        if data is None:
+            data = self._parse(apath)
+            if cache:
+                self._dump_cache(apath, key, data)
+        awr, drecs, deps = data
+        self.__awr.update(awr)
+        for r in drecs:
+            d = DirEntry.__new__(DirEntry)
+            (d.ZAID, d.SUFF, d.PATH, d.MASS, d.TEMP, d.FTYP, d.ADDR) = r
+            self.__dir.append(d)
+        self.__idx = None
+        return
+
+    @staticmethod
+    def _load_cache(apath, key):
+        """
+        Returns data stored in the cache file for apath, or None if there is
+        no valid cache file.
+        """
+        for cpath in _cache_paths(apath):
+            try:
+                st = os.stat(cpath)
+                if hasattr(os, 'getuid') and (st.st_uid != os.getuid() or st.st_mode & 0o022):
+                    continue
+                with open(cpath, 'r') as f:
+                    ckey, (awr, drecs, deps) = json.load(f)
+            except Exception:
+                continue
+            if ckey != key:
+                continue
+            if any(_file_stat(p) != s for (p, s) in deps):
+                continue
+            awr = dict((int(z), a) for (z, a) in awr)
+            drecs = [(z if isinstance(z, int) else str(z), str(sf), str(pt), m, t, ft, ad)
+                     for (z, sf, pt, m, t, ft, ad) in drecs]
+            return awr, drecs, deps
+        return None
+
+    @staticmethod
+    def _dump_cache(apath, key, data):
+        """
+        Writes data to the first writable cache file for apath. Failure to
+        write is not an error.
+        """
+        awr, drecs, deps = data
+        data = (sorted(awr.items()), drecs, deps)
+        for cpath in _cache_paths(apath):
+            tpath = '{}.{}'.format(cpath, os.getpid())
+            try:
+                d = os.path.dirname(cpath)
+                if not os.path.isdir(d):
+                    os.makedirs(d, 0o700)
+                with open(tpath, 'w') as f:
+                    json.dump((key, data), f)
+                os.chmod(tpath, 0o644)
+                os.rename(tpath, cpath)
+            except (IOError, OSError):
+                continue
+
+    def _parse(self, apath):
+        """
+        Parses the xsdir file apath.
+
+        Returns a tuple (awr, drecs, deps), where awr is a dictionary, drecs
+        is a list of tuples (ZAID, SUFF, PATH, MASS, TEMP, FTYP, ADDR)
+        representing directory entries and deps is a list of [path, stat]
+        for thermal data files used to get temperatures, see _file_stat().
+        """
+        awr = {}
+        dr = []   # directory entries
+        xfile = open(apath, 'r')
         csec = '' # flag defining the current section
         for l1 in xfile:
             if   'directory' in l1[:13].lower():      # 13 is the sum of 5 + len('directory') - 1 , where 5 is the max. allowable offset of the keyword in xsdir file.
@@ -122,7 +250,7 @@ class Xsdir(object):
                     if l1[-2] == '+':              # last character in l1 is new-line
                         l1 = l1[:-2] + xfile.next()
 
-                    self.__dir.append( DirEntry(l1) )
+                    dr.append( DirEntry(l1) )
                 elif csec == 'awr':
                     # awr section is followed by other sections.  The awr
                     # section ends, when entries on the line cannot be
@@ -137,13 +265,20 @@ class Xsdir(object):
                         csec = ''
                         continue
                     finally:
-                        for (zaid, awr) in zip(ilist, flist):
-                            self.__awr[zaid] = awr
+                        for (zaid, a) in zip(ilist, flist):
+                            awr[zaid] = a
         xfile.close()
-        self._get_thermal_temperatures()
-        return
+        datapath = os.path.dirname(apath)
+        deps = set()
+        for d in dr:
+            if d.TYPE == 't' and d.TEMP == 0.:
+                deps.add(os.path.join(datapath, d.PATH))
+        deps = [[p, _file_stat(p)] for p in sorted(deps)]
+        self._get_thermal_temperatures(dr, datapath)
+        drecs = [(d.ZAID, d.SUFF, d.PATH, d.MASS, d.TEMP, d.FTYP, d.ADDR) for d in dr]
+        return awr, drecs, deps
 
-    def _get_thermal_temperatures(self):
+    def _get_thermal_temperatures(self, entries=None, datapath=None):
         """Reads thermal data temperature from cross-section data file.
 
         Directory entries with thermal data do not necessarily contain temperature.
@@ -151,16 +286,24 @@ class Xsdir(object):
         This method reads temperature from the correspondent data file, if it
         is in ASCII format.
 
+        Optional arguments specify the list of directory entries (all entries
+        by default) and the directory where data files are searched for
+        (self.datapath by default).
+
         """
         # print 'called mcnp.Xsdir._get_thermal_temperatures()'
-        rd = {}  # dictionary to read
-        for d in self.__dir:
+        if entries is None:
+            entries = self.__dir
+        if datapath is None:
+            datapath = self.datapath
+        for d in entries:
             if d.TYPE == 't' and d.TEMP == 0.:
                 # for thermal data types, if temperature
                 # not specified in xsdir, read it from the
                 # data file.
-                fname = os.path.join(self.datapath, d.PATH)
+                fname = os.path.join(datapath, d.PATH)
                 if os.path.isfile(fname):
+                    linecache.checkcache(fname)
                     hline = linecache.getline(fname, d.ADDR)
                     d.TEMP = float(hline.split()[2])
 
@@ -187,25 +330,75 @@ class Xsdir(object):
         by ZAID. In this case, T2 and S2 are the same as T1 and S1.
 
         """
-        if T is not None:
-            T1 = T - 10000.
-            T2 = T + 10000.
+        idx = self._index()
+        lst = idx.get((ZAID, xstype))
+        if not lst:
+            raise ValueError('Cannot find cross-sections for ZAID ', str(ZAID))
+        temps, entries = lst
+
+        if smin is None and smax is None:
+            def ok(de):
+                return True
+        else:
+            def ok(de):
+                XX = de.XX
+                return (smin is None or smin <= XX) and (smax is None or smax >= XX)
+
+        if T is None:
+            # the first entry in the directory, i.e. the one with the smallest
+            # position.
+            c = [(n, de) for (t, n, de) in entries if ok(de)]
+            if not c:
+                raise ValueError('Cannot find cross-sections for ZAID ', str(ZAID))
+            de = min(c)[1]
+            deT = de.TEMP / _K
+            return [(deT, de.SUFF), (deT, de.SUFF)]
+
+        # entries sorted by temperature and, for equal temperatures, by
+        # position in the directory. First, entries at temperature T:
+        N = len(entries)
+        i = bisect_left(temps, T)
+        k = i - 1
+        while k >= 0 and _are_close(temps[k], T):
+            k -= 1
+        c = None
+        for t, n, de in entries[k+1:]:
+            if not _are_close(t, T):
+                break
+            if ok(de) and (c is None or n < c[0]):
+                c = (n, de)
+        if c is not None:
+            de = c[1]
+            deT = de.TEMP / _K
+            return [(deT, de.SUFF), (deT, de.SUFF)]
+
+        # Closest temperature below T. For equal temperatures, the entry
+        # appearing first in the directory.
+        T1 = T - 10000.
+        T2 = T + 10000.
         S1 = ''
         S2 = ''
-        for de in self.__dir:
-            if de.ZAID == ZAID and de.SUFF[-1] == xstype:
-                XX = de.XX
-                if (smin is None or smin <= XX) and (smax is None or smax >= XX):
-                    deT = de.TEMP / 8.617343e-11 # temperature of de is in MeV, while T and Tol are in Kelvin.
-                    if T is None or _are_close(deT, T):
-                        return [(deT, de.SUFF), (deT, de.SUFF)]
-
-                    if   T1 < deT <= T:
-                        T1 = deT
-                        S1 = de.SUFF
-                    elif T <= deT < T2:
-                        T2 = deT
-                        S2 = de.SUFF
+        k = i - 1
+        while k >= 0 and temps[k] > T1:
+            t, n, de = entries[k]
+            if ok(de):
+                if S1 and t < T1c:
+                    break
+                T1c = t
+                S1 = de.SUFF
+            k -= 1
+        if S1:
+            T1 = T1c
+        # closest temperature above T.
+        k = i
+        while k < N and temps[k] < T2:
+            t, n, de = entries[k]
+            if ok(de):
+                T2 = t
+                S2 = de.SUFF
+                break
+            k += 1
+
         if S1 == '' and S2 == '':
             raise ValueError('Cannot find cross-sections for ZAID ', str(ZAID))
         elif S1 == '':
@@ -216,6 +409,23 @@ class Xsdir(object):
             S2 = S1
         return[ (T1, S1), (T2, S2)]
 
+    def _index(self):
+        """
+        Returns dictionary with keys (ZAID, xstype). Values are tuples (temps,
+        entries), where entries is a list of tuples (T, n, de), sorted by
+        temperature T (in K) and position n of the directory entry de in the
+        directory list, and temps is the list of temperatures of entries.
+        """
+        if self.__idx is None or self.__idx[0] != len(self.__dir):
+            d = {}
+            for n, de in enumerate(self.__dir):
+                d.setdefault((de.ZAID, de.SUFF[-1]), []).append((de.TEMP / _K, n, de))
+            for k, entries in d.items():
+                entries.sort()
+                d[k] = ([e[0] for e in entries], entries)
+            self.__idx = (len(self.__dir), d)
+        return self.__idx[1]
+
     def find_thermal(self, namepart, T):
         """
         Returns the name of thermal data containing string namepart, closest to
@@ -225,7 +435,7 @@ class Xsdir(object):
         name = None
         for d in self.__dir:
             if d.TYPE == 't' and namepart in d.ZAID + d.SUFF:
-                deT = d.TEMP / 8.617343e-11
+                deT = d.TEMP / _K
                 if abs(T-deT) < abs(T-Tfin):
                     name = d
                     Tfin = deT
@@ -55,6 +55,7 @@ from .input_help import hd as ScfHelpDictionary
 from .variables import ScfVariable, ScfSwitch, ScfTable
 from . import template25
 from . import defaults
+from ..tools.timing import timer
 
 
 class Input(list):
@@ -125,10 +126,13 @@ class Input(list):
 
     def run(self, mode='r', **kwargs):
         """
-        Prepares content of the input file and starts an SCF job.
+        Prepares content of the input file and starts an SCF job. Returns
+        the result of the workplace run() method, see ScfWorkPlace.run().
         """
-        self.__wp.input.string = str(self)
-        self.wp.run(mode, **kwargs)
+        with timer('scf.input'):
+            self.__wp.input.string = str(self)
+        with timer('scf.run'):
+            return self.wp.run(mode, **kwargs)
 
 
     def clear(self):
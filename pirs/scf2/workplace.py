@@ -104,6 +104,15 @@ class ScfWorkPlace(scheduler.WorkPlace):
         return
 
     def run(self, mode='r', **kwargs):
+        """
+        Prepares directory and, if mode is 'R', starts SCF.
+
+        By default, the method returns after SCF finished. If the optional
+        keyword argument wait is False, a scheduler.JobFuture instance is
+        returned immediately, and output files are registered when its
+        result() method is called. A scheduler instance can be passed as the
+        scheduler keyword argument to limit the number of simultaneous jobs.
+        """
         del self.files[:]
         lmode = mode.lower()
         if lmode == 'r':
@@ -124,20 +133,34 @@ class ScfWorkPlace(scheduler.WorkPlace):
 
         # prepare job
         j = scheduler.Job(os.path.join(os.path.curdir, self.batch.basename), self.lcd)
-        s = scheduler.Scheduler()
-        s.add('j', j)
+        s = kwargs.get('scheduler', None)
+        if s is None:
+            s = scheduler.Scheduler()
+        s.add(self.lcd, j)
         print 'Started scf, ', j
         # start Job:
         if mode.isupper():
-            self.stdout = s.run('j')
+            f = s.submit(self.lcd)
             # NOTE: under windows, a long stdout results in
             #       hanging the process started by job.run(). Therefore,
             #       the MCNP std.out is redirected to mcnp.stdout in the 
             #       batch file.
+            f.add_callback(self.__finish)
+            if kwargs.get('wait', True):
+                f.result()
+            else:
+                return f
+        return
+
+    def __finish(self, f):
+        """
+        Called when the SCF job started with the job future f is done.
+        """
+        self.stdout = f.result()
 
-            # save the name of the output file:
-            for o in [self.__out, self.__clean, self.__plr0]:
-                o.exfile = os.path.join(self.lcd, o.basename)
+        # save the name of the output file:
+        for o in [self.__out, self.__clean, self.__plr0]:
+            o.exfile = os.path.join(self.lcd, o.basename)
 
 
         return
@@ -55,7 +55,7 @@ from shapely.ops import cascaded_union
 from shapely.affinity import translate
 
 from pirs.tools.plots.plot_shapely import ShapelyToAxis
-from qhull_interface import Triangulation
+from qhull_interface import triangulation
 
 from random import uniform
 
@@ -775,13 +775,14 @@ class Bundle(object):
         Returns an instance of the Triangulation() class that represents
         triangulation of the bundle.
 
-        Note that each call to this method results in qhul run, that might be
-        time consuming. Consider saving results of this method in a variable.
+        Triangulations are cached by the vertex coordinates, see
+        qhull_interface.triangulation(). The returned instance is shared
+        and must not be changed.
         """
         # collect vertices, 
         # sites = list(self._vertices())
         # return Triangulation([v for v in self._vertices()]) 
-        return Triangulation( list(self._vertices()) )
+        return triangulation( list(self._vertices()) )
 
     def own_subchannels(self):
         """
@@ -20,8 +20,21 @@
 
 from subprocess import Popen, call, PIPE
 import itertools
-from shapely.geometry import Polygon, MultiLineString
-
+try:
+    from shapely.geometry import Polygon, MultiLineString
+except ImportError:
+    # only Triangulation.sMultiLine() needs shapely.
+    MultiLineString = None
+try:
+    import numpy
+    from scipy.spatial import Delaunay
+except ImportError:
+    # triangulation is computed by the qdelaunay command.
+    Delaunay = None
+
+#: Maximal number of triangulations kept by triangulation().
+CACHE_SIZE = 128
+_cache = {}
 
 
                     
@@ -74,44 +87,44 @@ def qdelaunay(points, options='i Fx Fn FN FP'):
     stdout, stderr = _run('qdelaunay', 'Qz ' + options, inp)
 
     # process the output:
-    stdoutlines = stdout.splitlines()
+    stdoutlines = iter(stdout.splitlines())
     output = {} # dictionary {option: output}, where option is output option passed to qdelaunay and output is the correspondent output.
 
     for option in options.split():
         if option == 'i':
             # output for the 'i' option:
             out_i = [] # list of lists [ region_definition1, region_definition2, ...], where region_definitionI is a list of input site indices that define region with index I.
-            N = int(stdoutlines.pop(0)) # number of facets
+            N = int(next(stdoutlines)) # number of facets
             for i in range(N):
                 # list of input sites that define the Delaunay region
-                slist = map(int, stdoutlines.pop(0).split())
+                slist = map(int, next(stdoutlines).split())
                 out_i.append(slist)
             output[option] = out_i
 
         elif option == 'Fx':
             # output for the 'Fx' option:
             out_Fx = [] # list of extreme site indices.
-            N = int(stdoutlines.pop(0))
+            N = int(next(stdoutlines))
             for i in range(N):
-                n = int(stdoutlines.pop(0))
+                n = int(next(stdoutlines))
                 out_Fx.append(n)
             output[option] = out_Fx
 
         elif option == 'Fn':
             # output for the 'Fn' option:
             out_Fn = [] # list of lists [ region_neighbours1, region_neighbours2, ...], where regoin_neighboursI is a list of region indices adjacent to the region with index I.
-            N = int(stdoutlines.pop(0))
+            N = int(next(stdoutlines))
             for i in range(N):
-                nlist = map(int, stdoutlines.pop(0).split())[1:] # the first element is the number of regions, not needed.
+                nlist = map(int, next(stdoutlines).split())[1:] # the first element is the number of regions, not needed.
                 out_Fn.append(nlist)
             output[option] = out_Fn
 
         elif option == 'FN':
             # output for the 'FN' option:
             out_FN = [] # list of lists [region_neighbours1, region_neighbours2, ...], where regoin_neighboursI is a list of region indices adjacent to the site with index I.
-            N = int(stdoutlines.pop(0))
+            N = int(next(stdoutlines))
             for i in range(N):
-                nlist = map(int, stdoutlines.pop(0).split())[1:] # the first element is the number of regions, not needed.
+                nlist = map(int, next(stdoutlines).split())[1:] # the first element is the number of regions, not needed.
                 if nlist:
                     out_FN.append(nlist)
             output[option] = out_FN
@@ -119,9 +132,9 @@ def qdelaunay(points, options='i Fx Fn FN FP'):
         elif option == 'FP':
             # output for the 'FP' option:
             out_FP = [] # list of deleted site indices. 
-            N = int(stdoutlines.pop(0))
+            N = int(next(stdoutlines))
             for i in range(N):
-                nlist = map(int, stdoutlines.pop(0).split()) 
+                nlist = map(int, next(stdoutlines).split()) 
                 out_FP.append(nlist[1])
             output[option] = out_FP
 
@@ -130,6 +143,104 @@ def qdelaunay(points, options='i Fx Fn FN FP'):
 
     return output
 
+
+def _cocircular(abc, d, eps=1e-10):
+    # True if point d lies on the circle through the points abc.
+    m = numpy.asarray(abc) - d
+    l = (m**2).sum(axis=1)
+    det = numpy.linalg.det(numpy.column_stack((m, l)))
+    return abs(det) <= eps * max(l)**2
+
+
+def delaunay(points):
+    """
+    Returns dictionary with the same content as qdelaunay(points, 'i Fx Fn FN
+    FP'). The triangulation is computed in-process by scipy.spatial, if
+    available, otherwise the qdelaunay command is called.
+
+    As in the qdelaunay output, triangles with common circumcircle are merged
+    into one region, vertices of regions are listed counter-clockwise,
+    'Fn' and 'FN' contain negative indices for the facets at infinity and
+    empty 'FN' lists are omitted. In 'Fn', there is one negative index for
+    each region edge on the convex hull, as in qdelaunay. Values of negative
+    indices, and their number in 'FN', differ from those given by qdelaunay.
+    """
+    if Delaunay is None:
+        return qdelaunay(points, 'i Fx Fn FN FP')
+
+    p = numpy.asarray(points, dtype=float)
+    t = Delaunay(p, qhull_options='Qbb Qc Qz')
+    simplices = t.simplices.tolist()
+    neighbors = t.neighbors.tolist()
+
+    # merge adjacent triangles with common circumcircle, qdelaunay represents
+    # them as one non-simplicial region.
+    group = range(len(simplices))
+    def find(r):
+        while group[r] != r:
+            r = group[r]
+        return r
+    for (r, (s, nb)) in enumerate(zip(simplices, neighbors)):
+        for n in nb:
+            if n > r:
+                d = [v for v in simplices[n] if v not in s][0]
+                if _cocircular(p[s], p[d]):
+                    group[find(n)] = find(r)
+    rindex = {} # triangle group -> region index
+    for r in range(len(simplices)):
+        rindex.setdefault(find(r), len(rindex))
+    rindex = [rindex[find(r)] for r in range(len(simplices))]
+
+    out_i = [set() for g in range(max(rindex) + 1)]
+    out_Fn = [[] for g in out_i]
+    out_FN = [[] for x in points]
+    hull = 0 # number of facets at infinity
+    for (r, (s, nb)) in enumerate(zip(simplices, neighbors)):
+        g = rindex[r]
+        out_i[g].update(s)
+        for (k, n) in enumerate(nb):
+            if n < 0:
+                # edge opposite to s[k] is on the convex hull.
+                hull += 1
+                out_Fn[g].append(-hull)
+                for v in s[:k] + s[k+1:]:
+                    out_FN[v].append(-hull)
+            elif rindex[n] != g and rindex[n] not in out_Fn[g]:
+                out_Fn[g].append(rindex[n])
+    for (g, vertices) in enumerate(out_i):
+        c = p[list(vertices)].mean(axis=0)
+        a = dict((v, numpy.arctan2(*(p[v] - c)[::-1])) for v in vertices)
+        out_i[g] = sorted(vertices, key=a.get)
+        for v in out_i[g]:
+            out_FN[v].append(g)
+    for (i, r, v) in t.coplanar.tolist():
+        out_FN[i].append(rindex[r])
+
+    output = {}
+    output['i'] = out_i
+    output['Fn'] = out_Fn
+    output['Fx'] = sorted(set(t.convex_hull.ravel().tolist()))
+    output['FN'] = [l for l in out_FN if l]
+    output['FP'] = t.coplanar[:, 0].tolist()
+    return output
+
+
+def triangulation(points):
+    """
+    Returns Triangulation instance for points. Triangulations are cached and
+    shared: the same instance is returned for the same points, thus the
+    returned instance must not be changed.
+    """
+    key = tuple(tuple(p) for p in points)
+    t = _cache.get(key)
+    if t is None:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        t = Triangulation(points)
+        _cache[key] = t
+    return t
+
+
 class Triangulation(object):
     """
     Represents triangulation. Takes as input a list of triangulation points
@@ -140,20 +251,21 @@ class Triangulation(object):
 
     def __init__(self, points):
         """
-        points is a list of tuples (x,y) with point coordinates.
+        points is a list of tuples (x,y) with point coordinates, or a
+        numpy array of shape (N, 2).
         """
         self.__input = points[:]
 
         regions = [] # list of ([definition], is_extreme, set(neighbour regions))
         sites = []   # list of (x, y, is_extreme, set(neighbour regions))
 
-        output = qdelaunay(points, 'i Fx Fn FN FP')
+        output = delaunay(points)
         for definition, neighbours in zip(output['i'], output['Fn']):
             is_extreme = any(i < 0 for i in neighbours)
             regions.append((definition, is_extreme, set(neighbours)))
 
         unused = set(output['FP'])
-        extreme_sites = output['Fx']
+        extreme_sites = set(output['Fx'])
         for site, neighbours in enumerate(output['FN']):
             x, y = points[site]
             if site not in unused:
@@ -20,5 +20,4 @@
 Solids docstrings.
 """
 
-from .zmesh_nodecimal import zmesh
-from .solids3 import Cylinder, Box, Sphere
+from .solids3 import Cylinder, Box, Sphere, zmesh
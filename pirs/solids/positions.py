@@ -46,6 +46,7 @@ class RGrid(object):
     @x.setter
     def x(self, val):
         self.__x = val
+        self.__c._abspos_changed()
 
     @property
     def y(self):
@@ -57,6 +58,7 @@ class RGrid(object):
     @y.setter
     def y(self, val):
         self.__y = val
+        self.__c._abspos_changed()
 
     @property
     def z(self):
@@ -68,6 +70,7 @@ class RGrid(object):
     @z.setter
     def z(self, val):
         self.__z = val
+        self.__c._abspos_changed()
 
     @property
     def container(self):
@@ -122,6 +125,7 @@ class RGrid(object):
     @origin.setter
     def origin(self, value):
         self.__o = value # TODO: check type of value.
+        self.__c._abspos_changed()
 
     def set_origin(self, (i, j, k), (x, y, z)):
         """
@@ -131,6 +135,7 @@ class RGrid(object):
         self.__o.x = x - i*self.x
         self.__o.y = y - j*self.y
         self.__o.z = z - k*self.z
+        self.__c._abspos_changed()
 
     def __eq__(self, othr):
         if self is othr:
@@ -260,6 +265,7 @@ class RGrid(object):
         self.origin.x = -(Imin + Imax)/2. * self.x
         self.origin.y = -(Jmin + Jmax)/2. * self.y
         self.origin.z = -(Kmin + Kmax)/2. * self.z
+        self.__c._abspos_changed()
         return
 
     def insert(self, ijk, element, i=None):
@@ -306,6 +312,10 @@ class RGrid(object):
 
             
 class PositionedTree(Tree):
+    # Number of trees with the cache of absolute positions switched on. When
+    # zero, changes of positions need not to be propagated to the root.
+    __ncache = 0
+
     def __init__(self, **kwargs):
         super(PositionedTree, self).__init__()
         self.__pos = Vector3((0,0,0))           # position of element with respect to its parent
@@ -313,10 +323,18 @@ class PositionedTree(Tree):
         self.__i = None                           # indices used to position element in the grid of its parent.
         self.__j = None
         self.__k = None
+        self.__apc = None                         # cache of absolute positions, see cache_abspos()
 
         self.setp(**kwargs)
+        return
 
-        ## self.__abspos = None # variable to store computed abspos(). See compile() method
+    def __setstate__(self, state):
+        # cache of absolute positions is keyed by id() of elements, thus it
+        # is not valid in the unpickled tree. Older dumps have no cache at all.
+        # Names are interned, as pickle does without __setstate__.
+        for k, v in state.items():
+            self.__dict__[intern(k)] = v
+        self.__apc = None
         return
 
     @property
@@ -328,6 +346,7 @@ class PositionedTree(Tree):
     @i.setter
     def i(self, value):
         self.__i = value
+        self._abspos_changed()
 
     @property
     def j(self):
@@ -338,6 +357,7 @@ class PositionedTree(Tree):
     @j.setter
     def j(self, value):
         self.__j = value
+        self._abspos_changed()
 
     @property
     def k(self):
@@ -348,6 +368,7 @@ class PositionedTree(Tree):
     @k.setter
     def k(self, value):
         self.__k = value
+        self._abspos_changed()
 
     @property
     def pos(self):
@@ -360,6 +381,7 @@ class PositionedTree(Tree):
     def pos(self, value):
         if isinstance(value, Vector3):
             self.__pos = value
+            self._abspos_changed()
         else:
             raise TypeError
 
@@ -392,6 +414,69 @@ class PositionedTree(Tree):
         """
         return (not (self.i, self.j, self.k) == (None, None, None))
 
+    def cache_abspos(self, value=True):
+        """
+        Switches on (value=True) or off (value=False) the cache of absolute
+        positions for the whole tree self belongs to.
+
+        When the cache is on, absolute positions of all tree elements are
+        computed at the first call to abspos() with cs='abs' in one pass (see
+        abspositions()) and are reused by later calls. The cache is cleared
+        when pos, i, j, k or grid parameters of a tree element are set, or
+        when elements are inserted or withdrawn.
+
+        Changes made to vectors in place, for example ``e.pos.x = 1.``, are
+        not detected. After such changes, call cache_abspos() again to clear
+        the cache.
+        """
+        r = self.root
+        if value:
+            r.__set_cache({})
+        else:
+            r.__set_cache(None)
+        return
+
+    def __set_cache(self, apc):
+        if (self.__apc is None) != (apc is None):
+            PositionedTree.__ncache += 1 if apc is not None else -1
+        self.__apc = apc
+        return
+
+    def _abspos_changed(self):
+        """
+        Clears cache of absolute positions, if any.
+        """
+        if not PositionedTree.__ncache:
+            return
+        r = self.root
+        if r.__apc:
+            r.__apc = {}
+        return
+
+    def abspositions(self):
+        """
+        Returns list of tuples (e, p), where e is self or one of its direct or
+        indirect children, and p is the absolute position of e.
+
+        Positions are computed in one pass from self to its children.
+        """
+        if self.parent is None:
+            p0 = Vector3((0,0,0)) + self.pos
+        else:
+            p0 = self.abspos()
+        res = []
+        stack = [(self, p0)]
+        while stack:
+            e, p = stack.pop()
+            res.append((e, p))
+            for c in reversed(e.children):
+                if c.indexed():
+                    pc = p + e.__grd.position(c.i, c.j, c.k)
+                else:
+                    pc = p
+                stack.append((c, pc + c.pos))
+        return res
+
     def abspos(self, cs='abs', coordinate=None):
         """
         Returns absolute position of the element with respect to the tree's
@@ -411,6 +496,8 @@ class PositionedTree(Tree):
         """
         if cs == 'abs':
             ref = self.root
+            if ref.__apc is not None:
+                return self.__cached_abspos(ref, coordinate)
         elif cs == 'rel':
             ref = self
         elif isinstance(cs, PositionedTree):
@@ -439,6 +526,39 @@ class PositionedTree(Tree):
         else:
             raise ValueError("Unknown value of the 'coordinate' argument: ", coordinate)
 
+    def __cached_abspos(self, root, coordinate):
+        pp = root.__apc.get(id(self))
+        if pp is None:
+            for (e, p) in root.abspositions():
+                root.__apc[id(e)] = p
+            pp = root.__apc[id(self)]
+        if coordinate is None:
+            return pp.copy()
+        elif coordinate in 'xyz':
+            return getattr(pp, coordinate)
+        else:
+            raise ValueError("Unknown value of the 'coordinate' argument: ", coordinate)
+
+    def insert(self, othr, i=None):
+        # cache of othr, if any, is not valid after insertion.
+        othr.__set_cache(None)
+        super(PositionedTree, self).insert(othr, i)
+        self._abspos_changed()
+        return othr
+
+    def _append(self, othr):
+        othr.__set_cache(None)
+        super(PositionedTree, self)._append(othr)
+        self._abspos_changed()
+
+    def remove_child(self, element):
+        self._abspos_changed()
+        return super(PositionedTree, self).remove_child(element)
+
+    def remove_by_index(self, i):
+        self._abspos_changed()
+        return super(PositionedTree, self).remove_by_index(i)
+
     def copy_node(self):
         new = self.__class__()
         new.__pos = self.__pos.copy()
@@ -31,9 +31,88 @@ solids.py module).
 # Author: Anton Travleev, anton.travleev@kit.edu
 # Developed at INR, Karlsruhe Institute of Technology
 #at
+import os
 from .positions import PositionedTree 
-from .zmesh_nodecimal import zmesh
+
+#: Implementation of axial meshes used by solids. By default, zmesh from the
+#: zmesh_nodecimal module. Set the environment variable PIRS_ZMESH to 'numpy'
+#: before importing pirs to use zmesh from the zmesh_numpy module (requires
+#: numpy).
+ZMESH = os.environ.get('PIRS_ZMESH', 'nodecimal')
+if ZMESH == 'numpy':
+    from .zmesh_numpy import zmesh
+else:
+    from .zmesh_nodecimal import zmesh
 from .intersections import isect
+from .spatial import SpatialIndex, bbox
+
+#: Number of digits, to which coordinates are rounded in structural
+#: fingerprints of solids, see the Fingerprints class.
+FP_DIGITS = 10
+
+
+def _round_car(v):
+    return tuple(round(c, FP_DIGITS) for c in v.car)
+
+
+def _children_index(e, index):
+    """
+    Returns spatial index of the children of e from the dictionary index. If
+    not there, it is built and put into the dictionary.
+    """
+    t = index.get(id(e))
+    if t is None:
+        # e is kept in the dictionary, so that its id is not reused.
+        t = (e, SpatialIndex(e.children))
+        index[id(e)] = t
+    return t[1]
+
+
+class Fingerprints(object):
+    """
+    Registry of structural fingerprints of solids.
+
+    Fingerprint of a solid is an integer, equal for solids with the same
+    type, material, dimensions, axial distributions and interior. Solids equal
+    in the sense of BaseSolid.__eq__ have equal fingerprints (up to
+    coordinates rounded to FP_DIGITS), thus solids with different
+    fingerprints need not to be compared.
+
+    The fingerprint of each subtree is computed once and stored in the
+    registry. Therefore, the registry must not be used after solids are
+    changed.
+    """
+    def __init__(self):
+        self.__ids = {}   # structure tuple -> fingerprint
+        self.__nodes = {} # id(solid) -> (solid, fingerprint)
+        return
+
+    def get(self, solid):
+        """
+        Returns fingerprint of solid.
+
+        Position and indices of the solid itself are not taken into account;
+        positions and indices of its children are.
+        """
+        v = self.__nodes.get(id(solid))
+        if v is not None:
+            return v[1]
+        ext = tuple(map(lambda a: tuple(round(c, FP_DIGITS) for c in solid.extension(a, 'rel')), 'xyz'))
+        zms = []
+        for n in ['heat', 'temp', 'dens']:
+            m = solid.get_var(n)
+            if m is None:
+                zms.append(None)
+            else:
+                zms.append((tuple(m.get_grid()), tuple(m.values())))
+        chl = []
+        for c in solid.children:
+            chl.append((self.get(c), _round_car(c.pos), c.ijk))
+        t = (solid.stype, solid.material, ext, tuple(zms), tuple(chl))
+        fp = self.__ids.setdefault(t, len(self.__ids))
+        # the solid is stored to keep its id() valid.
+        self.__nodes[id(solid)] = (solid, fp)
+        return fp
 
 class BaseSolid(PositionedTree):
     """
@@ -249,7 +328,7 @@ class BaseSolid(PositionedTree):
         return (vmax, kmax)
 
 
-    def is_visible(self):
+    def is_visible(self, index=None):
         """
         Checks if the solid is seen from its parent(s), and is not completely
         covered by the younger siblings. Only in this case the element and its
@@ -259,8 +338,10 @@ class BaseSolid(PositionedTree):
         Note that the element can also be covered by its child. In this case,
         however, its children (at least one that covers) are still visible 
         and cannot be removed.
+
+        For the optional argument index, see covering_sibling().
         """
-        if self.hiding_parent() is None and self.covering_sibling() is None:
+        if self.hiding_parent() is None and self.covering_sibling(index) is None:
             return True
         else:
             return False
@@ -275,41 +356,52 @@ class BaseSolid(PositionedTree):
             if not self.intersect(p): return p
         return None
 
-    def covering_sibling(self):
+    def covering_sibling(self, index=None):
         """
         Returns the younger sibling of the solid or the younger sibling of the
         solid's parent(s) that covers coimpletely the solid. If there are no
         such siblings, returns None.
 
-        """
-        # own younger siblings:
-        slist = self.get_siblings()[1]
-        slist.reverse()
-        for s in slist:
-            if self.lies_in(s): return s
-        # parent younger siblings:            
-        for p in self.get_parents():
-            slist = p.get_siblings()[1]
+        The optional argument index is a dictionary, where spatial indices of
+        the children of the solid's parents (see spatial.SpatialIndex) are
+        kept. When given, only the siblings whose bounding boxes contain
+        the solid's bounding box are checked. Missing indices are built and
+        added to the dictionary, thus it can be reused for other solids of
+        the same tree, as long as the solids are not moved.
+        """
+        if index is not None:
+            b = bbox(self)
+        # own and parent younger siblings:
+        for e in [self] + list(self.get_parents()):
+            slist = e.get_siblings()[1]
+            if index is not None and slist:
+                si = _children_index(e.parent, index)
+                cand = set(id(si.solids[n]) for n in si.containing(b))
+                slist = [s for s in slist if id(s) in cand]
             slist.reverse()
-            for ye in slist:
-                if self.lies_in(ye): return ye
+            for s in slist:
+                if self.lies_in(s): return s
         return None    
 
-    def remove_invisible(self):
+    def remove_invisible(self, index=None):
         """
         Removes all invisible children of the element recursively.
 
         The element itself remains in the model even if its is_visible() method
         returns False.
         
+        Covering siblings are searched using spatial indices of the
+        containers, see covering_sibling(). 
         """
+        if index is None:
+            index = {}
         # remove invisible direct children:
         for c in self.children[:]: #### .values():
-            if not c.is_visible():
+            if not c.is_visible(index):
                 c.withdraw()
         # for the remaining direct children call the method recursively:
         for c in self.children[:]: #### .values():
-            c.remove_invisible()
+            c.remove_invisible(index)
         return
 
     def intersect(self, othr):
@@ -371,14 +463,26 @@ class BaseSolid(PositionedTree):
         """
         # Solid s1 of type T1 lies completely in another solid s2 of type T2,
         # if and only if s2.circumscribed(s1) lies completely in s2.
+        # The circumscribed solid contains s1, therefore it is checked first
+        # that s1 itself lies in the extensions of s2.
+        sp = self.abspos()
+        op = othr.abspos()
+        ro = {}
+        for a in ['x', 'y', 'z']:
+            s2 = self.extension(a, 'rel')[1]
+            o2 = othr.extension(a, 'rel')[1]
+            sa = getattr(sp, a)
+            oa = getattr(op, a)
+            ro[a] = (oa - o2, oa + o2) # the same as othr.extension(a, 'abs')
+            if sa - s2 < ro[a][0] or ro[a][1] < sa + s2:
+                return False
         circ = othr.circumscribed(self)
-        circ.pos = self.abspos()
+        circ.pos = sp
         # compare extensions of the circumscribed container and othr
         # in every axis:
         for a in ['x', 'y', 'z']:
             rc = circ.extension(a, 'abs')
-            ro = othr.extension(a, 'abs')
-            if rc[0] < ro[0] or ro[1] < rc[1]:
+            if rc[0] < ro[a][0] or ro[a][1] < rc[1]:
                 return False
         return True
 
@@ -457,9 +561,16 @@ class BaseSolid(PositionedTree):
 
         Returned values are tuples of the form (ijk, itype, Box()), where
         ijk is (i,j,k), itype is the type
+
+        Lattice elements are compared by their structural fingerprints (see
+        the Fingerprints class). Lattice elements with the same content as one
+        of the previous elements are not constructed again.
         """
         # list of unique lattice elements. It always has an empty lattice element.
         unique = []
+        fps = Fingerprints()
+        ufp = {}   # (fingerprint, position) -> list of itypes with this fingerprint
+        known = {} # content of (i,j,k) element -> itype
         Imin, Imax = self.grid.extension('x')
         Jmin, Jmax = self.grid.extension('y')
         Kmin, Kmax = self.grid.extension('z')
@@ -473,6 +584,7 @@ class BaseSolid(PositionedTree):
         leb.material = self.material
         unique.append(leb)
         leb._no_interior = self._no_interior
+        ufp[(fps.get(leb), _round_car(leb.pos))] = [0]
 
         # sort children by their grid indices:
         ddd = {}
@@ -505,56 +617,77 @@ class BaseSolid(PositionedTree):
                 for i in range(Imin, Imax+1):
                     chl = ddd.get((i,j,k), [])
                     if chl:
-                        leb = Box(X=self.grid.x, Y=self.grid.y, Z=self.grid.z)
-                        leb._no_interior = self._no_interior
                         pijk = self.grid.position(i,j,k)
-                        leb.pos = pos + pijk
-                        visible_interior = True
-                        covering_child = None
-                        for ch in chl:
-                                chnew = leb.insert(ch.copy_tree()) # note, this resets indices i,j,k of the chnew.
-                                if ch.i is None:
-                                    chnew.pos += -pijk
-                                if leb.lies_in(chnew):
-                                    # if ch completely covers leb, previously inserted elements can be withdrawn.
-                                    visible_interior = False
-                                    covering_child = chnew
-                                    for c in leb.children[:-1]: #### .values()[:-1]:
-                                        c.withdraw()
-                        if visible_interior:
-                            leb.material = self.material
-                            if self.__dens:
-                                leb.dens.update(self.dens)
-                            if self.__temp:
-                                leb.temp.update(self.temp)
-                            if self.__heat:
-                                leb.heat.update(self.heat)
-
-                            # remove unnecassary zmesh elements for lattice elements
-                            # in the upper and lower layers:
-                            if k in [Kmin, Kmax]:
-                                for zmesh in filter(None, [leb.__dens, leb.__temp, leb.__heat]):
-                                    if len(zmesh.get_grid()) == 2:
-                                        zmesh.simplify()
-                            chpos = cp0
+                        # content of the lattice element: its children and
+                        # their positions with respect to the element
+                        # center. Simplification of axial meshes depends on k.
+                        # Axial meshes of self are copied to the element,
+                        # thus with meshes the content depends on k as well.
+                        if self.__dens or self.__temp or self.__heat:
+                            key = [k]
                         else:
-                            # simplify leb structure in the way that leb
-                            # is replaced with its covering child
-                            covering_child.withdraw()
-                            for c in leb.children[:]:
-                                covering_child.insert(c)
-                                c.pos = c.pos - covering_child.pos
-                            leb = covering_child
-                            chpos = covering_child.pos.copy()
-                        leb.pos = gor + chpos
-                        # check if it is unique
-                        try:
-                            itype = unique.index(leb)
-                            #print 'existing element with index ', itype
-                        except ValueError:
-                            itype = len(unique)
-                            unique.append(leb)
-                            #print 'new element to unique '
+                            key = [k in (Kmin, Kmax)]
+                        for ch in chl:
+                            if ch.i is None:
+                                key.append((fps.get(ch), _round_car(ch.pos - pijk)))
+                            else:
+                                key.append((fps.get(ch), _round_car(ch.pos)))
+                        key = tuple(key)
+                        itype = known.get(key, None)
+                        if itype is None:
+                            leb = Box(X=self.grid.x, Y=self.grid.y, Z=self.grid.z)
+                            leb._no_interior = self._no_interior
+                            leb.pos = pos + pijk
+                            visible_interior = True
+                            covering_child = None
+                            for ch in chl:
+                                    chnew = leb.insert(ch.copy_tree()) # note, this resets indices i,j,k of the chnew.
+                                    if ch.i is None:
+                                        chnew.pos += -pijk
+                                    if leb.lies_in(chnew):
+                                        # if ch completely covers leb, previously inserted elements can be withdrawn.
+                                        visible_interior = False
+                                        covering_child = chnew
+                                        for c in leb.children[:-1]: #### .values()[:-1]:
+                                            c.withdraw()
+                            if visible_interior:
+                                leb.material = self.material
+                                if self.__dens:
+                                    leb.dens.update(self.dens)
+                                if self.__temp:
+                                    leb.temp.update(self.temp)
+                                if self.__heat:
+                                    leb.heat.update(self.heat)
+
+                                # remove unnecassary zmesh elements for lattice elements
+                                # in the upper and lower layers:
+                                if k in [Kmin, Kmax]:
+                                    for zmesh in filter(None, [leb.__dens, leb.__temp, leb.__heat]):
+                                        if len(zmesh.get_grid()) == 2:
+                                            zmesh.simplify()
+                                chpos = cp0
+                            else:
+                                # simplify leb structure in the way that leb
+                                # is replaced with its covering child
+                                covering_child.withdraw()
+                                for c in leb.children[:]:
+                                    covering_child.insert(c)
+                                    c.pos = c.pos - covering_child.pos
+                                leb = covering_child
+                                chpos = covering_child.pos.copy()
+                            leb.pos = gor + chpos
+                            # check if it is unique
+                            itype = None
+                            lst = ufp.setdefault((fps.get(leb), _round_car(leb.pos)), [])
+                            for it in lst:
+                                if unique[it] == leb:
+                                    itype = it
+                                    break
+                            if itype is None:
+                                itype = len(unique)
+                                unique.append(leb)
+                                lst.append(itype)
+                            known[key] = itype
                     else:
                         # there are no children in leb (i,j,k).
                         itype = 0
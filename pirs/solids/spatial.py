@@ -0,0 +1,187 @@
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Spatial index of solids, to find candidates for intersection and covering
+tests without checking all pairs.
+
+The index is a uniform grid of buckets in the xy plane. Each solid is
+registered in all buckets overlapped by its bounding box. Queries return
+indices of solids whose bounding boxes overlap (or contain) the bounding box
+of the query; the exact test (intersect(), lies_in()) must be applied to the
+candidates.
+
+The index is not updated when solids are moved or changed, it is meant to be
+built for a particular task, e.g. for generating cells of one container.
+"""
+
+#at
+# Author: Anton Travleev, anton.travleev@kit.edu
+# Developed at INR, Karlsruhe Institute of Technology
+#at
+
+# Solids covering more buckets than this are not put into buckets, but are
+# returned as candidates for every query.
+_MAXB = 16
+
+
+def bbox(s, cs='abs'):
+    """
+    Returns tuple (xmin, xmax, ymin, ymax, zmin, zmax), the bounding box of
+    solid s in the coordinate system cs, see abspos().
+    """
+    p = s.abspos(cs)
+    x = s.X * 0.5
+    y = s.Y * 0.5
+    z = s.Z * 0.5
+    return (p.x - x, p.x + x, p.y - y, p.y + y, p.z - z, p.z + z)
+
+
+class SpatialIndex(object):
+    """
+    Index of bounding boxes of solids.
+
+    >>> from pirs.solids import Box, Cylinder
+    >>> b = Box(X=3, Y=3)
+    >>> for x in (-1, 0, 1):
+    ...     c = b.insert(Cylinder(R=0.5))
+    ...     c.pos.x = x
+    >>> si = SpatialIndex(b.children, b)
+    >>> si.neighbours(0)
+    [1]
+    >>> si.neighbours(1)
+    [0, 2]
+    """
+    def __init__(self, solids, cs='abs'):
+        self.__s = list(solids)
+        self.__cs = cs
+        self.__bb = [bbox(s, cs) for s in self.__s]
+
+        # tolerance. Bounding boxes closer than tol are considered as
+        # overlapping.
+        self.__tol = 0.
+        # bucket size: the largest typical solid occupies about one bucket.
+        if self.__bb:
+            w = sorted(max(b[1] - b[0], b[3] - b[2]) for b in self.__bb)
+            h = w[len(w)//2]
+            x0 = min(b[0] for b in self.__bb)
+            y0 = min(b[2] for b in self.__bb)
+            x1 = max(b[1] for b in self.__bb)
+            y1 = max(b[3] for b in self.__bb)
+            self.__tol = 1e-9 * max(x1 - x0, y1 - y0, 1.)
+            if h <= 0.:
+                h = max(x1 - x0, y1 - y0, 1.)
+        else:
+            h = 1.
+            x0 = y0 = 0.
+        self.__h = h
+        self.__o = (x0, y0)
+
+        self.__bk = {}    # (ix, iy) -> list of solid indices
+        self.__large = [] # indices of solids covering too many buckets
+        for (n, b) in enumerate(self.__bb):
+            ix0, ix1, iy0, iy1 = self.__range(b)
+            if (ix1 - ix0 + 1)*(iy1 - iy0 + 1) > _MAXB:
+                self.__large.append(n)
+                continue
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    self.__bk.setdefault((ix, iy), []).append(n)
+        return
+
+    def __range(self, b):
+        x0, y0 = self.__o
+        h = self.__h
+        t = self.__tol
+        return (int((b[0] - t - x0) // h), int((b[1] + t - x0) // h),
+                int((b[2] - t - y0) // h), int((b[3] + t - y0) // h))
+
+    def __len__(self):
+        return len(self.__s)
+
+    @property
+    def solids(self):
+        """
+        List of indexed solids.
+        """
+        return self.__s
+
+    def bbox(self, n):
+        """
+        Bounding box of the n-th solid.
+        """
+        return self.__bb[n]
+
+    def __candidates(self, b):
+        ix0, ix1, iy0, iy1 = self.__range(b)
+        res = set(self.__large)
+        if (ix1 - ix0 + 1)*(iy1 - iy0 + 1) > len(self.__bk):
+            # cheaper to check all non-empty buckets
+            for (ix, iy), l in self.__bk.items():
+                if ix0 <= ix <= ix1 and iy0 <= iy <= iy1:
+                    res.update(l)
+            return res
+        for ix in range(ix0, ix1 + 1):
+            for iy in range(iy0, iy1 + 1):
+                res.update(self.__bk.get((ix, iy), ()))
+        return res
+
+    def overlapping(self, b):
+        """
+        Returns sorted list of indices of solids, whose bounding boxes overlap
+        (or touch) the box b, given as tuple (xmin, xmax, ymin, ymax, zmin,
+        zmax).
+        """
+        t = self.__tol
+        res = []
+        for n in self.__candidates(b):
+            o = self.__bb[n]
+            if (o[0] <= b[1] + t and b[0] <= o[1] + t and
+                o[2] <= b[3] + t and b[2] <= o[3] + t and
+                o[4] <= b[5] + t and b[4] <= o[5] + t):
+                res.append(n)
+        res.sort()
+        return res
+
+    def containing(self, b):
+        """
+        Returns sorted list of indices of solids, whose bounding boxes contain
+        the box b.
+        """
+        t = self.__tol
+        res = []
+        for n in self.__candidates(b):
+            o = self.__bb[n]
+            if (o[0] <= b[0] + t and b[1] <= o[1] + t and
+                o[2] <= b[2] + t and b[3] <= o[3] + t and
+                o[4] <= b[4] + t and b[5] <= o[5] + t):
+                res.append(n)
+        res.sort()
+        return res
+
+    def neighbours(self, n):
+        """
+        Returns sorted list of indices of solids, whose bounding boxes overlap
+        the bounding box of the n-th solid. The n-th solid itself is not
+        included.
+        """
+        return [m for m in self.overlapping(self.__bb[n]) if m != n]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
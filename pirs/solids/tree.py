@@ -657,7 +657,7 @@ class Tree(SetPropertiesAsKW):
         o = [] #   older siblings
         found = False
         for c in self.__parent.__children:
-            if c == self:
+            if c is self:
                 found = True
             elif found:
                 y.append(c)
@@ -52,10 +52,18 @@ class zmesh(object):
     multiplying by the dimension of the reference solid. For the above example,
     mesh elements along z will be 0.25 cm, 0.5 cm and 0.25 cm.
     
+    Copies of a mesh share grid and values with the original (copy-on-write):
+    values are copied only when one of the meshes is changed in place, see
+    set_value_by_index().
+
     """
 
     MINIMAL_OFFSET = 1.e-8
 
+    # True if self.__v can be shared with another mesh. Must be checked
+    # before values are changed in place. Grid is never changed in place.
+    __s = False
+
     def __init__(self, boundary):
         """Initialize the axial mesh. Boundary must be an object with
         attribute Z, which defines the absolute height of the
@@ -73,6 +81,8 @@ class zmesh(object):
             return True
         if not isinstance(othr, self.__class__):
             return False
+        if self.__z is othr.__z and self.__v is othr.__v:
+            return True
         if self.__z != othr.__z:
             return False
         if self.__v != othr.__v:
@@ -148,12 +158,25 @@ class zmesh(object):
         """return copy of self."""
         if boundary is None:
             boundary = self.__b
-        c = self.__class__(boundary)
+        # grid and values are not created in __init__, they are shared with
+        # self.
+        c = self.__class__.__new__(self.__class__)
+        c.__b = boundary
         c.__z = self.__z
         c.__v = self.__v
         c.__p = self.__p
+        c.__s = self.__s = True
         return c
 
+    def __own(self):
+        """
+        Makes values of self not shared with other meshes.
+        """
+        if self.__s:
+            self.__v = self.__v[:]
+            self.__s = False
+        return
+
     def set_grid(self, lst=[1.]):
         """Set relative grid.
         
@@ -319,12 +342,14 @@ class zmesh(object):
         
         The value set to the mesh element, which covers the given coordinate."""
         k = self.element_index(z[-1], cs)
+        self.__own()
         self.__v[k] = val
 
     def set_value_by_index(self, val, k):
         """Set value to mesh element specified by its index.
 
         Index is an integer. Counting starts from zero."""
+        self.__own()
         self.__v[k] = val
 
     def set_values_by_function(self, f, cs='rel'):
@@ -896,8 +921,10 @@ class zmesh(object):
             return
 
         if (z1min, z1max) == (z2min, z2max) and self.__z == othr.__z:
-            # grids are equal. Simply put values from othr to self:
-            self.__v = othr.__v[:]
+            # grids are equal. Simply put values from othr to self, they
+            # are shared until changed:
+            self.__v = othr.__v
+            self.__s = othr.__s = True
             return
 
         # self is divided to three parts: below othr, intersection with othr and above othr.
@@ -0,0 +1,860 @@
+
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Axial mesh with relative grid and values stored in numpy arrays.
+
+The zmesh class defined here has the same API as zmesh from the
+zmesh_nodecimal module. Merging of grids in unify() and update() and
+integration are done with numpy functions instead of element-by-element loops.
+
+Values are stored in an array of floats, when all values are floats. Otherwise
+(for example, when values are instances of uncertainties.Variable, or
+integers) an array of objects is used, thus values() returns the same objects
+that were set.
+
+Solids use zmesh from the zmesh_nodecimal module by default. To use this
+implementation instead, set the environment variable PIRS_ZMESH=numpy before
+pirs is imported.
+"""
+
+#at
+# Author: Anton Travleev, anton.travleev@kit.edu
+# Developed at INR, Karlsruhe Institute of Technology
+#at
+
+import numpy
+from ..core.trageom.vector import _are_close
+
+
+def _my_round(value, prec):
+    return round(value/prec) * prec
+
+
+def _values_array(lst):
+    """
+    Returns numpy array with elements of lst. Array of floats is returned only
+    when lst contains only floats, array of objects otherwise.
+    """
+    a = numpy.array(lst)
+    if a.dtype.kind != 'f' or a.ndim != 1:
+        a = numpy.empty(len(lst), dtype=object)
+        a[:] = list(lst)
+    return a
+
+
+def _boundaries(l, z0=0.):
+    """
+    Returns array of boundary coordinates of mesh elements with lengths l,
+    starting at z0.
+    """
+    return numpy.cumsum(numpy.concatenate(([z0], l)))
+
+
+def _merge_boundaries(b1, b2, MINIMAL_OFFSET):
+    """
+    Returns sorted array of boundaries from b1 and b2. Boundaries from b2
+    closer than MINIMAL_OFFSET to one of the boundaries in b1 are not added.
+    """
+    i = numpy.searchsorted(b1, b2).clip(1, len(b1) - 1)
+    d = numpy.minimum(abs(b2 - b1[i-1]), abs(b2 - b1[i]))
+    b = numpy.concatenate((b1, b2[d > MINIMAL_OFFSET]))
+    b.sort()
+    return b
+
+
+def _remap(b, bold, vold):
+    """
+    Returns values for mesh elements with boundaries b, taken from the mesh
+    with boundaries bold and values vold. The value of a new mesh element is
+    the value of the old element containing its center.
+    """
+    c = 0.5*(b[1:] + b[:-1])
+    i = (numpy.searchsorted(bold, c) - 1).clip(0, len(vold) - 1)
+    return vold[i]
+
+
+class zmesh(object):
+    """Class to represent axial mesh for density, temperature and heat in a solid with Z dimension.
+
+    An axial mesh is defined by giving a solid (A reference solid)and by
+    giving relative height of mesh elements (a relative grid).
+
+    When a new instance of zmesh is created, an instance of one of the solids must be
+    provided, which will be used to define the absolute height of the mesh
+    elements.
+
+        b = Box()       # default box with X,Y,Z = 1
+        m = zmesh(b)    # axial mesh m with b as the reference solid.
+
+    Lenght of mesh elements is specified in relative units. For example,
+
+        m.set_grid([0.5, 1., 0.5])
+
+    sets number of mesh elements and their lengths. The argument is a list, which i-th element gives the relative length of the
+    i-th mesh element along z axis. The absolute lenght is obtained first by
+    normalizing the values in the list, so their sum gives one, and by
+    multiplying by the dimension of the reference solid. For the above example,
+    mesh elements along z will be 0.25 cm, 0.5 cm and 0.25 cm.
+
+    Copies of a mesh share grid and values with the original (copy-on-write):
+    values are copied only when one of the meshes is changed in place, see
+    set_value_by_index().
+
+    """
+
+    MINIMAL_OFFSET = 1.e-8
+
+    # True if self.__v can be shared with another mesh. Must be checked
+    # before values are changed in place. Grid is never changed in place.
+    __s = False
+
+    def __init__(self, boundary):
+        """Initialize the axial mesh. Boundary must be an object with
+        attribute Z, which defines the absolute height of the
+        mesh (this is, for example, instance of Box class).
+
+        Initially, there is only one mesh element, and value is set to 0.
+        """
+        self.__b = boundary
+        self.__z = numpy.array([1.])
+        self.__v = numpy.array([0.])
+        self.__p = 0.    # precision
+
+    def __eq__(self, othr):
+        if self is othr:
+            return True
+        if not isinstance(othr, self.__class__):
+            return False
+        if self.__z is othr.__z and self.__v is othr.__v:
+            return True
+        if not numpy.array_equal(self.__z, othr.__z):
+            return False
+        if not numpy.array_equal(self.__v, othr.__v):
+            return False
+        return True
+
+    def __ne__(self, othr):
+        return not self == othr
+
+    @property
+    def prec(self):
+        return self.__p
+
+    @prec.setter
+    def prec(self, val):
+        self.__p = float(val)
+
+    def simplify(self):
+        """
+        Joins adjacent mesh elements if their values are within the precision prec.
+        """
+        vl = self.__v.tolist()
+        zl = self.__z.tolist()
+        clusters = []
+        vprev = vl[0]
+        clusters.append([(vprev, zl[0])])
+        for (v, d) in zip(vl[1:], zl[1:]):
+            if abs(vprev - v) <= self.__p:
+                # add v, d to current list of clusters
+                clusters[-1].append((v, d))
+            else:
+                # create new clusters entry
+                vprev = v
+                clusters.append([(v, d)])
+
+        znew = []
+        vnew = []
+        for vdl in clusters:
+            d = sum( map(lambda vd: vd[1], vdl) )
+            v = sum( map(lambda vd: vd[0]*vd[1], vdl) ) / d
+            znew.append(d)
+            vnew.append(v)
+        self.__z = numpy.array(znew)
+        self.__v = _values_array(vnew)
+        return
+
+    def convert(self, type_=float):
+        """
+        Converts values saved in zmesh to type_. Argument type_ must be a
+        function.
+        """
+        self.__v = _values_array(map(type_, self.__v.tolist()))
+
+    def has_zeroes(self):
+        """
+        Returns True if self.values() has one or more zeroes.
+        """
+        return bool((self.__v == 0.).any())
+
+    def common_grid(self, othr):
+        """
+        Deprecated. Use unify()
+        """
+        raise UserWarning('Method deprecated. Use unify()')
+
+    def copy(self, boundary=None):
+        """return copy of self."""
+        if boundary is None:
+            boundary = self.__b
+        # grid and values are not created in __init__, they are shared with
+        # self.
+        c = self.__class__.__new__(self.__class__)
+        c.__b = boundary
+        c.__z = self.__z
+        c.__v = self.__v
+        c.__p = self.__p
+        c.__s = self.__s = True
+        return c
+
+    def __own(self):
+        """
+        Makes values of self not shared with other meshes.
+        """
+        if self.__s:
+            self.__v = self.__v.copy()
+            self.__s = False
+        return
+
+    def set_grid(self, lst=[1.]):
+        """Set relative grid.
+
+        lst is a list specifiying the number of grid elements and their
+        relative length.
+        """
+        # currently, allow grid changes only if mesh value is constant.
+        if self.is_constant():
+            v = self.__v[0]
+            # normalize lst and set relative mesh thickness:
+            self.__z = numpy.array(lst, dtype=float) / float(sum(lst))
+            # redefine values:
+            self.__v = _values_array([v] * len(self.__z))
+        else:
+            raise ValueError('cannot change grid of a mesh with non-constant values')
+
+    def get_grid(self, rel=True):
+        """Returns the list of mesh elements lengths"""
+        if rel:
+            return self.__z.tolist()
+        else:
+            # return list of absolute lenghts
+            return (self.__z * self.__b.Z).tolist()
+
+    def is_constant(self):
+        """Returns True if all values of the mesh are equal"""
+        return bool((self.__v == self.__v[0]).all())
+
+    def element_coord(self, k=0, cs='rel'):
+        """
+        Returns coordinates of k-th mesh element's center.
+
+        The optional argument cs accepts the following values:
+
+        - 'rel' (default): the returned coordinates are in the coordinate system of
+          the reference solid.
+        - 'abs': the returned coordinates are in the coordinate system of the root of
+          the reference solid.
+        - '1': the returned coordinates are relative to the c.s. of the reference solid
+          whose height is set to 1.
+
+        Between rel, abs and 1 coordinates hold the following equalities:
+
+            Zabs = Zrel - self.__b.abspos()
+
+            Zrel = Z1 * self.__b.Z
+
+        """
+        if k < 0:
+            k += len(self.__z)
+        return self.element_coords(cs)[k]
+
+    def element_coords(self, cs='rel'):
+        """
+        Returns the list of mesh-elements center coordinates.
+        """
+        if cs == '1':
+            Z = 1.
+        else:
+            Z = self.__b.Z
+        Z2 = Z * 0.5
+        # coordinates are computed as sum(zi*Z), to be consistent with the
+        # abspos() method.
+        z = _boundaries(self.__z[:-1]*Z, -Z2) + self.__z*Z2
+        x = 0.
+        y = 0.
+        if cs == 'abs':
+            p = self.__b.abspos()
+            x += p.x
+            y += p.y
+            z += p.z
+        return [(x, y, zz) for zz in z.tolist()]
+
+    def boundary_coords(self, cs='rel'):
+        """
+        Returns list of boundary coordinates of the grid.
+
+        The first and last elements in the returned list give coordinates of
+        the facet of the reference solid.
+
+        >>> b = solids.Box()
+        >>> b.pos.z = 6
+        >>> m = zmesh(b)
+        >>> m.boundary_coords('abs')
+        [5.5, 6.5]
+        >>> m.boundary_coords('rel')
+        [-0.5, 0.5]
+        >>> m.set_grid( [1]*4 )
+        >>> m.boundary_coords('rel')
+        [-0.5, -0.25, 0.0, 0.25, 0.5]
+        >>> m.boundary_coords('abs')
+        [5.5, 5.75, 6.0, 6.25, 6.5]
+        """
+        r = _boundaries(self.__z, -0.5)
+        if cs == 'abs':
+            s = self.__b.abspos().z
+            C = self.__b.Z
+        elif cs == 'rel':
+            s = 0.
+            C = self.__b.Z
+        elif cs == '1':
+            s = 0.
+            C = 1.
+        return (C*r + s).tolist()
+
+    def element_index(self, z=0., cs='rel'):
+        """
+        Returns the index of the mesh element containing coordinate z, relative
+        or absolute.
+        """
+        if cs == 'abs':
+            p = self.__b.abspos()
+            z -= p.z
+        if cs != '1':
+            # go to relative dimensions:
+            z = z / self.__b.Z
+
+        if z < -0.5 or z > 0.5: raise IndexError('z coordinate lies outside mesh boundary, z={0}, bounding solid: {1}'.format(z, self.__b.get_key()))
+        if z == 0.5           : raise IndexError('z coordinate lies on the mesh boundary, z={0}, bounding solid: {1}'.format(z, self.__b.get_key()))
+        lb = _boundaries(self.__z, -0.5)
+        i = int(numpy.searchsorted(lb, z, 'right')) - 1
+        if lb[i] == z: raise IndexError('z coordinate lies on the mesh boundary, z={0}, bounding solid: {1}'.format(z, self.__b.get_key()))
+        return min(i, len(self.__z) - 1)
+
+    def set_value_by_coord(self, val, z, cs='rel'):
+        """Set value to the mesh element, specified by its z coordinate, relative or absolute.
+
+        The value set to the mesh element, which covers the given coordinate."""
+        k = self.element_index(z[-1], cs)
+        self.set_value_by_index(val, k)
+
+    def set_value_by_index(self, val, k):
+        """Set value to mesh element specified by its index.
+
+        Index is an integer. Counting starts from zero."""
+        if self.__v.dtype != object and not isinstance(val, float):
+            # astype() returns a new array, not shared with other meshes
+            self.__v = self.__v.astype(object)
+            self.__s = False
+        self.__own()
+        self.__v[k] = val
+
+    def set_values_by_function(self, f, cs='rel'):
+        """Set values of the mesh by function f(z): z -> f.
+
+        Value of each mesh element is set to f(z), where z is
+        coordinate of the mesh element's center."""
+        v = []
+        for xyz in self.element_coords(cs):
+            v.append( f(xyz[-1]) )
+        self.__v = _values_array(v)
+        return
+
+    def clear(self):
+        """Set grid so that the mesh has only one element and set the value to 0."""
+        self.__z = numpy.array([1.])
+        self.__v = numpy.array([0.])
+
+    def set_values(self, val, cs='rel'):
+        """Set values of the mesh.
+
+        Accepted types of val are:
+
+        - a list, a tuple or a numpy array. Must have the same number of
+          elements as the list returned by the get_grid() method.
+
+        - a mapping (function) used to calculate value at each mesh element center.
+          The meaning of the mapping's argument can be set by the method's optional
+          argument cs, its meaning see in element_coord() method.
+
+        - another instance of the zmesh class. In this case, grid and values of this
+          instance are copied to self. This is equal to :
+
+            self.update(othr)
+
+        - if not one of the above, transformed to the list [val]*len(self.get_grid())
+
+        """
+        if isinstance(val, (list, tuple, numpy.ndarray)):
+            if len(self.__z) == len(val):
+                self.__v = _values_array(val)
+            else:
+                raise IndexError('Wron number of elements in ', val)
+        elif hasattr(val, '__call__'):
+            # val is a function.
+            self.set_values_by_function(val, cs)
+        elif isinstance(val, zmesh):
+            self.update(val)
+        else:
+            # assume val is the value to be set to all mesh elements.
+            self.__v = _values_array([val] * len(self.__z))
+        return
+
+    def mean(self):
+        return sum((self.__z * self.__v).tolist(), 0.)
+
+    def get_max(self, func=None):
+        """
+        Returns (Vmax, i) tuple, where Vmax is the maximal value, and i --its index.
+
+        When func is given, maximum is searched among func(vi).
+        """
+        if func is not None:
+            v = map(func, self.__v.tolist())
+        else:
+            v = self.__v.tolist()
+
+        vm = max(v)
+        im = v.index(vm)
+        coord = self.element_coord(im, 'abs')
+        return (vm, coord)
+
+    def get_value_by_coord(self, xyz, cs='rel'):
+        """Returns the value of mesh element, specified by the xyz coordinate.
+
+        The value of the mesh element covering point with axial coordinate z is
+        returned."""
+        bnd = self.boundary_coords(cs)
+        z = xyz[-1]
+
+        __v = self.values()
+
+        if z in bnd:
+            # z lies on the boundary. return mean of the two adjacent elements.
+            k = bnd.index(z)
+            v = (__v[k-1] + __v[k] ) * 0.5
+        elif bnd[0] < z < bnd[-1]:
+            # z is in the range of zmesh
+            k = self.element_index(z, cs)
+            v = __v[k]
+        else:
+            # z is outside zmesh.
+            v = 0.
+        return v
+
+    def get_value_by_index(self, k):
+        """Returns the value of mesh element speficied by its index"""
+        return self.values()[k] # values() to ensure that prec is taken into account
+
+    def values(self):
+        """Returns the list of values in the order described in method set_values()"""
+        if self.__p ==  0.:
+            return self.__v.tolist()
+        else:
+            return map(lambda v: _my_round(v, self.__p), self.__v.tolist())
+
+    def items(self, key_type='index', cs='rel'):
+        """Returns a list of tuples (k, val) in the order described in method
+        set_values().
+
+        If key_type is 'index' (defalut), k is the mesh element index.
+        If key_type is 'coord', k is the mesh
+        center's coordinates, k = (x,y,z). In this case one can additionally
+        specify coordinate system, 'rel' or 'abs'"""
+        if key_type == 'coord':
+            keys = self.element_coords(cs)
+        else:
+            keys = range(len(self.__z))
+        return zip(keys, self.values())
+
+    def get_solid(self):
+        """Returns the reference solid.  """
+        return self.__b
+
+    def get_box(self, k, cs='rel'):
+        return self.get_solid(k, cs)
+
+    def get_cylinder(self, k, cs='rel'):
+        return self.get_solid(k, cs)
+
+    def crop(self, othr):
+        """put to self data from othr, so that mesh elements coincide."""
+        raise UserWarning('Deprecated method. Use update()')
+
+    def adjust_grid(self, Nmax, dVmin, alpha=1./3.):
+        """
+        Changes the grid by inserting new mesh elements between elements with maximal dV,
+        and by combining elements with dV less than dVmin.
+
+        """
+        return NotImplemented
+
+    def interpolate(self, z, cs='rel'):
+        """
+        Returns interpolated value at coordinate z.
+
+        >>> m = zmesh(solids.Box())
+        >>> m.set_grid([1]*5)
+        >>> m.set_values([1, 2, 3, 4, 5])
+        >>> for (x,y,z) in m.element_coords('1'):
+        ...     print z, m.interpolate(z, '1')
+        ...
+        >>> for z in m.boundary_coords('1'):
+        ...     print z, m.interpolate(z, '1')
+        ...
+
+
+        """
+        if cs == '1':
+            pass
+        else:
+            # put here transform to the '1' cs
+            raise NotImplementedError('interpolate not implemented for cs ', cs)
+
+        # linear interpolation:
+        i = self.element_index(z, '1')
+        zcl = self.element_coords('1')
+        (x,y,zc) = zcl[i]
+        if z <= zc:
+            # interpolate between i-1 and i element:
+            (x,y,z1) = zcl[i-1]
+            z2 = zc
+            y1 = self.__v[i-1]
+            y2 = self.__v[i]
+        else:
+            # interpolate between i and i+1 element:
+            z1 = zc
+            (x,y,z2) = zcl[i]
+            y1 = self.__v[i]
+            y2 = self.__v[i+1]
+        # parameters of the linear interpolation y = az + b
+        if z1 == z2:
+            a = 0.
+        else:
+            a = (y1 - y2)/(z1 - z2)
+        b = 0.5*(y1 + y2 - a*(z1 + z2))
+        return (a*z + b)
+
+    def integral(self, A=None, B=None, cs='rel'):
+        """
+        Returns integral from A to B of the piecewise-constant function.
+
+        cs defines the meaning of A and B. Can be 'rel', 'abs' and '1'.
+
+        >>> m = zmesh(solids.Box(Z=4.))
+        >>> m.integral(-0.5, 0.5, '1')
+        0.0
+
+        """
+        # process None cases for A and B:
+        if A is None:
+            # correspondent to the element's lowest z
+            A = float(self.boundary_coords(cs)[0])
+        if B is None:
+            # corresponds to the element's highest z
+            B = float(self.boundary_coords(cs)[-1])
+
+        # check that A <= B:
+        if A > B:
+            A, B = B, A
+            direction = -1.
+        else:
+            direction = 1.
+        # we work internaly in the '1' coordinate system.
+        if cs == '1':
+            zA = A
+            zB = B
+        elif cs == 'rel':
+            ah = self.__b.Z  # absolute height
+            zA = A/ah
+            zB = B/ah
+        elif cs == 'abs':
+            ah = self.__b.Z          # absolute height
+            ap = self.__b.abspos().z # absolute position
+            zA = (A - ap) / ah
+            zB = (B - ap) / ah
+        else:
+            raise ValueError('Unknown coordinate system ', cs)
+
+        # length of each mesh element within (zA, zB):
+        z = _boundaries(self.__z, -0.5).clip(zA, zB)
+        res = ((z[1:] - z[:-1]) * self.__v).sum()
+        if self.__v.dtype != object:
+            res = float(res)
+        return res * direction * self.__b.Z
+
+    def __operation(self, othr, operation):
+        # common part of arithmetic operations.
+        if isinstance(othr, zmesh):
+            if self.__b.extension('z') != othr.__b.extension('z'):
+                raise ValueError('Zmesh boundaries on different axial levels.')
+            else:
+                # unify changes the state of its operands. Therefore use
+                # here copies and not original self and othr
+                op1 = self.copy()
+                op2 = othr.copy()
+                op1.unify(op2)
+                op1.set_values(operation(op1.__v, op2.__v))
+                return op1
+        else:
+            op1 = self.copy()
+            op1.set_values(operation(self.__v, othr))
+            return op1
+
+    def __mul__(self, othr):
+        """
+        Multiply by another zmesh object or by scalar.
+
+        >>> z1 = zmesh(solids.Box())
+        >>> z1.set_grid([1]*5)
+        >>> z1.set_values(range(5))
+
+        >>> z2 = 2.0 * z1
+        >>> print z2.values()
+
+        >>> z3 = z2 * z1
+        >>> print z3.values()
+
+        >>> z3 = 3.0 + z1
+        >>> print z3.values()
+
+        >>> z3 = z3 + z1
+        >>> print z3.values()
+
+
+        """
+        return self.__operation(othr, lambda x, y: x*y)
+
+    def __rmul__(self, othr):
+        return self * othr
+
+    def __div__(self, othr):
+        """
+        Divide by another zmesh object or by scalar.
+
+        """
+        return self.__operation(othr, lambda x, y: x/y)
+
+    def __add__(self, othr):
+        return self.__operation(othr, lambda x, y: x+y)
+
+    def __radd__(self, othr):
+        return self + othr
+
+    def __sub__(self, othr):
+        return self.__operation(othr, lambda x, y: x-y)
+
+    def __rsub__(self, othr):
+        return -(self - othr)
+
+    def __neg__(self):
+        res = self.copy()
+        res.set_values(-self.__v)
+        return res
+
+    def __str__(self):
+        """
+        Pseudo-graphics representation of the mesh:
+
+        AZ1        AZ2        AZ3        AZ4      ...         AZN
+        |   rdz1   |   rdz2   |   rdz3   |   rdz4   |   ...   |
+        |   val1   |   val2   |   val3   |   val4   |   ...   |
+
+       where rdzi -- i-th relative delta z, vali -- i-th value, AZi -- absolute i-th boundary coordinate.
+        """
+        f_d = '{0}'
+        f_v = '{0}'
+        f_Z = '{0}'
+
+        delim = '|'
+        margin = ' '*4
+
+        zl = self.boundary_coords('abs')
+
+        l1 = '' # first line
+        l2 = '' # second line
+        l3 = '' # third line
+        for (d, v, z) in zip(self.__z.tolist(), self.__v.tolist(), zl):
+            d = f_d.format(d)
+            v = f_v.format(v)
+            z = f_Z.format(z)
+            len_d = len(d)
+            len_v = len(v)
+            len_z = len(z)
+            len_2 = max(len_d, len_v)
+            l1 += z + ' '*len_2 + margin
+            l2 += delim + ' '*(len_z-1) + d + ' '*(len_2 - len_d) + margin
+            l3 += delim + ' '*(len_z-1) + v + ' '*(len_2 - len_v) + margin
+        l2 += delim
+        l3 += delim
+        l1 += f_Z.format(zl[-1])
+        return '\n'.join([l2, l3, l1])
+
+    def unify(self, othr, log=False):
+        """
+        Changes self and othr so that their mesh boundaries coincide.
+
+        Boundaries of both meshes are merged; boundaries of othr that are
+        closer than MINIMAL_OFFSET to a boundary of self are not added. Each
+        mesh receives the merged boundaries within its own extension.
+        """
+
+        # find region where meshes intersect:
+        z1min, z1max = self.__b.extension('z')
+        z2min, z2max = othr.__b.extension('z')
+
+        if z1min > z2max or z2min > z1max:
+            # there is no intersection. Nothing to do.
+            return
+
+        if (z1min, z1max) == (z2min, z2max) and numpy.array_equal(self.__z, othr.__z):
+            # grids are equal. Nothing to do
+            return
+
+        MO = min(self.MINIMAL_OFFSET, othr.MINIMAL_OFFSET)
+
+        # absolute boundary coordinates:
+        b1 = _boundaries(self.__z * (z1max - z1min), z1min)
+        b2 = _boundaries(othr.__z * (z2max - z2min), z2min)
+        b = _merge_boundaries(b1, b2, MO)
+        if log:
+            print 'merged boundaries: ', b
+
+        bb1 = b[(b >= z1min - MO) & (b <= z1max + MO)]
+        bb2 = b[(b >= z2min - MO) & (b <= z2max + MO)]
+
+        # put new grids to mesh instances:
+        self.__v = _remap(bb1, b1, self.__v)
+        othr.__v = _remap(bb2, b2, othr.__v)
+        self.__z = numpy.diff(bb1)
+        othr.__z = numpy.diff(bb2)
+        self._normalize_grid()
+        othr._normalize_grid()
+        return
+
+    def _normalize_grid(self):
+        self.__z = self.__z / self.__z.sum()
+        return
+
+    def update(self, othr, log=False):
+        """
+        Puts to self grid and values of othr, where self and othr intersect.
+        """
+        # find region where meshes intersect:
+        z1min, z1max = self.__b.extension('z')
+        z2min, z2max = othr.__b.extension('z')
+        if log:
+            print 'z1min, z1max: ', z1min, z1max
+            print 'z2min, z2max: ', z2min, z2max
+
+        if z1min >= z2max or z2min >= z1max:
+            # there is no intersection. Self remains unchanged.
+            return
+
+        if (z1min, z1max) == (z2min, z2max) and numpy.array_equal(self.__z, othr.__z):
+            # grids are equal. Simply put values from othr to self, they
+            # are shared until changed:
+            self.__v = othr.__v
+            self.__s = othr.__s = True
+            return
+
+        MO = min(self.MINIMAL_OFFSET, othr.MINIMAL_OFFSET)
+
+        # absolute boundary coordinates:
+        b1 = _boundaries(self.__z * (z1max - z1min), z1min)
+        b2 = _boundaries(othr.__z * (z2max - z2min), z2min)
+
+        # self is divided to three parts: below othr, intersection with othr
+        # and above othr. In the intersection, grid of othr is used.
+        if _are_close(z1min, z2min, abs_err=self.MINIMAL_OFFSET):
+            lo = z1min
+        else:
+            lo = max(z1min, z2min)
+        if _are_close(z1max, z2max, abs_err=self.MINIMAL_OFFSET):
+            hi = z1max
+        else:
+            hi = min(z1max, z2max)
+        bl = b1[b1 < lo - MO]
+        bm = b2[(b2 > lo + MO) & (b2 < hi - MO)]
+        bu = b1[b1 > hi + MO]
+        vl = _remap(numpy.concatenate((bl, [lo])), b1, self.__v) if len(bl) else self.__v[:0]
+        vm = _remap(numpy.concatenate(([lo], bm, [hi])), b2, othr.__v)
+        vu = _remap(numpy.concatenate(([hi], bu)), b1, self.__v) if len(bu) else self.__v[:0]
+        if log:
+            print 'lower, middle, upper boundaries: ', bl, bm, bu
+
+        b = numpy.concatenate((bl, [lo], bm, [hi], bu))
+        self.__z = numpy.diff(b)
+        self.__v = _values_array(numpy.concatenate((vl, vm, vu)))
+        self._normalize_grid()
+        return
+
+
+def split_list(l, v, z, MINIMAL_OFFSET):
+    """
+    Splits mesh with element lengths l and values v at distance z from its
+    beginning. Returns lengths and values of the two parts.
+    """
+    l = numpy.asarray(l, dtype=float)
+    assert len(l) == len(v)
+    assert z > 0.
+    assert (l >= 0.).all() # all elements of l are non-negative
+    b = _boundaries(l)
+    i = int(numpy.searchsorted(b, z - MINIMAL_OFFSET))
+    if i < len(b) and _are_close(b[i], z, abs_err=MINIMAL_OFFSET):
+        # split at the existing boundary
+        return l[:i].tolist(), list(v[:i]), l[i:].tolist(), list(v[i:])
+    i = min(i, len(l))
+    l1 = l[:i].tolist()
+    l2 = l[i-1:].tolist()
+    l1[-1] = z - b[i-1]
+    l2[0] -= l1[-1]
+    return l1, list(v[:i]), l2, list(v[i-1:])
+
+def common_grid(l1, v1, l2, v2, MINIMAL_OFFSET, log=False):
+    """
+    Returns common grid of two meshes and their values on this grid.
+
+    Assuming that sum(l1) = sum(l2)
+    """
+    assert _are_close(sum(l1), sum(l2), abs_err=MINIMAL_OFFSET)
+    assert len(l1) == len(v1)
+    assert len(l2) == len(v2)
+    b1 = _boundaries(numpy.asarray(l1, dtype=float))
+    b2 = _boundaries(numpy.asarray(l2, dtype=float))
+    b = _merge_boundaries(b1, b2, MINIMAL_OFFSET)
+    b = b[b <= b1[-1] + MINIMAL_OFFSET]
+    nv1 = _remap(b, b1, _values_array(v1))
+    nv2 = _remap(b, b2, _values_array(v2))
+    return (numpy.diff(b).tolist(), nv1.tolist(), nv2.tolist())
+
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+
@@ -21,5 +21,7 @@ Package contains several classes to simplify work with PIRS.
 
 from .load_map import LoadMap
 from .dumper import load, dump
+from .checkpoint import Checkpoint
+from .timing import timers, timer, timed
 from  .text import format_valerr
 
@@ -0,0 +1,231 @@
+"""
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Compact checkpoints of coupled calculations.
+
+In contrast to dump(), which pickles complete interface objects, a
+checkpoint stores the objects (the skeleton) only once. For each iteration
+only the axial distributions of temperature, density and heat of the
+specified models, and a dictionary of scalar values are written.
+"""
+
+import cPickle as pickle
+import glob
+import os
+import sys
+from array import array
+from time import gmtime, strftime
+
+VARS = ('temp', 'dens', 'heat')
+
+
+class Checkpoint(object):
+    """
+    Checkpoint files with the common prefix.
+
+    The skeleton is written once, by write_skeleton(). Its keyword arguments
+    are objects, for example, interfaces:
+
+    >>> ck = Checkpoint('run/ck_')
+    >>> ck.write_skeleton(MI=MI, SI=SI)
+
+    In each iteration, axial distributions of the models specified by paths
+    relative to the skeleton objects are written, together with the keyword
+    arguments:
+
+    >>> ck.write(1, ['SI.gm'], keff=1.002)
+
+    The read() method returns a dictionary with the skeleton objects and the
+    keyword arguments of write(). The axial distributions are reattached to
+    the models of the skeleton:
+
+    >>> d = ck.read(1)
+    >>> SI = d['SI']
+    >>> d['keff']
+    1.002
+
+    Elements of the models are matched by their order in values(True), thus
+    the skeleton model and the model written in an iteration must have the
+    same structure.
+    """
+    def __init__(self, prefix):
+        self.__p = prefix
+        # skeleton objects, set in write_skeleton() or read().
+        self.__o = None
+        return
+
+    @property
+    def prefix(self):
+        return self.__p
+
+    @property
+    def objects(self):
+        """
+        Dictionary of the skeleton objects.
+        """
+        return self.__o
+
+    def skeleton_file(self):
+        return self.__p + 'skeleton.dump'
+
+    def iteration_file(self, n):
+        return self.__p + 'iteration_{0:03d}.ck'.format(n)
+
+    def iterations(self):
+        """
+        Returns sorted list of iterations with existing checkpoint files.
+        """
+        res = []
+        pattern = self.iteration_file(0).replace('000', '[0-9]*')
+        for f in glob.glob(pattern):
+            n = f[len(self.__p) + len('iteration_'):-len('.ck')]
+            if n.isdigit():
+                res.append(int(n))
+        return sorted(res)
+
+    def write_skeleton(self, **kwargs):
+        """
+        Pickle the keyword arguments to the skeleton file. Objects are kept
+        to resolve the model paths in write().
+        """
+        d = os.path.dirname(self.__p)
+        if d and not os.path.exists(d):
+            os.makedirs(d)
+        kwargs['_main_script'] = os.path.abspath(sys.argv[0])
+        kwargs['_timestamp'] = strftime("%Y-%m-%d %H:%M:%S", gmtime())
+        with open(self.skeleton_file(), 'wb') as f:
+            pickle.dump(kwargs, f, pickle.HIGHEST_PROTOCOL)
+        self.__o = kwargs
+        return
+
+    def write(self, n, models, **kwargs):
+        """
+        Writes axial distributions of models and the keyword arguments to the
+        checkpoint file of iteration n.
+
+        Models is a list of paths like 'SI.gm', relative to the skeleton
+        objects.
+        """
+        if self.__o is None:
+            raise ValueError('Skeleton must be written before iterations')
+        meshes = {}
+        for path in models:
+            meshes[path] = get_meshes(self._resolve(path))
+        d = {'state': kwargs, 'meshes': meshes}
+        with open(self.iteration_file(n), 'wb') as f:
+            pickle.dump(d, f, pickle.HIGHEST_PROTOCOL)
+        return
+
+    def read(self, n=None):
+        """
+        Reads checkpoint of iteration n (by default, of the last iteration),
+        and returns dictionary with the skeleton objects and the keyword
+        arguments given to write(). The skeleton is read only once.
+        """
+        if n is None:
+            n = self.iterations()[-1]
+        if self.__o is None:
+            with open(self.skeleton_file(), 'rb') as f:
+                self.__o = pickle.load(f)
+        with open(self.iteration_file(n), 'rb') as f:
+            d = pickle.load(f)
+        for (path, meshes) in d['meshes'].items():
+            set_meshes(self._resolve(path), meshes)
+        res = self.__o.copy()
+        res.update(d['state'])
+        return res
+
+    def _resolve(self, path):
+        names = path.split('.')
+        o = self.__o[names[0]]
+        for n in names[1:]:
+            o = getattr(o, n)
+        return o
+
+
+def get_meshes(model):
+    """
+    Returns dictionary representing axial distributions of model and its
+    children.
+
+    For each variable, the indices of elements in model.values(True) with
+    the distribution defined, the number of mesh elements, relative grids,
+    values, precisions and, if values have uncertainties, standard deviations
+    are stored in arrays.
+    """
+    res = {'N': 0}
+    for v in VARS:
+        res[v] = (array('l'), array('l'), array('d'), array('d'), None, array('d'))
+    for (i, e) in enumerate(model.values(True)):
+        res['N'] += 1
+        for var in VARS:
+            m = e.get_var(var)
+            if m is None:
+                continue
+            ii, nn, zz, vv, ee, pp = res[var]
+            p = m.prec
+            m.prec = 0.
+            vals = m.values()
+            m.prec = p
+            ii.append(i)
+            nn.append(len(vals))
+            zz.extend(m.get_grid())
+            pp.append(p)
+            if ee is None and any(hasattr(x, 'nominal_value') for x in vals):
+                # previous values have no uncertainties.
+                ee = array('d', [0.]*len(vv))
+                res[var] = (ii, nn, zz, vv, ee, pp)
+            if ee is None:
+                vv.extend(map(float, vals))
+            else:
+                for x in vals:
+                    if hasattr(x, 'nominal_value'):
+                        vv.append(x.nominal_value)
+                        ee.append(x.std_dev)
+                    else:
+                        vv.append(x)
+                        ee.append(0.)
+    return res
+
+
+def set_meshes(model, meshes):
+    """
+    Set axial distributions of model and its children from the dictionary
+    returned by get_meshes().
+    """
+    elements = list(model.values(True))
+    if len(elements) != meshes['N']:
+        raise ValueError('Model structure differs from the saved one: '
+                         '{0} elements instead of {1}'.format(len(elements), meshes['N']))
+    for var in VARS:
+        ii, nn, zz, vv, ee, pp = meshes[var]
+        if ee is not None:
+            from uncertainties import ufloat
+            vals = map(ufloat, vv, ee)
+        else:
+            vals = vv.tolist()
+        zz = zz.tolist()
+        k = 0
+        for (i, n, p) in zip(ii, nn, pp):
+            m = getattr(elements[i], var)
+            m.clear()
+            m.set_grid(zz[k:k+n])
+            m.set_values(vals[k:k+n])
+            m.prec = p
+            k += n
+    return
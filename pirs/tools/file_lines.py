@@ -38,3 +38,16 @@ def get_last_line(f, llen=200):
         else:
             return None
 
+
+def write_lines(f, lines):
+    """
+    Write strings from iterable lines to file object f, separated by
+    newlines. The result is the same as f.write('\\n'.join(lines)), but
+    the joined string is never built.
+    """
+    sep = ''
+    for l in lines:
+        f.write(sep)
+        f.write(l)
+        sep = '\n'
+    return
@@ -0,0 +1,200 @@
+"""
+# Copyright 2015 Karlsruhe Institute of Technology (KIT)
+#
+# This file is part of PIRS-2.
+#
+# PIRS-2 is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PIRS-2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Timers for stages of model processing.
+
+Stages are marked with the timer() context manager or with the timed()
+decorator. Stages started inside other stages are nested, their full names
+are formed from the names of enclosing stages separated by '/'. For each
+stage, the number of calls and the total wall time are accumulated in the
+module-level instance timers:
+
+>>> timers.reset()
+>>> with timer('outer'):
+...     for i in range(3):
+...         with timer('inner'):
+...             pass
+>>> [(n, c) for (n, c, t) in timers.items()]
+[('outer', 1), ('outer/inner', 3)]
+
+Recursive calls of a stage (the stage name is already in the stack of
+running stages) are counted, but not timed for the second time.
+
+When the profile attribute is True, or is a collection of stage names, the
+stages (only the outermost ones, cProfile cannot be nested) are run under
+cProfile and the collected statistics are saved by write().
+"""
+
+import cProfile
+import pstats
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+class Timers(object):
+    """
+    Collection of hierarchical stage timers. See the module docstring.
+    """
+    def __init__(self):
+        #: When False, timer() does nothing.
+        self.enabled = True
+        #: True, or a collection of stage names to run under cProfile.
+        self.profile = False
+        self.reset()
+        return
+
+    def reset(self):
+        """
+        Removes all accumulated times and profiles.
+        """
+        self.__s = []      # stack of running stage names
+        self.__d = {}      # full name -> [calls, time]
+        self.__o = []      # full names in the order of first call
+        self.__p = {}      # full name -> pstats.Stats
+        self.__prof = None # profiler currently running
+        return
+
+    def __entry(self, path):
+        if path not in self.__d:
+            self.__d[path] = [0, 0.]
+            self.__o.append(path)
+        return self.__d[path]
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Context manager timing the stage name.
+        """
+        if not self.enabled:
+            yield
+            return
+        if name in self.__s:
+            # recursive call. Only count it.
+            i = self.__s.index(name)
+            self.__entry('/'.join(self.__s[:i+1]))[0] += 1
+            yield
+            return
+        self.__s.append(name)
+        path = '/'.join(self.__s)
+        e = self.__entry(path)
+        prof = None
+        if self.__prof is None and (self.profile is True or
+                                    (self.profile and name in self.profile)):
+            prof = cProfile.Profile()
+            self.__prof = prof
+            prof.enable()
+        t0 = time.time()
+        try:
+            yield
+        finally:
+            e[1] += time.time() - t0
+            e[0] += 1
+            if prof is not None:
+                prof.disable()
+                self.__prof = None
+                if path in self.__p:
+                    self.__p[path].add(prof)
+                else:
+                    self.__p[path] = pstats.Stats(prof)
+            self.__s.pop()
+        return
+
+    def timed(self, name):
+        """
+        Decorator timing each call of the function as the stage name.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def items(self):
+        """
+        Returns list of tuples (full name, calls, time) in the order the stages
+        were called for the first time.
+        """
+        return [(p, ) + tuple(self.__d[p]) for p in self.__o]
+
+    def profiles(self):
+        """
+        Dictionary full stage name -> pstats.Stats instance.
+        """
+        return self.__p.copy()
+
+    def report(self):
+        """
+        Returns multi-line string with stages, number of calls, total time and
+        percentage of the time of the enclosing stage (for top-level stages,
+        of the time of all top-level stages).
+        """
+        res = ['{0:<50s} {1:>8s} {2:>10s} {3:>6s}'.format('stage', 'calls', 'time, s', '%')]
+        # time of top-level stages
+        ttop = sum(t for (p, (c, t)) in self.__d.items() if '/' not in p)
+        for (p, c, t) in self.items():
+            names = p.split('/')
+            if len(names) > 1:
+                tp = self.__d['/'.join(names[:-1])][1]
+            else:
+                tp = ttop
+            pc = 100.*t/tp if tp > 0. else 100.
+            n = '  '*(len(names) - 1) + names[-1]
+            res.append('{0:<50s} {1:8d} {2:10.3f} {3:6.1f}'.format(n, c, t, pc))
+        return '\n'.join(res)
+
+    def write(self, fname, nprof=30):
+        """
+        Writes the report to file fname. Statistics of profiled stages are
+        saved to files fname.<stage>.prof, and nprof most expensive functions
+        (by cumulative time) are appended to the report.
+        """
+        with open(fname, 'w') as f:
+            f.write(self.report() + '\n')
+            for (p, s) in sorted(self.__p.items()):
+                pname = '{0}.{1}.prof'.format(fname, p.replace('/', '.'))
+                s.dump_stats(pname)
+                f.write('\nProfile of {0}, see {1}\n'.format(p, pname))
+                s.stream = f
+                s.sort_stats('cumulative').print_stats(nprof)
+        return
+
+
+#: Timers used by timer() and timed().
+timers = Timers()
+
+
+def timer(name):
+    """
+    Context manager timing the stage name, see Timers.timer().
+    """
+    return timers.timer(name)
+
+
+def timed(name):
+    """
+    Decorator timing the function as the stage name, see Timers.timed().
+    """
+    return timers.timed(name)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
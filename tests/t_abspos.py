@@ -0,0 +1,35 @@
+# Check cached absolute positions.
+
+from pirs.solids import Box, Cylinder
+from pirs.core.trageom import Vector3
+
+b = Box(X=3, Y=3, Z=1)
+b.grid.x = 1.
+b.grid.y = 1.
+for i in (-1, 0, 1):
+    for j in (-1, 0, 1):
+        c = b.grid.insert((i, j, 0), Cylinder(R=0.4))
+        c.insert(Cylinder(R=0.2)).pos = Vector3((0, 0, 0.1))
+
+ref = [(e, e.abspos()) for e in b.values(True)]
+
+b.cache_abspos(True)
+for (e, p) in ref:
+    assert e.abspos() == p
+    assert e.abspos(coordinate='x') == p.x
+for (e, p) in b.abspositions():
+    assert p == dict((id(ee), pp) for (ee, pp) in ref)[id(e)]
+
+# cache is cleared when positions change:
+b.grid.x = 2.
+c = b.children[0]
+assert c.abspos() == Vector3((-2, -1, 0))
+c.pos = Vector3((0, 0, 0.5))
+assert c.children[0].abspos() == Vector3((-2, -1, 0.6))
+c.withdraw()
+assert c.abspos() == Vector3((0, 0, 0.5))
+b.insert(c)
+c.ijk = (None, None, None)
+assert c.abspos() == Vector3((0, 0, 0.5))
+b.cache_abspos(False)
+print 'OK'
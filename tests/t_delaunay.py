@@ -0,0 +1,112 @@
+# Check in-process triangulation, scipy-based. When the qdelaunay command is
+# in PATH, compare it also with the qdelaunay output.
+
+import math
+import os
+import sys
+from distutils.spawn import find_executable
+# pirs/scf3 is not a package, its modules are imported from the directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'pirs', 'scf3'))
+import qhull_interface as qi
+try:
+    from scipy.spatial import ConvexHull
+except ImportError:
+    ConvexHull = None
+
+# Point sets as in pirs/scf3/_example_bwr.py and _example_hex.py
+pp = 2.
+Np = 10
+
+# square lattice of pins with one pin inside the channel, and the channel
+# interior free of pins.
+bwr = []
+for i in range(-1, Np+1):
+    for j in range(-1, Np+1):
+        if not (5 < i < 7 and 3 < j < 6):
+            bwr.append((pp*i, pp*j))
+bwr.append((6*pp, 4.5*pp))
+
+# hexagonal lattice of pins
+hex_ = []
+for i in range(-Np//2, Np//2 + 1):
+    for j in range(-Np//2, Np//2 + 1):
+        if abs(i + j) <= Np//2:
+            hex_.append((pp*(i + 0.5*j), pp*j*math.sqrt(3.)/2.))
+
+
+def normalized(out):
+    """
+    Returns output of qdelaunay() in a form independent on the order of
+    regions and on the values of negative indices.
+    """
+    regions = []
+    for d in out['i']:
+        # vertices in cyclic order, starting from the lowest index
+        k = d.index(min(d))
+        regions.append(tuple(d[k:] + d[:k]))
+
+    def nset(l):
+        return frozenset(regions[i] for i in l if i >= 0)
+
+    # number of facets at infinity is the same only for regions.
+    Fn = dict((regions[r], (nset(l), len([i for i in l if i < 0])))
+              for (r, l) in enumerate(out['Fn']))
+    FN = [(nset(l), min(l) < 0) for l in out['FN']]
+    return set(regions), Fn, FN, set(out['Fx']), sorted(out['FP'])
+
+
+def check(points):
+    """
+    Checks properties of delaunay(points) that do not depend on qdelaunay.
+    """
+    out = qi.delaunay(points)
+    # all points, except the unused ones, are region vertices
+    used = set(v for d in out['i'] for v in d)
+    assert used == set(range(len(points))) - set(out['FP'])
+    # region vertices are listed counter-clockwise
+    for d in out['i']:
+        a = sum(points[v1][0]*points[v2][1] - points[v2][0]*points[v1][1]
+                for (v1, v2) in zip(d, d[1:] + d[:1]))
+        assert a > 0
+    # neighbourhood of regions is symmetric
+    for (r, l) in enumerate(out['Fn']):
+        for n in l:
+            assert n < 0 or r in out['Fn'][n]
+    # extreme sites are all used points on the convex hull
+    h = ConvexHull(points)
+    hull = set(i for i in used
+               if min(abs(e[0]*points[i][0] + e[1]*points[i][1] + e[2])
+                      for e in h.equations) < 1e-9)
+    assert set(out['Fx']) == hull
+    return out
+
+
+if qi.Delaunay is None:
+    print 'scipy not available, test skipped'
+else:
+    check(hex_)
+    check(bwr + [bwr[0]])
+    out = check(bwr)
+    # squares of the lattice are merged into one region
+    regions = set(frozenset(d) for d in out['i'])
+    index = dict((p, n) for (n, p) in enumerate(bwr))
+    nq = 0
+    for i in range(-1, Np):
+        for j in range(-1, Np):
+            c = [(pp*(i+di), pp*(j+dj)) for (di, dj) in ((0, 0), (1, 0), (1, 1), (0, 1))]
+            if all(p in index for p in c) and not (5 <= i <= 6 and 3 <= j <= 5):
+                assert frozenset(index[p] for p in c) in regions
+                nq += 1
+    assert nq == len([d for d in out['i'] if len(d) == 4]) > 100
+    assert all(len(d) in (3, 4) for d in out['i'])
+    # triangulations are shared
+    assert qi.triangulation(bwr) is qi.triangulation(list(bwr))
+
+    if find_executable('qdelaunay') is not None:
+        for points in (bwr, hex_, bwr + [bwr[0]]):
+            r1 = normalized(qi.qdelaunay(points))
+            r2 = normalized(qi.delaunay(points))
+            for (a, b) in zip(r1, r2):
+                assert a == b
+    print 'OK'
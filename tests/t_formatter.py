@@ -0,0 +1,63 @@
+# Check formatter.format_card against the straightforward wrapping algorithm
+# on random cards.
+
+import random
+from pirs.mcnp.formatter import format_card, format_cards
+
+
+def reference(string, maxLen=80, indent=' '*5, eol='$', cl='c ', propagate_comments=True):
+    lind = len(indent)
+    res = []
+    for line in string.splitlines():
+        if line[:lind].lstrip().lower().find(cl) == 0:
+            if propagate_comments:
+                res.append(line)
+        else:
+            if line[:lind] == indent:
+                meaning, c, comment = line[lind:].partition(eol)
+                prefix = indent
+            else:
+                meaning, c, comment = line.partition(eol)
+                prefix = ''
+            meaning = meaning.strip()
+            while meaning:
+                if len(prefix) + len(meaning) <= maxLen:
+                    res.append(prefix + meaning)
+                    meaning = ''
+                else:
+                    idx = meaning.rfind(' ', 0, maxLen - len(prefix))
+                    if idx == -1:
+                        part = meaning
+                        meaning = ''
+                    else:
+                        part = meaning[:idx]
+                        meaning = meaning[idx:].lstrip()
+                    res.append(prefix + part)
+                prefix = indent
+            if comment.strip() != '' and propagate_comments:
+                last = res[-1]
+                res[-1] = last + ' '*(maxLen - len(last) + 2) + eol + ' ' + comment
+    return '\n'.join(res)
+
+
+random.seed(1)
+words = ['1', '-10.2', 'u=12', 'imp:n=1', '(-1 : 2)', 'fill=1', '  ', 'x'*30, 'y'*90, 'tmp=2.5e-8']
+cards = []
+for i in range(2000):
+    lines = []
+    for l in range(random.randint(1, 3)):
+        line = '1 ' + ' '.join(random.choice(words) for k in range(random.randint(0, 60)))
+        r = random.random()
+        if r < 0.1:
+            line = 'c ' + line
+        elif r < 0.3:
+            line = ' '*5 + line
+        if random.random() < 0.3:
+            line += ' $ comment ' + str(i)
+        lines.append(line)
+    cards.append('\n'.join(lines))
+
+for kw in [{}, {'maxLen': 40}, {'maxLen': 3}, {'propagate_comments': False}]:
+    assert format_cards(cards, **kw) == [reference(c, **kw) for c in cards]
+    assert format_card(cards[0], **kw) == reference(cards[0], **kw)
+print 'OK'
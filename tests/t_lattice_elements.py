@@ -0,0 +1,22 @@
+# Check that types of lattice elements take into account axial distributions
+# of the container.
+
+from pirs.solids import Box, Cylinder
+
+b = Box(X=1, Y=1, Z=3)
+b.material = 'water'
+b.grid.x = 1
+b.grid.y = 1
+b.grid.z = 1
+b.temp.set_grid([1, 1, 1])
+b.temp.set_values([300., 400., 500.])
+c = Cylinder(R=0.3, Z=1)
+c.material = 'fuel'
+for k in range(3):
+    b.grid.insert((0, 0, k), c.copy_tree())
+b.grid.center()
+
+res = list(b.lattice_elements())
+assert [t for (ijk, e, t) in res] == [1, 2, 3], res
+assert [e.temp.values() for (ijk, e, t) in res] == [[300.], [400.], [500.]]
+print 'OK'
@@ -0,0 +1,91 @@
+# Check MctalFile against Mctal.read_complete() and Mctal.read() on a
+# synthetic mctal file.
+
+import os
+import random
+import tempfile
+import numpy
+from pirs.mcnp.mctal import Mctal, MctalFile, add_e_to_block
+
+random.seed(1)
+fname = os.path.join(tempfile.mkdtemp(), 'mctal')
+
+
+def values(vals, n=4):
+    """
+    Lines with n values per line.
+    """
+    res = []
+    for i in range(0, len(vals), n):
+        res.append(' '.join(vals[i:i+n]))
+    return res
+
+
+def tally(name, cells, ne):
+    lines = ['tally {0:>5}   -1    0'.format(name)]
+    lines.append('      comment line of the tally')
+    lines.append('f {0:>11}'.format(len(cells)))
+    lines += values(['{0:7d}'.format(c) for c in cells], 11)
+    lines.append('d {0:>11}'.format(1))
+    lines.append('u {0:>11}'.format(0))
+    lines.append('s {0:>11}'.format(0))
+    lines.append('m {0:>11}'.format(0))
+    lines.append('c {0:>11}'.format(0))
+    lines.append('et {0:>10}'.format(ne))
+    lines += values(['{0:12.5E}'.format(0.1*(i+1)) for i in range(ne-1)], 6)
+    lines.append('t {0:>11}'.format(0))
+    lines.append('vals')
+    v = []
+    for i in range(len(cells)*ne):
+        x = random.random()
+        v.append('{0:12.5E} {1:6.4f}'.format(x, x*0.1))
+    v[1] = ' 1.23456-123 0.5000'  # 3-digit exponent
+    lines += values(v)
+    lines.append('tfc {0:>4}       1       1       1       1       1       1       1       1'.format(2))
+    lines.append('       1000   1.00000E-01 0.0100 0.0000E+00')
+    lines.append('       2000   2.00000E-01 0.0200 0.0000E+00')
+    return lines
+
+
+nc, mk = 7, 19
+lines = ['mcnp5    1.60   04/17/13 11:08:58     3     100000    1234567']
+lines.append('tally title line')
+lines.append('ntal     2')
+lines.append('    4   14')
+lines += tally(4, range(1, 30), 3)
+lines += tally(14, range(100, 105), 1)
+lines.append('kcode {0:>5}    2 {1:>5}'.format(nc, mk))
+kv = ['{0:12.5E}'.format(random.random()) for i in range(nc*mk)]
+lines += values(kv, 5)
+open(fname, 'w').write('\n'.join(lines) + '\n')
+
+m = Mctal()
+m.read_complete(fname)
+mf = MctalFile(fname)
+assert sorted(mf.keys()) == [4, 14]
+assert (mf.nps, mf.ver, mf.tals, mf.title) == (m.nps, m.ver, m.tals, m.title)
+for n in mf.keys():
+    t1 = m.mctaltallies[n]
+    t2 = mf.read_tally(n)
+    assert t1.fnl == t2.fnl
+    assert t1.evl == t2.evl
+    assert t1.tfc == t2.tfc
+    assert t1.vals_numpy_order == t2.vals_numpy_order
+    assert numpy.all(t1.vals_numpy == t2.vals_numpy)
+    assert list(t2.values.ravel(order='F')) == [v for (v, e) in t1.vals]
+    assert list(t2.errors.ravel(order='F')) == [e for (v, e) in t1.vals]
+assert mf.read_tally(4).values.shape == (3, 29)
+assert mf.read_tally(4).values[1, 0] == 1.23456e-123
+
+m.read(fname)
+k = mf.read_kcode()
+assert k.array.shape == (nc, mk)
+assert k.array.tolist() == m.kcode.array
+assert tuple(k.final()) == tuple(m.final())
+mf.close()
+with MctalFile(fname) as mf:
+    assert mf.read_tally(14).values.shape == (5,)
+assert add_e_to_block('1.2-123 -4.5+100 -1.0E-01') == '1.2e-123 -4.5e+100 -1.0E-01'
+os.remove(fname)
+os.rmdir(os.path.dirname(fname))
+print 'OK'
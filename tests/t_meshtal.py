@@ -0,0 +1,60 @@
+# Check reading of meshtal files: only requested tallies are decoded.
+
+import os
+import tempfile
+from pirs.mcnp.tallies import MeshtalFile, read_meshtal
+
+txt = """mcnp   version 5     ld=03212008  probid =  04/03/14 13:46:04
+ c title
+ 
+ Number of histories used for normalizing tallies =      40000.00
+ 
+ Mesh Tally Number        14
+ neutron  mesh tally.
+
+ Tally bin boundaries:
+    X direction:     -1.00      0.00      1.00
+    Y direction:     -1.00      1.00
+    Z direction:      0.00      5.00     10.00
+    Energy bin boundaries:  0.00E+00 1.00E+36
+
+   Energy         X         Y         Z     Result     Rel Error     Volume    Rslt * Vol
+  1.000E+36    -0.500     0.000     2.500 1.00000E-01 1.00000E-02 1.00000E+01 1.00000E+00
+  1.000E+36    -0.500     0.000     7.500 2.00000E-01 2.00000E-02 1.00000E+01 2.00000E+00
+  1.000E+36     0.500     0.000     2.500 3.00000-105 3.00000E-02 1.00000E+01 3.00000-104
+  1.000E+36     0.500     0.000     7.500 4.00000E-01 4.00000E-02 1.00000E+01 4.00000E+00
+
+ Mesh Tally Number        24
+ neutron  mesh tally.
+
+ Tally bin boundaries:
+    X direction:     -1.00      1.00
+    Y direction:     -1.00      1.00
+    Z direction:      0.00     10.00
+    Energy bin boundaries:  0.00E+00 1.00E+36
+
+   Energy         X         Y         Z     Result     Rel Error     Volume    Rslt * Vol
+  1.000E+36     0.000     0.000     5.000 5.00000E-01 5.00000E-02 2.00000E+01 1.00000E+01
+"""
+
+fd, fname = tempfile.mkstemp()
+os.write(fd, txt)
+os.close(fd)
+
+mf = MeshtalFile(fname)
+assert sorted(mf.keys()) == [14, 24]
+assert mf.nps == 40000.
+assert mf.title.strip() == 'c title'
+
+mt = mf.read_tally(14)
+assert mt.imesh == [0., 1.]
+assert mt.kmesh == [5., 10.]
+assert list(mt.values) == [0.1, 0.2, 3e-105, 0.4]
+assert list(mt.errors) == [0.01, 0.02, 0.03, 0.04]
+
+t, n, r = read_meshtal(fname, False, tallies=[24])
+assert r.keys() == [24]
+assert list(r[24].values) == [0.5]
+
+os.remove(fname)
+print 'OK'
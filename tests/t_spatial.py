@@ -0,0 +1,38 @@
+# Check spatial index of solids against all-pairs tests.
+
+import random
+from pirs.solids import Box, Cylinder
+from pirs.solids.spatial import SpatialIndex
+from pirs.core.trageom import Vector3
+
+rnd = random.Random(1)
+b = Box(X=20, Y=20, Z=20)
+for n in range(200):
+    if n % 3:
+        c = Cylinder(R=rnd.uniform(0.1, 2.), Z=rnd.uniform(1., 20.))
+    else:
+        c = Box(X=rnd.uniform(0.1, 3.), Y=rnd.uniform(0.1, 3.), Z=rnd.uniform(1., 20.))
+    c.pos = Vector3((rnd.uniform(-9, 9), rnd.uniform(-9, 9), rnd.uniform(-5, 5)))
+    b.insert(c)
+# large solids and touching ones
+b.insert(Box(X=18, Y=18, Z=1))
+b.insert(Box(X=1, Y=1, Z=1)).pos = Vector3((0.5, 0, 0))
+b.insert(Box(X=1, Y=1, Z=1)).pos = Vector3((-0.5, 0, 0))
+
+cc = b.children
+si = SpatialIndex(cc, b)
+for i in range(len(cc)):
+    ref = [j for j in range(len(cc)) if j != i and cc[i].intersect(cc[j])]
+    assert set(ref) <= set(si.neighbours(i)), i
+
+# remove_invisible with the index gives the same as without it
+b.insert(Box(X=4, Y=4, Z=20))
+ref = b.copy_tree()
+for c in ref.children[:]:
+    if c.covering_sibling() is not None:
+        c.withdraw()
+b.remove_invisible()
+assert len(b.children) == len(ref.children)
+for (c1, c2) in zip(b.children, ref.children):
+    assert c1 == c2
+print 'OK'
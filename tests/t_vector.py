@@ -0,0 +1,52 @@
+# Check Vector3 cartesian fast path and Vector3Array against general Vector3.
+
+import random
+import cPickle
+from pirs.core.trageom import Vector3, Vector3Array
+
+random.seed(1)
+def rnd():
+    return tuple(random.uniform(-5, 5) for i in range(3))
+
+def close(v, w):
+    return (v - w).R < 1e-10
+
+vs = [Vector3(rnd()) for i in range(20)] + [Vector3()]
+ws = [Vector3(cyl=rnd()) for v in vs]
+
+for (v, w) in zip(vs, ws):
+    assert close(v + w, Vector3(car=w.car) + v)
+    assert close(v - Vector3(car=w.car), v + (-w))
+    assert abs(v.dot(Vector3(car=w.car)) - v.dot(w)) < 1e-12
+    assert close(v.cross(w), -(w.cross(v)))
+    for p in (0, 1, 2):
+        assert cPickle.loads(cPickle.dumps(w, p)).cyl == w.cyl
+
+a = Vector3Array.from_vectors(vs)
+b = Vector3Array.from_vectors(ws)
+assert len(a) == len(vs)
+assert ((a + b) - Vector3Array.from_vectors([v + w for (v, w) in zip(vs, ws)])).R.max() < 1e-10
+assert ((vs[0] - b) - Vector3Array.from_vectors([vs[0] - w for w in ws])).R.max() < 1e-10
+assert max(abs(a.dot(b) - [v.dot(w) for (v, w) in zip(vs, ws)])) < 1e-12
+assert (a.cross(b) - Vector3Array.from_vectors([v.cross(w) for (v, w) in zip(vs, ws)])).R.max() < 1e-10
+assert a.is_close(a.copy()).all() and not a.is_close(b).any()
+for i, v in enumerate(vs):
+    assert a[i] == v
+    for c in 'rtRp':
+        assert abs(getattr(a, c)[i] - getattr(v, c)) < 1e-12
+assert max(abs((Vector3Array(sph=a.sph) - a).R)) < 1e-12
+
+# vectors pickled before __slots__ were introduced
+import pickle
+old = ["ccopy_reg\n_reconstructor\np0\n(cpirs.core.trageom.vector\nVector3\np1\nc__builtin__\nobject\np2\nNtp3\nRp4\n(dp5\nS'_Vector3__z'\np6\nF3.0\nsS'_Vector3__cs'\np7\nS'car'\np8\nsS'_Vector3__x'\np9\nF1.0\nsS'_Vector3__y'\np10\nF2.0\nsS'_Vector3__rehash'\np11\nI01\nsb.",
+       "ccopy_reg\n_reconstructor\np0\n(cpirs.core.trageom.vector\nVector3\np1\nc__builtin__\nobject\np2\nNtp3\nRp4\n(dp5\nS'_Vector3__z'\np6\nF2.0\nsS'_Vector3__cs'\np7\nS'cyl'\np8\nsS'_Vector3__rehash'\np9\nI01\nsS'_Vector3__r'\np10\nF1.0\nsS'_Vector3__t'\np11\nF0.5\nsb.",
+       "ccopy_reg\n_reconstructor\np0\n(cpirs.core.trageom.vector\nVector3\np1\nc__builtin__\nobject\np2\nNtp3\nRp4\n(dp5\nS'_Vector3__R'\np6\nF2.0\nsS'_Vector3__cs'\np7\nS'sph'\np8\nsS'_Vector3__p'\np9\nF0.4\nsS'_Vector3__rehash'\np10\nI01\nsS'_Vector3__t'\np11\nF0.3\nsb.",
+       '\x80\x02cpirs.core.trageom.vector\nVector3\nq\x00)\x81q\x01}q\x02(U\x0b_Vector3__zq\x03G@\x08\x00\x00\x00\x00\x00\x00U\x0c_Vector3__csq\x04U\x03carq\x05U\x0b_Vector3__xq\x06G?\xf0\x00\x00\x00\x00\x00\x00U\x0b_Vector3__yq\x07G@\x00\x00\x00\x00\x00\x00\x00U\x10_Vector3__rehashq\x08\x88ub.']
+new = [Vector3((1., 2., 3.)), Vector3(cyl=(1., 0.5, 2.)), Vector3(sph=(2., 0.3, 0.4)), Vector3((1., 2., 3.))]
+for (s, v) in zip(old, new):
+    u = pickle.loads(s)
+    assert u == v and u.own == v.own, (u, v)
+    assert (u + v - v*2).R < 1e-12
+    for p in (0, 2):
+        assert pickle.loads(pickle.dumps(u, p)) == v
+print 'OK'
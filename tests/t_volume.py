@@ -0,0 +1,20 @@
+# Check that volumes pickled before __slots__ were introduced can be loaded.
+
+import pickle
+from pirs.mcnp.surfaces import Volume
+
+# Volume(1,'a') & Volume(-1,'b') | Volume(1, 'c'), pickled with protocols 0 and 2.
+old = ["ccopy_reg\n_reconstructor\np0\n(cpirs.mcnp.surfaces\nVolume\np1\nc__builtin__\nobject\np2\nNtp3\nRp4\n(dp5\nS'_Volume__op'\np6\nS'or'\np7\nsS'_Volume__a1'\np8\ng0\n(g1\ng2\nNtp9\nRp10\n(dp11\ng6\nS'and'\np12\nsg8\ng0\n(g1\ng2\nNtp13\nRp14\n(dp15\ng6\nNsg8\n(I1\nS'a'\np16\ntp17\nsS'_Volume__a2'\np18\nNsbsg18\ng0\n(g1\ng2\nNtp19\nRp20\n(dp21\ng6\nNsg8\n(I-1\nS'b'\np22\ntp23\nsg18\nNsbsbsg18\ng0\n(g1\ng2\nNtp24\nRp25\n(dp26\ng6\nNsg8\n(I1\nS'c'\np27\ntp28\nsg18\nNsbsb.",
+       '\x80\x02cpirs.mcnp.surfaces\nVolume\nq\x00)\x81q\x01}q\x02(U\x0b_Volume__opq\x03U\x02orq\x04U\x0b_Volume__a1q\x05h\x00)\x81q\x06}q\x07(h\x03U\x03andq\x08h\x05h\x00)\x81q\t}q\n(h\x03Nh\x05K\x01U\x01aq\x0b\x86q\x0cU\x0b_Volume__a2q\rNubh\rh\x00)\x81q\x0e}q\x0f(h\x03Nh\x05J\xff\xff\xff\xffU\x01bq\x10\x86q\x11h\rNububh\rh\x00)\x81q\x12}q\x13(h\x03Nh\x05K\x01U\x01cq\x14\x86q\x15h\rNubub.']
+
+for s in old:
+    u = pickle.loads(s)
+    v = Volume(1, 'a') & Volume(-1, 'b') | Volume(1, 'c')
+    assert u == v and hash(u) == hash(v) and str(u) == str(v), (str(u), str(v))
+    assert str(u.copy(lambda x: x.upper())) == '(A -B):C'
+    assert pickle.loads(pickle.dumps(u, 2)) == v
+
+# volumes without arguments, as created by pickle, are not shared
+assert Volume() is not Volume()
+assert pickle.loads(pickle.dumps(Volume(1, 'a'), 2)) is Volume(1, 'a')
+print 'OK'
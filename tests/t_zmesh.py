@@ -0,0 +1,52 @@
+# Check that numpy-based zmesh gives the same results as the list-based one.
+
+from pirs.solids import Box
+from pirs.solids.zmesh_nodecimal import zmesh as zmesh_l
+from pirs.solids.zmesh_numpy import zmesh as zmesh_n
+
+
+def close(l1, l2):
+    return len(l1) == len(l2) and max(abs(a - b) for (a, b) in zip(l1, l2)) < 1e-12
+
+
+b1 = Box(Z=4.)
+b2 = Box(Z=3.)
+b2.pos.z = 0.5
+for method in ['unify', 'update']:
+    res = []
+    for zmesh in [zmesh_l, zmesh_n]:
+        m1 = zmesh(b1)
+        m1.set_grid([1, 2, 1])
+        m1.set_values([1., 2., 3.])
+        m2 = zmesh(b2)
+        m2.set_grid([1, 1, 1, 3])
+        m2.set_values([10., 20., 30., 40.])
+        getattr(m1, method)(m2)
+        res.append((m1.get_grid(), m1.values(), m2.get_grid(), m2.values(),
+                    [m1.integral(), m1.integral(-1., 1.5), m1.mean()],
+                    m1.boundary_coords('abs')))
+    for (r1, r2) in zip(*res):
+        assert close(r1, r2), (method, r1, r2)
+
+# non-float values are kept as they are
+m = zmesh_n(b1)
+m.set_grid([1, 1])
+m.set_values([1, 2])
+assert map(type, m.values()) == [int, int]
+
+# copies share values until one of them is changed
+for zmesh in [zmesh_l, zmesh_n]:
+    m1 = zmesh(b1)
+    m1.set_grid([1, 1, 1])
+    m1.set_values([1., 2., 3.])
+    m2 = m1.copy()
+    m3 = zmesh(b1)
+    m3.set_grid([1, 1, 1])
+    m3.update(m1)
+    m2.set_value_by_index(5., 0)
+    m3.set_value_by_index(7., 1)
+    m1.set_value_by_index(9., 2)
+    assert m1.values() == [1., 2., 9.]
+    assert m2.values() == [5., 2., 3.]
+    assert m3.values() == [1., 7., 3.]
+print 'OK'